@@ -0,0 +1,48 @@
+"""Add leased item membership for human assignments
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "accuracy_human_assignment_items",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column("assignment_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("accuracy_human_assignments.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("evaluation_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("accuracy_test.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("accuracy_test_items.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="leased"),
+        sa.Column("leased_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.UniqueConstraint("item_id", name="unique_human_assignment_item"),
+        sa.CheckConstraint("status IN ('leased', 'completed')", name="check_human_assignment_item_status"),
+    )
+    op.create_index(
+        "idx_human_assignment_items_assignment_id_status",
+        "accuracy_human_assignment_items",
+        ["assignment_id", "status"],
+    )
+    op.create_index(
+        "idx_human_assignment_items_evaluation_id",
+        "accuracy_human_assignment_items",
+        ["evaluation_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_human_assignment_items_evaluation_id", table_name="accuracy_human_assignment_items")
+    op.drop_index("idx_human_assignment_items_assignment_id_status", table_name="accuracy_human_assignment_items")
+    op.drop_table("accuracy_human_assignment_items")
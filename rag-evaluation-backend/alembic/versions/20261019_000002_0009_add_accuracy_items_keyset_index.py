@@ -0,0 +1,26 @@
+"""Add keyset pagination index for accuracy test items
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_accuracy_test_items_evaluation_id_sequence",
+        "accuracy_test_items",
+        ["evaluation_id", "sequence_number", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_accuracy_test_items_evaluation_id_sequence", table_name="accuracy_test_items")
@@ -0,0 +1,58 @@
+"""Add content hash and reused status to accuracy test items
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "accuracy_test_items",
+        sa.Column("content_hash", sa.String(32), nullable=True),
+    )
+    # 回填已有评测项：问题、参考答案、回答三者的 md5
+    op.execute(
+        """
+        UPDATE accuracy_test_items AS i
+        SET content_hash = md5(
+            q.question_text || chr(31) || coalesce(q.standard_answer, '') || chr(31) || r.answer
+        )
+        FROM questions AS q, rag_answers AS r
+        WHERE q.id = i.question_id AND r.id = i.rag_answer_id
+        """
+    )
+    op.create_index(
+        "idx_accuracy_test_items_evaluation_id_content_hash",
+        "accuracy_test_items",
+        ["evaluation_id", "content_hash"],
+    )
+
+    op.drop_constraint("accuracy_test_items_status_check", "accuracy_test_items", type_="check")
+    op.create_check_constraint(
+        "accuracy_test_items_status_check",
+        "accuracy_test_items",
+        "status IN ('pending', 'ai_completed', 'human_completed', 'both_completed', 'failed', 'reused')",
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE accuracy_test_items SET status = 'pending' WHERE status = 'reused'")
+    op.drop_constraint("accuracy_test_items_status_check", "accuracy_test_items", type_="check")
+    op.create_check_constraint(
+        "accuracy_test_items_status_check",
+        "accuracy_test_items",
+        "status IN ('pending', 'ai_completed', 'human_completed', 'both_completed', 'failed')",
+    )
+
+    op.drop_index("idx_accuracy_test_items_evaluation_id_content_hash", table_name="accuracy_test_items")
+    op.drop_column("accuracy_test_items", "content_hash")
@@ -0,0 +1,23 @@
+"""Add attempt count to rag answers
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("rag_answers", sa.Column("attempt_count", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("rag_answers", "attempt_count")
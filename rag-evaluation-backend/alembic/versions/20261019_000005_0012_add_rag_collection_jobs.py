@@ -0,0 +1,70 @@
+"""Add background RAG answer collection jobs
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rag_collection_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("projects.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("created_by", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="SET NULL")),
+        sa.Column("version", sa.String(50)),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("settings", postgresql.JSONB),
+        sa.Column("total_questions", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("succeeded_questions", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("failed_questions", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("started_at", sa.DateTime(timezone=True)),
+        sa.Column("finished_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.CheckConstraint(
+            "status IN ('queued', 'running', 'completed', 'failed', 'cancelled')",
+            name="check_rag_collection_job_status",
+        ),
+    )
+    op.create_index("idx_rag_collection_jobs_project_id", "rag_collection_jobs", ["project_id"])
+
+    op.create_table(
+        "rag_collection_job_items",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("uuid_generate_v4()")),
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("rag_collection_jobs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("question_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("questions.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("answer_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("rag_answers.id", ondelete="SET NULL")),
+        sa.Column("attempt_count", sa.Integer),
+        sa.Column("error", sa.Text),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.UniqueConstraint("job_id", "question_id", name="unique_collection_job_question"),
+        sa.CheckConstraint(
+            "status IN ('pending', 'succeeded', 'failed')",
+            name="check_rag_collection_job_item_status",
+        ),
+    )
+    op.create_index(
+        "idx_rag_collection_job_items_job_id_status",
+        "rag_collection_job_items",
+        ["job_id", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_rag_collection_job_items_job_id_status", table_name="rag_collection_job_items")
+    op.drop_table("rag_collection_job_items")
+    op.drop_index("idx_rag_collection_jobs_project_id", table_name="rag_collection_jobs")
+    op.drop_table("rag_collection_jobs")
@@ -1,5 +1,6 @@
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import uuid
 from sqlalchemy.sql.expression import case
@@ -14,9 +15,14 @@ from app.schemas.accuracy import (
     AccuracyTestItemDetail,
     HumanAssignmentCreate,
     HumanAssignmentDetail,
+    HumanLeaseRequest,
+    HumanLeaseResponse,
+    HumanReleaseRequest,
+    HumanResultsSubmit,
     StartAccuracyTestRequest,
     InterruptTestRequest,
-    AccuracyTest
+    AccuracyTest,
+    AIEvaluateRequest,
 )
 from app.services.accuracy_service import AccuracyService
 
@@ -66,17 +72,22 @@ def get_accuracy_test_items(
     offset: int = Query(0, ge=0),
     status: Optional[str] = Query(None),
     score: Optional[float] = Query(None, description="按分数筛选"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入后忽略 offset"),
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """获取精度评测项目列表"""
     service = AccuracyService(db)
-    items, total = service.get_test_items(test_id, limit, offset, status, score)
+    try:
+        items, total, next_cursor = service.get_test_items(test_id, limit, offset, status, score, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "items": items,
         "total": total,
         "limit": limit,
-        "offset": offset
+        "offset": offset,
+        "next_cursor": next_cursor
     }
 
 @router.post("/start", response_model=AccuracyTestDetail)
@@ -164,6 +175,37 @@ def submit_test_item_results(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/{test_id}/ai-evaluate", response_model=Dict[str, Any])
+async def run_ai_evaluation(
+    test_id: uuid.UUID,
+    data: AIEvaluateRequest,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """由后端调用评测模型对一批评测项打分（支持自一致性多次采样）"""
+    # 数据库操作经 run_sync 执行，等待评测模型期间不阻塞事件循环
+    service = AccuracyService(db)
+    try:
+        result = await service.run_ai_evaluation(test_id, current_user.id, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="精度评测不存在")
+    return result
+
+@router.post("/{test_id}/recalculate-results", response_model=AccuracyTestDetail)
+def recalculate_test_results(
+    test_id: uuid.UUID,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """全量重算测试进度与结果汇总（修复用）"""
+    service = AccuracyService(db)
+    test = service.recalculate_test_results(test_id)
+    if not test:
+        raise HTTPException(status_code=404, detail="精度评测不存在")
+    return test
+
 @router.post("/{test_id}/human-assignments", response_model=HumanAssignmentDetail)
 def create_human_assignment(
     test_id: uuid.UUID,
@@ -193,49 +235,97 @@ def get_human_assignments(
     assignments = service.get_human_assignments(test_id)
     return assignments
 
+@router.post("/human-tasks/{access_code}/lease", response_model=HumanLeaseResponse)
+def lease_human_items(
+    access_code: str,
+    data: HumanLeaseRequest,
+    db: Session = Depends(deps.get_db)
+):
+    """凭访问码领取待人工评测的评测项（租约超时后自动释放）"""
+    service = AccuracyService(db)
+    try:
+        return service.lease_human_items(access_code, data.count)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="评测任务不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/human-tasks/{access_code}/release", response_model=Dict[str, Any])
+def release_human_items(
+    access_code: str,
+    data: HumanReleaseRequest,
+    db: Session = Depends(deps.get_db)
+):
+    """释放已领取但未提交的评测项"""
+    service = AccuracyService(db)
+    try:
+        released = service.release_human_items(access_code, data.item_ids)
+        return {"released": released}
+    except LookupError:
+        raise HTTPException(status_code=404, detail="评测任务不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/human-tasks/{access_code}/submit", response_model=Dict[str, Any])
+def submit_human_results(
+    access_code: str,
+    data: HumanResultsSubmit,
+    db: Session = Depends(deps.get_db)
+):
+    """提交已领取评测项的人工评测结果"""
+    service = AccuracyService(db)
+    try:
+        return service.submit_human_results(
+            access_code,
+            [result.model_dump() for result in data.results],
+        )
+    except LookupError:
+        raise HTTPException(status_code=404, detail="评测任务不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/project/{project_id}/running-tests")
 async def get_running_tests(
     project_id: uuid.UUID,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    service = AccuracyService(db)
-    return service.check_running_tests(project_id)
+    return await db.run_sync(lambda session: AccuracyService(session).check_running_tests(project_id))
 
 @router.post("/{test_id}/interrupt")
 async def interrupt_test(
     test_id: uuid.UUID,
     data: InterruptTestRequest,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: User = Depends(deps.get_current_user)
 ):
     """将测试标记为中断状态"""
-    service = AccuracyService(db)
-    return service.mark_test_interrupted(test_id, data.reason)
+    return await db.run_sync(lambda session: AccuracyService(session).mark_test_interrupted(test_id, data.reason))
 
 @router.post("/{test_id}/reset")
 async def reset_test(
     test_id: uuid.UUID,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    service = AccuracyService(db)
-    return service.reset_test_items(test_id)
+    return await db.run_sync(lambda session: AccuracyService(session).reset_test_items(test_id))
 
 @router.put("/{test_id}/status", response_model=AccuracyTest)
 async def update_test_status(
     test_id: str,
     data: Dict[str, str] = Body(...),
     current_user: User = Depends(deps.get_current_user),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """更新测试状态"""
-    service = AccuracyService(db)
-    test = service.get_test_detail(test_id)
-    if not test:
-        raise HTTPException(status_code=404, detail="测试不存在")
-    
     # 验证状态值
     valid_statuses = ['created', 'running', 'completed', 'failed', 'interrupted']
     if data.get('status') not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"无效的状态值，必须是以下之一: {', '.join(valid_statuses)}")
-    
-    return service.update_test_status(db, test_id, data.get('status')) 
\ No newline at end of file
+
+    def update_status(session: Session):
+        service = AccuracyService(session)
+        test = service.get_test_detail(test_id)
+        if not test:
+            raise HTTPException(status_code=404, detail="测试不存在")
+        return service.update_test_status(session, test_id, data.get('status'))
+
+    return await db.run_sync(update_status) 
\ No newline at end of file
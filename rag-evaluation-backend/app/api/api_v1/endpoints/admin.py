@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_current_active_admin, get_db
 from app.models.user import User
 from app.services.admin_service import get_system_statistics as get_system_statistics_service
+from app.services.evaluation.scheduler import scheduler
+from app.services.host_limiter import host_limiter
 
 router = APIRouter()
 
@@ -17,3 +19,23 @@ def get_system_statistics(
     获取系统统计信息（仅管理员可访问）
     """
     return get_system_statistics_service(db)
+
+
+@router.get("/scheduler", response_model=Dict[str, Any])
+async def get_scheduler_status(
+    current_user: User = Depends(get_current_active_admin),
+) -> Any:
+    """
+    获取评测调度器的并发槽位占用与各任务排队深度（仅管理员可访问）
+    """
+    return scheduler.snapshot()
+
+
+@router.get("/proxy-hosts", response_model=Dict[str, Any])
+async def get_proxy_host_status(
+    current_user: User = Depends(get_current_active_admin),
+) -> Any:
+    """
+    获取RAG代理各目标主机的并发占用、排队深度与等待时间（仅管理员可访问）
+    """
+    return host_limiter.snapshot()
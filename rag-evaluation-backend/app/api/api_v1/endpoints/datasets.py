@@ -405,10 +405,11 @@ def copy_dataset_api(
     db: Session = Depends(get_db),
     dataset_id: str,
     name: Optional[str] = Query(None, description="新数据集名称"),
+    rag_answer_versions: Optional[List[str]] = Query(None, description="同时复制这些版本的RAG回答"),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    复制公开数据集到当前用户的私人数据集
+    复制公开数据集到当前用户的私人数据集，可选同时复制指定版本的RAG回答
     """
     # 检查源数据集
     source_dataset = get_dataset(db, dataset_id=dataset_id)
@@ -420,7 +421,13 @@ def copy_dataset_api(
         raise HTTPException(status_code=403, detail="无权复制此数据集")
 
     # 执行复制
-    new_dataset = copy_dataset(db, source_dataset_id=dataset_id, user_id=str(current_user.id), new_name=name)
+    new_dataset = copy_dataset(
+        db,
+        source_dataset_id=dataset_id,
+        user_id=str(current_user.id),
+        new_name=name,
+        rag_answer_versions=rag_answer_versions,
+    )
 
     if not new_dataset:
         raise HTTPException(status_code=500, detail="复制数据集失败")
@@ -1,5 +1,6 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import schemas, models
@@ -138,11 +139,13 @@ def get_performance_test_qa_pairs(
 async def interrupt_test(
     test_id: str,
     reason: dict = Body(...),
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """将测试标记为中断状态"""
-    test = performance_service.mark_test_interrupted(db, test_id, reason.get("reason", "页面刷新导致评测中断"))
+    test = await db.run_sync(
+        performance_service.mark_test_interrupted, test_id, reason.get("reason", "页面刷新导致评测中断")
+    )
     if not test:
         raise HTTPException(status_code=404, detail="测试不存在")
     return test
@@ -162,7 +165,7 @@ def reset_test(
 @router.get("/project/{project_id}/running-tests")
 async def get_running_tests(
     project_id: str,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
     """获取项目中运行中的测试"""
-    return performance_service.check_running_tests(project_id, db)
+    return await db.run_sync(lambda session: performance_service.check_running_tests(project_id, session))
@@ -1,10 +1,11 @@
-from typing import Any, List, Optional, Dict
+from typing import Any, List, Optional, Dict, Tuple
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_async_db, get_current_user, get_db
 from app.models.user import User
 from app.schemas.rag_answer import (
     RagAnswerOut, 
@@ -13,10 +14,13 @@ from app.schemas.rag_answer import (
     BatchImportRequest,
     ApiRequestConfig,
     CollectionProgress,
+    CollectionResult,
+    CollectionJobResume,
     RagAnswerCreate,
     RagAnswerUpdate
 )
-from app.services.rag_service import RagService
+from app.services.rag_adapters import resolve_endpoint
+from app.services.rag_service import RagService, run_collection_job_in_background
 from app.services.project_service import get_project as service_get_project
 from app.services.question_service import (
     get_question as service_get_question,
@@ -26,45 +30,157 @@ from app.services.dataset_service import get_dataset as service_get_dataset
 
 router = APIRouter()
 
-@router.post("/collect", response_model=Dict[str, Any])
+@router.post("/collect", response_model=CollectionProgress)
 async def collect_rag_answers(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     req: BatchCollectionRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     从RAG系统API收集回答
+
+    创建后台收集任务并立即返回任务ID，通过 /collect/{job_id} 查询进度。
+    该版本已有回答的问题默认跳过，overwrite=true 时重新收集并覆盖
     """
-    # 检查项目权限
-    project = service_get_project(db, req.project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="项目未找到")
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="无权在此项目中收集回答")
-    
-    # 检查问题是否属于项目
-    questions = service_get_questions_by_ids_for_project(
-        db,
-        question_ids=req.question_ids,
-        project_id=req.project_id,
-    )
-    
-    if len(questions) != len(req.question_ids):
-        raise HTTPException(status_code=400, detail="部分问题ID无效或不属于此项目")
-    
-    # 创建服务实例并收集回答
+    try:
+        endpoint = resolve_endpoint(req.api_config, req.rag_config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 同步的服务层通过 run_sync 在异步会话上执行，不阻塞事件循环
+    def create_job(session: Session) -> Tuple[str, Dict[str, Any]]:
+        # 检查项目权限
+        project = service_get_project(session, req.project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="项目未找到")
+        if project.user_id != current_user.id and not current_user.is_admin:
+            raise HTTPException(status_code=403, detail="无权在此项目中收集回答")
+
+        # 检查问题是否属于项目
+        questions = service_get_questions_by_ids_for_project(
+            session,
+            question_ids=req.question_ids,
+            project_id=req.project_id,
+        )
+
+        if len(questions) != len(set(req.question_ids)):
+            raise HTTPException(status_code=400, detail="部分问题ID无效或不属于此项目")
+
+        # 创建收集任务，在后台执行
+        rag_service = RagService(session)
+        job = rag_service.create_collection_job(
+            project_id=req.project_id,
+            user_id=current_user.id,
+            question_ids=req.question_ids,
+            endpoint=endpoint,
+            concurrent_requests=req.concurrent_requests,
+            max_attempts=req.max_attempts,
+            version=req.version,
+            overwrite=req.overwrite,
+            coalesce=req.coalesce,
+        )
+        return str(job.id), rag_service.get_collection_progress(job)
+
+    job_id, progress = await db.run_sync(create_job)
+    background_tasks.add_task(run_collection_job_in_background, job_id, endpoint)
+
+    return progress
+
+def _get_collection_job_for_user(db: Session, job_id: str, current_user: User):
     rag_service = RagService(db)
-    results = await rag_service.collect_answers_batch(
-        req.question_ids,
-        req.api_config,
-        req.concurrent_requests,
-        req.max_attempts,
-        req.source_system,
-        req.collect_performance
-    )
+    job = rag_service.get_collection_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="收集任务未找到")
+    
+    project = service_get_project(db, str(job.project_id))
+    if not project or (project.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=403, detail="无权访问此收集任务")
+    return rag_service, job
+
+@router.get("/collect/{job_id}", response_model=CollectionProgress)
+def get_collection_job_progress(
+    *,
+    db: Session = Depends(get_db),
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    查询收集任务进度
+    """
+    rag_service, job = _get_collection_job_for_user(db, str(job_id), current_user)
+    return rag_service.get_collection_progress(job)
+
+@router.get("/collect/{job_id}/results", response_model=List[CollectionResult])
+def get_collection_job_results(
+    *,
+    db: Session = Depends(get_db),
+    job_id: uuid.UUID,
+    status: Optional[str] = Query(None, description="按状态筛选：pending / succeeded / failed"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, gt=0, le=1000),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    分页查询收集任务中每个问题的收集结果
+
+    收集改为后台任务后，原同步收集接口返回的 results 列表改由此接口提供
+    """
+    rag_service, _ = _get_collection_job_for_user(db, str(job_id), current_user)
+    return rag_service.get_collection_results(str(job_id), status=status, skip=skip, limit=limit)
+
+@router.post("/collect/{job_id}/cancel", response_model=CollectionProgress)
+def cancel_collection_job(
+    *,
+    db: Session = Depends(get_db),
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    取消收集任务，已发出的请求完成后停止
+    """
+    rag_service, job = _get_collection_job_for_user(db, str(job_id), current_user)
+    if not rag_service.cancel_collection_job(str(job_id)):
+        raise HTTPException(status_code=400, detail=f"任务状态为 {job.status}，无法取消")
     
-    return results
+    db.refresh(job)
+    return rag_service.get_collection_progress(job)
+
+@router.post("/collect/{job_id}/resume", response_model=CollectionProgress)
+async def resume_collection_job(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    job_id: uuid.UUID,
+    req: CollectionJobResume,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    恢复收集任务，只收集尚未成功的问题
+
+    请求中的接口配置必须与任务创建时的RAG系统（类型与地址）一致
+    """
+    try:
+        endpoint = resolve_endpoint(req.api_config, req.rag_config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def requeue_job(session: Session) -> Dict[str, Any]:
+        rag_service, job = _get_collection_job_for_user(session, str(job_id), current_user)
+        try:
+            rag_service.check_resume_endpoint(job, endpoint)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="接口配置与任务创建时的RAG系统不一致，无法恢复")
+        if not rag_service.requeue_collection_job(str(job_id)):
+            raise HTTPException(status_code=400, detail=f"任务状态为 {job.status}，无法恢复")
+        session.refresh(job)
+        return rag_service.get_collection_progress(job)
+
+    progress = await db.run_sync(requeue_job)
+    background_tasks.add_task(run_collection_job_in_background, str(job_id), endpoint)
+
+    return progress
 
 @router.post("/import", response_model=Dict[str, Any])
 def import_rag_answers(
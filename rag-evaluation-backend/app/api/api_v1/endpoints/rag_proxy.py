@@ -2,18 +2,22 @@
 RAG代理端点 - 解决HTTPS环境下访问HTTP服务的混合内容问题
 """
 
-import asyncio
 import json
 import time
+from contextlib import AsyncExitStack
 from typing import Any, Dict, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import httpx
-from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_current_user_cached
+from app.core.http_client import http_clients
 from app.models.user import User
+from app.services.evaluation.scheduler import scheduler
+from app.services.host_limiter import HostQueueFull, host_limiter
+from app.services.proxy_telemetry import UpstreamTiming, upstream_timings
 
 router = APIRouter()
 
@@ -25,126 +29,159 @@ class RAGProxyRequest(BaseModel):
     headers: Dict[str, str] = {}
     body: Optional[Dict[str, Any]] = None
     timeout: int = 60
+    # 性能测试发起的请求按测试参与全局公平调度
+    performance_test_id: Optional[str] = None
+    # 流式响应结束后追加 upstream_timing 事件，报告后端测得的上游耗时
+    include_timing: bool = False
+
+
+# 性能测试属于批量压测，调度优先级由服务端决定，不接受客户端指定
+PERFORMANCE_TEST_PRIORITY = "batch"
+
+# 原样转发给前端的上游响应头；其余（连接、长度等）由本服务重新生成
+FORWARDED_RESPONSE_HEADERS = ("content-type", "content-encoding", "cache-control")
 
 
 @router.post("/proxy")
 async def proxy_rag_request(
     request: RAGProxyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_cached)
 ):
     """
     代理RAG请求到HTTP服务
-    支持流式和非流式响应
+
+    上游的状态码、Content-Type 与响应字节原样转发，流式与非流式响应均边收边发。
+    同一目标主机的并发请求数受限，超出时排队，队列已满返回 429。
+    目标地址无效或协议不受支持时返回 400，上游连接失败等返回 502。
+    排队与上游响应头耗时通过 Server-Timing 响应头返回；include_timing 为 true 的 SSE 响应
+    末尾追加 upstream_timing 事件，包含首字节、末字节耗时与字节数。
+    带 performance_test_id 的请求计时计入该性能测试的汇总指标
     """
-    
-    async def generate_response():
-        try:
-            # 设置超时
-            timeout = httpx.Timeout(request.timeout)
-            
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                # 准备请求参数
-                req_kwargs = {
-                    "method": request.method,
-                    "url": request.url,
-                    "headers": request.headers,
-                }
-                
-                if request.body:
-                    req_kwargs["json"] = request.body
-                
-                # 检查是否为流式请求
-                content_type = request.headers.get('Accept', '')
-                is_stream = 'text/event-stream' in content_type or 'stream' in str(request.body).lower()
-                
-                if is_stream:
-                    # 流式请求
-                    async with client.stream(**req_kwargs) as response:
-                        if response.status_code != 200:
-                            error_text = await response.aread()
-                            yield f"data: {json.dumps({'error': f'HTTP {response.status_code}: {error_text.decode()}'})}\n\n"
-                            return
-                        
-                        # 转发流式响应
-                        async for chunk in response.aiter_bytes():
-                            if chunk:
-                                yield chunk.decode('utf-8', errors='ignore')
-                else:
-                    # 非流式请求
-                    response = await client.request(**req_kwargs)
-                    
-                    if response.status_code != 200:
-                        error_text = response.text
-                        yield json.dumps({'error': f'HTTP {response.status_code}: {error_text}'})
-                        return
-                    
-                    # 返回完整响应
-                    yield response.text
-                    
-        except httpx.TimeoutException:
-            yield json.dumps({'error': '请求超时'})
-        except httpx.ConnectError:
-            yield json.dumps({'error': '无法连接到目标服务'})
-        except Exception as e:
-            yield json.dumps({'error': f'代理请求失败: {str(e)}'})
-    
-    # 检查请求类型设置响应头
-    content_type = request.headers.get('Accept', '')
-    is_stream = 'text/event-stream' in content_type or 'stream' in str(request.body).lower()
-    
+    stack = AsyncExitStack()
+    try:
+        # 先按目标主机排队，队列已满直接拒绝，不占用调度槽位
+        queue_wait = await stack.enter_async_context(host_limiter.slot(request.url))
+        # 性能测试发起的请求在整个响应期间占用调度槽位
+        if request.performance_test_id:
+            await stack.enter_async_context(
+                scheduler.slot("performance", request.performance_test_id, priority=PERFORMANCE_TEST_PRIORITY)
+            )
+        # 复用目标服务的连接池
+        client = http_clients.get(request.url)
+        upstream_request = client.build_request(
+            request.method,
+            request.url,
+            headers=request.headers,
+            json=request.body or None,
+            timeout=httpx.Timeout(request.timeout),
+        )
+        start_time = time.perf_counter()
+        upstream = await client.send(upstream_request, stream=True)
+        headers_ms = (time.perf_counter() - start_time) * 1000
+        stack.push_async_callback(upstream.aclose)
+    except HostQueueFull as e:
+        await stack.aclose()
+        return JSONResponse({'error': str(e)}, status_code=429, headers={"Retry-After": "1"})
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError) as e:
+        # 目标地址无效属于请求参数错误，不是上游故障
+        await stack.aclose()
+        return JSONResponse({'error': f'无效的目标地址: {str(e)}'}, status_code=400)
+    except httpx.TimeoutException:
+        await stack.aclose()
+        return JSONResponse({'error': '请求超时'}, status_code=504)
+    except httpx.ConnectError:
+        await stack.aclose()
+        return JSONResponse({'error': '无法连接到目标服务'}, status_code=502)
+    except Exception as e:
+        await stack.aclose()
+        return JSONResponse({'error': f'代理请求失败: {str(e)}'}, status_code=502)
+
+    headers = {
+        name: upstream.headers[name]
+        for name in FORWARDED_RESPONSE_HEADERS
+        if name in upstream.headers
+    }
+    headers["server-timing"] = (
+        f"proxy-queue;dur={queue_wait * 1000:.1f}, upstream-headers;dur={headers_ms:.1f}"
+    )
+    is_stream = "text/event-stream" in headers.get("content-type", "")
     if is_stream:
-        headers = {
-            "Content-Type": "text/event-stream",
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
-    else:
-        headers = {
-            "Content-Type": "application/json",
-        }
-    
+        # 避免反向代理缓冲 SSE
+        headers.setdefault("cache-control", "no-cache")
+        headers["x-accel-buffering"] = "no"
+
+    async def forward_body():
+        first_byte_ms = None
+        received = 0
+        try:
+            async for chunk in upstream.aiter_raw():
+                if first_byte_ms is None:
+                    first_byte_ms = (time.perf_counter() - start_time) * 1000
+                received += len(chunk)
+                yield chunk
+            timing = UpstreamTiming(
+                status=upstream.status_code,
+                headers_ms=round(headers_ms, 1),
+                first_byte_ms=round(first_byte_ms, 1) if first_byte_ms is not None else None,
+                last_byte_ms=round((time.perf_counter() - start_time) * 1000, 1),
+                bytes=received,
+            )
+            if request.performance_test_id:
+                upstream_timings.record(request.performance_test_id, timing)
+            # 压缩的响应体无法追加明文事件
+            if request.include_timing and is_stream and "content-encoding" not in headers:
+                yield f"event: upstream_timing\ndata: {json.dumps(timing.as_dict())}\n\n".encode("utf-8")
+        finally:
+            await stack.aclose()
+
     return StreamingResponse(
-        generate_response(),
-        headers=headers
+        forward_body(),
+        status_code=upstream.status_code,
+        headers=headers,
+        # 客户端提前断开时生成器可能未执行完，由后台任务兜底释放连接与槽位
+        background=BackgroundTask(stack.aclose),
     )
 
 
 @router.post("/proxy/test")
 async def test_rag_proxy(
     request: RAGProxyRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_cached)
 ) -> Dict[str, Any]:
     """
     测试RAG代理连接
     """
     try:
-        timeout = httpx.Timeout(10)  # 测试时使用较短超时
+        client = http_clients.get(request.url)
+        req_kwargs = {
+            "method": request.method,
+            "url": request.url,
+            "headers": request.headers,
+            "timeout": httpx.Timeout(10),  # 测试时使用较短超时
+        }
+        
+        if request.body:
+            req_kwargs["json"] = request.body
+        
+        start_time = time.time()
+        response = await client.request(**req_kwargs)
+        response_time = time.time() - start_time
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            req_kwargs = {
-                "method": request.method,
-                "url": request.url,
-                "headers": request.headers,
-            }
-            
-            if request.body:
-                req_kwargs["json"] = request.body
-            
-            start_time = time.time()
-            response = await client.request(**req_kwargs)
-            response_time = time.time() - start_time
-            
-            return {
-                "success": True,
-                "status_code": response.status_code,
-                "response_time": round(response_time * 1000, 2),  # 毫秒
-                "content_length": len(response.content),
-                "content_preview": response.text[:200] if response.text else "",
-                "headers": dict(response.headers)
-            }
-            
+        return {
+            "success": True,
+            "status_code": response.status_code,
+            "response_time": round(response_time * 1000, 2),  # 毫秒
+            "content_length": len(response.content),
+            "content_preview": response.text[:200] if response.text else "",
+            "headers": dict(response.headers)
+        }
+        
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError) as e:
+        return {
+            "success": False,
+            "error": f"无效的目标地址: {str(e)}",
+            "error_type": "invalid_url"
+        }
     except httpx.TimeoutException:
         return {
             "success": False,
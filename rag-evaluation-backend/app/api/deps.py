@@ -1,3 +1,7 @@
+import threading
+import time
+from typing import Dict, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -5,40 +9,77 @@ from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.security import ALGORITHM
-from app.db.base import get_db
+from app.db.base import SessionLocal, get_async_db, get_db
 from app.models.user import User
 from app.schemas.user import TokenPayload
 from app.services.user_service import get_user as get_user_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    print(f"DEBUG - 获取当前用户: 令牌前15个字符 {token[:15]}...")
-    
+# 长连接端点使用的用户缓存：user_id -> (过期时间, 已脱离会话的用户对象)
+_user_cache: Dict[str, Tuple[float, User]] = {}
+_user_cache_lock = threading.Lock()
+
+
+def _decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[ALGORITHM]
         )
-        print(f"DEBUG - JWT解码成功: {payload}")
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (JWTError, ValidationError):
-        print("DEBUG - JWT解码失败")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="认证凭据无效",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = get_user_service(db, token_data.sub)
 
+
+def _check_user(user: User) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="用户未找到")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="用户未激活")
     return user
 
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> User:
+    token_data = _decode_token(token)
+    user = get_user_service(db, token_data.sub)
+
+    return _check_user(user)
+
+def get_current_user_cached(token: str = Depends(oauth2_scheme)) -> User:
+    """
+    获取当前用户，不占用请求级数据库会话
+
+    用于代理流等长连接端点：用户从短期缓存读取，未命中时用独立会话查询后立即关闭，
+    连接在响应开始前已归还连接池。返回的用户对象已脱离会话，只可读取字段
+    """
+    token_data = _decode_token(token)
+    if not token_data.sub:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="认证凭据无效",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id = token_data.sub
+    now = time.monotonic()
+
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+    if cached and cached[0] > now:
+        return _check_user(cached[1])
+
+    with SessionLocal() as db:
+        user = get_user_service(db, user_id)
+    if user is not None:
+        with _user_cache_lock:
+            _user_cache[user_id] = (now + settings.AUTH_USER_CACHE_SECONDS, user)
+    return _check_user(user)
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
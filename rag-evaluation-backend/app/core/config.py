@@ -88,6 +88,41 @@ class Settings(BaseSettings):
     # API Key 加密主密钥（Base64 或 32 字节 hex）
     API_KEY_MASTER_KEY: Optional[str] = None
     
+    # 人工评测租约超时（秒），超时未提交的评测项可被其他评测人员重新领取
+    HUMAN_ASSIGNMENT_LEASE_SECONDS: int = 30 * 60
+    
+    # 评测任务（AI 评测、性能测试代理请求）共享的全局并发槽位数
+    SCHEDULER_MAX_CONCURRENCY: int = 32
+
+    # 出站 HTTP 连接池（RAG 接口、评测模型），按目标主机分别计算
+    HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CLIENT_HTTP2: bool = False
+    # 最多保留的目标数（连接池、熔断器、代理主机限流状态），超出时淘汰最久未用的
+    HTTP_CLIENT_MAX_ORIGINS: int = 256
+    # 设置后录制所有出站响应（含逐块到达时间）到该文件，供 benchmarks/replay_server.py 回放
+    HTTP_CAPTURE_PATH: Optional[str] = None
+
+    # RAG 回答收集的重试退避（秒）与熔断：连续失败达到阈值后暂停请求
+    RAG_RETRY_BASE_DELAY: float = 0.5
+    RAG_RETRY_MAX_DELAY: float = 10.0
+    RAG_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    RAG_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # 批量收集写入：每累计 N 条或等待 T 毫秒批量写入一次
+    RAG_COLLECT_FLUSH_ROWS: int = 100
+    RAG_COLLECT_FLUSH_MS: int = 500
+    # 运行中的收集任务超过该时长（秒）未写入进度，视为进程已退出，可重新排队
+    RAG_COLLECTION_JOB_STALE_SECONDS: int = 600
+
+    # RAG 代理：每个目标主机的最大并发请求数与排队上限，队列满时返回 429
+    RAG_PROXY_MAX_CONCURRENCY_PER_HOST: int = 32
+    RAG_PROXY_MAX_QUEUE_PER_HOST: int = 256
+
+    # 代理流等长连接端点缓存已认证用户的时长（秒），停用用户最迟在该时长后失效
+    AUTH_USER_CACHE_SECONDS: int = 30
+
     # 测试用户
     FIRST_ADMIN_EMAIL: EmailStr = "admin@example.com"
     FIRST_ADMIN_PASSWORD: str = "adminpassword"
@@ -0,0 +1,158 @@
+"""
+出站 HTTP 流量录制 - 记录上游响应及逐块到达时间，供 benchmarks/replay_server.py 离线回放
+
+Each exchange is one JSON line (gzip-compressed when the file name ends with
+``.gz``)::
+
+    {"v": 1, "ts": 1760000000.0, "method": "POST", "url": "http://rag.local/chat",
+     "request_key": "<sha256>", "request_body": "...", "status": 200,
+     "headers": {"content-type": "text/event-stream"}, "headers_ms": 12.5,
+     "body": "<base64>", "chunks": [[15.1, 64], [40.7, 128]], "complete": true}
+
+``chunks`` lists the arrival time (ms since the request was sent) and size of
+each raw body chunk, so the body can be cut and paced exactly as received.
+Request headers are never recorded; they carry API keys.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+import httpx
+
+CAPTURE_FORMAT_VERSION = 1
+# 回放需要的响应头；其余响应头不录制
+CAPTURED_RESPONSE_HEADERS = ("content-type", "content-encoding")
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Identity of a request for replay matching: method, path with query, and body."""
+    digest = hashlib.sha256()
+    digest.update(f"{method.upper()} {path}\n".encode("utf-8"))
+    digest.update(body or b"")
+    return digest.hexdigest()
+
+
+class CaptureWriter:
+    """Appends capture records to a JSON Lines file, from any thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        opener = gzip.open if path.endswith(".gz") else open
+        self._file = opener(path, "at", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class CapturingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper that records every response passing through it.
+
+    The body is recorded as raw (still encoded) bytes while the caller reads
+    it, and the record is written when the response is closed, so capture adds
+    no buffering or delay to streaming responses.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, writer: CaptureWriter):
+        self._transport = transport
+        self._writer = writer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start_time = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            # 流式请求体无法再次读取，只按路径匹配
+            body = b""
+        record = {
+            "v": CAPTURE_FORMAT_VERSION,
+            "ts": round(time.time(), 3),
+            "method": request.method,
+            "url": str(request.url),
+            "request_key": request_key(request.method, request.url.raw_path.decode("ascii"), body),
+            "request_body": body.decode("utf-8", errors="replace"),
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in CAPTURED_RESPONSE_HEADERS
+                if name in response.headers
+            },
+            "headers_ms": round((time.perf_counter() - start_time) * 1000, 1),
+        }
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CapturingStream(response.stream, record, start_time, self._writer),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _CapturingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, record: Dict[str, Any], start_time: float, writer: CaptureWriter):
+        self._stream = stream
+        self._record = record
+        self._start_time = start_time
+        self._writer = writer
+        self._parts: List[bytes] = []
+        self._chunks: List[Tuple[float, int]] = []
+        self._complete = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._parts.append(chunk)
+            self._chunks.append((round((time.perf_counter() - self._start_time) * 1000, 1), len(chunk)))
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._record is not None:
+                record, self._record = self._record, None
+                record["body"] = base64.b64encode(b"".join(self._parts)).decode("ascii")
+                record["chunks"] = self._chunks
+                record["complete"] = self._complete
+                self._writer.write(record)
+
+
+def load_captures(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Records of a capture file, in recording order. A file cut short because the
+    process was killed while recording yields every complete line.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        try:
+            for line in file:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+        except EOFError:
+            return
+
+
+def split_body(record: Dict[str, Any]) -> List[Tuple[float, bytes]]:
+    """The recorded body cut into its original chunks, with their arrival times in ms."""
+    body = base64.b64decode(record.get("body") or "")
+    parts = []
+    position = 0
+    for offset_ms, size in record.get("chunks") or []:
+        parts.append((offset_ms, body[position:position + size]))
+        position += size
+    return parts
@@ -0,0 +1,186 @@
+"""出站 HTTP 客户端注册表 - 按目标源复用连接池"""
+import asyncio
+import weakref
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator, Callable, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_capture import CaptureWriter, CapturingTransport
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.hostname:
+        raise ValueError(f"Invalid URL: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname.lower()}:{port}"
+
+
+class _InUseTransport(httpx.AsyncBaseTransport):
+    """Counts responses whose body is still open, so an evicted client is closed only once idle."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        self.in_use = 0
+        self.on_idle: Optional[Callable[[], None]] = None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_use += 1
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self._release),
+            extensions=response.extensions,
+        )
+
+    def _release(self) -> None:
+        self.in_use -= 1
+        if self.in_use == 0 and self.on_idle is not None:
+            self.on_idle()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                release, self._release = self._release, None
+                release()
+
+
+class HTTPClientRegistry:
+    """
+    Application-scoped ``httpx.AsyncClient`` instances, one per target origin.
+
+    Each client keeps its own keep-alive pool, so the connection limits apply
+    per host and repeated requests to a RAG backend or judge model reuse warm
+    TCP/TLS connections. Timeouts are per request; pass ``timeout=`` to the
+    request call to override the default.
+
+    Clients are shared between users, so they never store cookies. Connections
+    belong to the event loop that opened them, hence clients are also keyed by
+    the running loop; the FastAPI app only ever has one.
+
+    Target URLs come from users (e.g. through the RAG proxy), so at most
+    ``max_origins`` clients are kept per loop; the least recently used one is
+    dropped when another origin is added, and closed once its open responses
+    (e.g. proxied streams) have been closed.
+
+    With ``capture_path`` every response is also recorded to that file for
+    offline replay (see ``app.core.http_capture``).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        http2: bool,
+        timeout: httpx.Timeout,
+        max_origins: int = 256,
+        capture_path: Optional[str] = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeout = timeout
+        self.max_origins = max_origins
+        self._capture = CaptureWriter(capture_path) if capture_path else None
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderedDict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._transports: "weakref.WeakKeyDictionary[httpx.AsyncClient, _InUseTransport]" = weakref.WeakKeyDictionary()
+        # 已淘汰但仍有未关闭响应的客户端，空闲后关闭
+        self._draining: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Set[httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Pooled client for the origin of ``url``."""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, OrderedDict())
+        origin = _origin(url)
+        client = clients.get(origin)
+        if client is not None and not client.is_closed:
+            clients.move_to_end(origin)
+        else:
+            transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+            if self._capture is not None:
+                transport = CapturingTransport(transport, self._capture)
+            in_use = _InUseTransport(transport)
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=in_use,
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            )
+            self._transports[client] = in_use
+            clients[origin] = client
+            clients.move_to_end(origin)
+            while len(clients) > self.max_origins:
+                _, evicted = clients.popitem(last=False)
+                self._retire(loop, evicted)
+        return client
+
+    def _retire(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+        """Close an evicted client now if idle, otherwise when its last open response is closed."""
+        transport = self._transports.get(client)
+        if transport is None or transport.in_use == 0:
+            loop.create_task(client.aclose())
+            return
+
+        draining = self._draining.setdefault(loop, set())
+        draining.add(client)
+
+        def close_when_idle() -> None:
+            draining.discard(client)
+            loop.create_task(client.aclose())
+
+        transport.on_idle = close_when_idle
+
+    async def aclose(self) -> None:
+        """Close the clients opened on the running loop, including evicted ones still draining."""
+        loop = asyncio.get_running_loop()
+        clients = list(self._clients.pop(loop, {}).values()) + list(self._draining.pop(loop, set()))
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+    def close_capture(self) -> None:
+        """Finish the capture file, if recording."""
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+
+
+http_clients = HTTPClientRegistry(
+    max_connections_per_host=settings.HTTP_CLIENT_MAX_CONNECTIONS_PER_HOST,
+    max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+    http2=settings.HTTP_CLIENT_HTTP2,
+    timeout=httpx.Timeout(60.0, connect=10.0),
+    max_origins=settings.HTTP_CLIENT_MAX_ORIGINS,
+    capture_path=settings.HTTP_CAPTURE_PATH,
+)
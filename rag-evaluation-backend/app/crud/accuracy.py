@@ -1,13 +1,25 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Callable, List, Optional, Dict, Any, Tuple
 
-from sqlalchemy import func, case
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, case, cast, column, insert, literal, or_, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
-from app.models.accuracy import AccuracyTest, AccuracyTestItem, AccuracyHumanAssignment
+from app.models.accuracy import (
+    AccuracyTest,
+    AccuracyTestItem,
+    AccuracyHumanAssignment,
+    AccuracyHumanAssignmentItem,
+)
 from app.models.question import Question
 from app.models.rag_answer import RagAnswer
 
 
+# 已产生最终评分的评测项状态；reused 表示沿用基线测试的评分
+COMPLETED_ITEM_STATUSES = ("ai_completed", "human_completed", "both_completed", "reused")
+
+
 def create_accuracy_test(db: Session, *, data: Dict[str, Any]) -> AccuracyTest:
     db_obj = AccuracyTest(**data)
     db.add(db_obj)
@@ -23,26 +35,146 @@ def save_accuracy_test(db: Session, test: AccuracyTest) -> AccuracyTest:
     return test
 
 
-def list_questions_by_dataset(db: Session, dataset_id: str) -> List[Question]:
-    return db.query(Question).filter(Question.dataset_id == dataset_id).all()
+def create_accuracy_test_with_items(
+    db: Session,
+    *,
+    data: Dict[str, Any],
+    version: Optional[str] = None,
+    baseline_test_id: Optional[str] = None,
+    before_commit: Optional[Callable[[AccuracyTest], None]] = None,
+) -> AccuracyTest:
+    """
+    Create a test and all of its items in one transaction.
+
+    With ``baseline_test_id`` set, items whose content matches a scored item of
+    the baseline take over its final score and start out as ``reused``.
+    ``before_commit`` is called with the new test once its items exist, still
+    inside the transaction.
+    """
+    db_obj = AccuracyTest(**data)
+    db.add(db_obj)
+    db.flush()
 
+    db_obj.total_questions = insert_items_for_latest_answers(
+        db,
+        test_id=db_obj.id,
+        dataset_id=db_obj.dataset_id,
+        version=version,
+    )
 
-def get_latest_rag_answer(
+    if baseline_test_id:
+        reused = reuse_baseline_item_scores(db, test_id=db_obj.id, baseline_test_id=baseline_test_id)
+        db_obj.processed_questions = reused
+        db_obj.success_questions = reused
+
+    if before_commit:
+        before_commit(db_obj)
+
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def insert_items_for_latest_answers(
     db: Session,
     *,
-    question_id: str,
+    test_id: str,
+    dataset_id: str,
     version: Optional[str] = None,
-) -> Optional[RagAnswer]:
-    query = db.query(RagAnswer).filter(RagAnswer.question_id == question_id)
+) -> int:
+    """
+    INSERT ... SELECT one pending item per question of the dataset that has an answer.
+
+    DISTINCT ON keeps the newest answer of each question (for the given version),
+    so the whole dataset is resolved in a single statement. Answers created at
+    the same instant are ordered by id, so the pick is deterministic.
+    """
+    latest = select(
+        Question.id.label("question_id"),
+        Question.created_at.label("question_created_at"),
+        RagAnswer.id.label("rag_answer_id"),
+        func.md5(
+            Question.question_text
+            + func.chr(31)
+            + func.coalesce(Question.standard_answer, "")
+            + func.chr(31)
+            + RagAnswer.answer
+        ).label("content_hash"),
+    ).join(
+        RagAnswer, RagAnswer.question_id == Question.id
+    ).where(
+        Question.dataset_id == dataset_id
+    )
     if version:
-        query = query.filter(RagAnswer.version == version)
-    return query.order_by(RagAnswer.created_at.desc()).first()
-
+        latest = latest.where(RagAnswer.version == version)
+    latest = latest.distinct(Question.id).order_by(
+        Question.id, RagAnswer.created_at.desc(), RagAnswer.id.desc()
+    ).subquery()
+
+    rows = select(
+        func.uuid_generate_v4(),
+        literal(test_id, AccuracyTestItem.evaluation_id.type),
+        latest.c.question_id,
+        latest.c.rag_answer_id,
+        func.row_number().over(order_by=(latest.c.question_created_at, latest.c.question_id)),
+        literal("pending"),
+        latest.c.content_hash,
+    )
 
-def bulk_save_accuracy_items(db: Session, items: List[AccuracyTestItem]) -> None:
-    if items:
-        db.bulk_save_objects(items)
-    db.commit()
+    result = db.execute(
+        insert(AccuracyTestItem).from_select(
+            ["id", "evaluation_id", "question_id", "rag_answer_id", "sequence_number", "status", "content_hash"],
+            rows,
+        )
+    )
+    return result.rowcount
+
+
+def reuse_baseline_item_scores(db: Session, *, test_id: str, baseline_test_id: str) -> int:
+    """
+    Copy final scores from the baseline test onto items with the same content hash.
+
+    One UPDATE ... FROM; the matched items become ``reused`` and record their
+    source in ``item_metadata``. Does not commit. Returns the number of items reused.
+    """
+    baseline = select(
+        AccuracyTestItem.id,
+        AccuracyTestItem.content_hash,
+        AccuracyTestItem.final_score,
+        AccuracyTestItem.final_dimension_scores,
+        AccuracyTestItem.final_evaluation_reason,
+        AccuracyTestItem.final_evaluation_type,
+    ).where(
+        AccuracyTestItem.evaluation_id == baseline_test_id,
+        AccuracyTestItem.status.in_(COMPLETED_ITEM_STATUSES),
+        AccuracyTestItem.final_score.isnot(None),
+        AccuracyTestItem.content_hash.isnot(None),
+    ).distinct(
+        AccuracyTestItem.content_hash
+    ).order_by(
+        AccuracyTestItem.content_hash, AccuracyTestItem.sequence_number
+    ).subquery()
+
+    result = db.execute(
+        update(AccuracyTestItem)
+        .where(
+            AccuracyTestItem.evaluation_id == test_id,
+            AccuracyTestItem.content_hash == baseline.c.content_hash,
+        )
+        .values(
+            status="reused",
+            final_score=baseline.c.final_score,
+            final_dimension_scores=baseline.c.final_dimension_scores,
+            final_evaluation_reason=baseline.c.final_evaluation_reason,
+            final_evaluation_type=baseline.c.final_evaluation_type,
+            item_metadata=func.jsonb_build_object(
+                "reused_from_test_id", literal(baseline_test_id, AccuracyTestItem.evaluation_id.type),
+                "reused_from_item_id", baseline.c.id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
 
 
 def list_accuracy_tests_by_project(db: Session, project_id: str) -> List[AccuracyTest]:
@@ -67,15 +199,40 @@ def get_accuracy_test(db: Session, test_id: str) -> Optional[AccuracyTest]:
     return db.query(AccuracyTest).filter(AccuracyTest.id == test_id).first()
 
 
+def get_accuracy_test_for_update(db: Session, test_id: str) -> Optional[AccuracyTest]:
+    """Load a test and lock its row until the current transaction ends."""
+    return db.query(AccuracyTest).filter(
+        AccuracyTest.id == test_id
+    ).populate_existing().with_for_update().first()
+
+
+def _filter_accuracy_items(query, *, status: Optional[str], score: Optional[float]):
+    if status:
+        query = query.filter(AccuracyTestItem.status == status)
+
+    if score is not None:
+        query = query.filter(AccuracyTestItem.final_score == score)
+
+    return query
+
+
 def get_accuracy_test_items(
     db: Session,
     *,
     test_id: str,
     limit: int,
-    offset: int,
+    offset: int = 0,
     status: Optional[str] = None,
     score: Optional[float] = None,
-) -> Tuple[List[Tuple[AccuracyTestItem, str, str, str]], int]:
+    after: Optional[Tuple[int, str]] = None,
+) -> List[Tuple[AccuracyTestItem, str, str, str]]:
+    """
+    One page of a test's items in (sequence_number, id) order.
+
+    With ``after`` set, the page starts right after that key (keyset
+    pagination, served from the (evaluation_id, sequence_number, id) index)
+    and ``offset`` is ignored.
+    """
     query = db.query(
         AccuracyTestItem,
         Question.question_text.label("question_content"),
@@ -88,19 +245,38 @@ def get_accuracy_test_items(
     ).filter(
         AccuracyTestItem.evaluation_id == test_id
     )
+    query = _filter_accuracy_items(query, status=status, score=score)
 
-    if status:
-        query = query.filter(AccuracyTestItem.status == status)
+    if after is not None:
+        query = query.filter(
+            tuple_(AccuracyTestItem.sequence_number, AccuracyTestItem.id) > tuple_(
+                literal(after[0], AccuracyTestItem.sequence_number.type),
+                literal(after[1], AccuracyTestItem.id.type),
+            )
+        )
 
-    if score is not None:
-        query = query.filter(AccuracyTestItem.final_score == score)
+    query = query.order_by(
+        AccuracyTestItem.sequence_number.asc(),
+        AccuracyTestItem.id.asc(),
+    )
+    if after is None and offset:
+        query = query.offset(offset)
 
-    total_count = query.count()
-    items = query.order_by(
-        AccuracyTestItem.sequence_number.asc()
-    ).offset(offset).limit(limit).all()
+    return query.limit(limit).all()
 
-    return items, total_count
+
+def count_accuracy_test_items(
+    db: Session,
+    *,
+    test_id: str,
+    status: Optional[str] = None,
+    score: Optional[float] = None,
+) -> int:
+    """Count matching items on the items table alone, without the content joins."""
+    query = db.query(func.count(AccuracyTestItem.id)).filter(
+        AccuracyTestItem.evaluation_id == test_id
+    )
+    return _filter_accuracy_items(query, status=status, score=score).scalar() or 0
 
 
 def get_accuracy_test_item_by_question(
@@ -115,6 +291,101 @@ def get_accuracy_test_item_by_question(
     ).first()
 
 
+def list_items_for_ai_evaluation(
+    db: Session,
+    *,
+    test_id: str,
+    statuses: List[str],
+    item_ids: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[AccuracyTestItem, str, str, str]]:
+    query = db.query(
+        AccuracyTestItem,
+        Question.question_text,
+        Question.standard_answer,
+        RagAnswer.answer,
+    ).join(
+        Question, AccuracyTestItem.question_id == Question.id,
+    ).join(
+        RagAnswer, AccuracyTestItem.rag_answer_id == RagAnswer.id,
+    ).filter(
+        AccuracyTestItem.evaluation_id == test_id,
+        AccuracyTestItem.status.in_(statuses),
+    )
+    if item_ids is not None:
+        query = query.filter(AccuracyTestItem.id.in_(item_ids))
+
+    query = query.order_by(AccuracyTestItem.sequence_number.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def list_accuracy_item_rows_by_questions(
+    db: Session,
+    *,
+    test_id: str,
+    question_ids: List[str],
+) -> List[Dict[str, Any]]:
+    """Fetch the items of a test for the given questions as plain dicts."""
+    if not question_ids:
+        return []
+
+    table = AccuracyTestItem.__table__
+    rows = db.execute(
+        select(table).where(
+            table.c.evaluation_id == test_id,
+            table.c.question_id.in_(question_ids),
+        )
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+ITEM_RESULT_COLUMNS = (
+    "status",
+    "final_score",
+    "final_dimension_scores",
+    "final_evaluation_reason",
+    "final_evaluation_type",
+    "ai_score",
+    "ai_dimension_scores",
+    "ai_evaluation_reason",
+    "ai_evaluation_time",
+    "ai_raw_response",
+    "human_score",
+    "human_dimension_scores",
+    "human_evaluation_reason",
+    "human_evaluator_id",
+    "human_evaluation_time",
+)
+
+
+def bulk_update_accuracy_item_results(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write the result columns of many items with one UPDATE ... FROM (VALUES ...).
+
+    The caller owns the transaction; nothing is committed here.
+    """
+    if not rows:
+        return
+
+    table = AccuracyTestItem.__table__
+    names = ("id",) + ITEM_RESULT_COLUMNS
+    updates = values(
+        *[column(name, table.c[name].type) for name in names],
+        name="item_updates",
+    ).data([tuple(row.get(name) for name in names) for row in rows])
+
+    db.execute(
+        update(table)
+        .where(table.c.id == cast(updates.c.id, table.c.id.type))
+        .values({
+            name: cast(updates.c[name], table.c[name].type)
+            for name in ITEM_RESULT_COLUMNS
+        })
+    )
+
+
 def save_accuracy_test_item(db: Session, item: AccuracyTestItem) -> AccuracyTestItem:
     db.add(item)
     db.commit()
@@ -125,7 +396,7 @@ def save_accuracy_test_item(db: Session, item: AccuracyTestItem) -> AccuracyTest
 def list_accuracy_items_for_results(db: Session, test_id: str) -> List[AccuracyTestItem]:
     return db.query(AccuracyTestItem).filter(
         AccuracyTestItem.evaluation_id == test_id,
-        AccuracyTestItem.status.in_(["ai_completed", "human_completed", "both_completed"]),
+        AccuracyTestItem.status.in_(COMPLETED_ITEM_STATUSES),
     ).all()
 
 
@@ -134,7 +405,7 @@ def get_accuracy_test_stats(db: Session, test_id: str) -> Tuple[int, int, int]:
         func.count(AccuracyTestItem.id).label("total"),
         func.sum(
             case(
-                (AccuracyTestItem.status.in_(["ai_completed", "human_completed", "both_completed"]), 1),
+                (AccuracyTestItem.status.in_(COMPLETED_ITEM_STATUSES), 1),
                 else_=0,
             )
         ).label("processed"),
@@ -178,12 +449,221 @@ def create_human_assignment(db: Session, *, data: Dict[str, Any]) -> AccuracyHum
     return assignment
 
 
+def save_human_assignment(db: Session, assignment: AccuracyHumanAssignment) -> AccuracyHumanAssignment:
+    db.add(assignment)
+    db.commit()
+    db.refresh(assignment)
+    return assignment
+
+
 def list_human_assignments(db: Session, test_id: str) -> List[AccuracyHumanAssignment]:
     return db.query(AccuracyHumanAssignment).filter(
         AccuracyHumanAssignment.evaluation_id == test_id
     ).order_by(AccuracyHumanAssignment.assigned_at.desc()).all()
 
 
+def get_human_assignment_by_access_code_for_update(
+    db: Session,
+    access_code: str,
+) -> Optional[AccuracyHumanAssignment]:
+    return db.query(AccuracyHumanAssignment).filter(
+        AccuracyHumanAssignment.access_code == access_code
+    ).populate_existing().with_for_update().first()
+
+
+def _item_is_taken(now: datetime):
+    """An item is taken while it has a completed lease or an unexpired one."""
+    lease = AccuracyHumanAssignmentItem
+    return exists().where(
+        lease.item_id == AccuracyTestItem.id,
+        or_(lease.status == "completed", lease.lease_expires_at > now),
+    )
+
+
+def count_leasable_items(
+    db: Session,
+    *,
+    test_id: str,
+    statuses: List[str],
+    now: datetime,
+) -> int:
+    return db.query(func.count(AccuracyTestItem.id)).filter(
+        AccuracyTestItem.evaluation_id == test_id,
+        AccuracyTestItem.status.in_(statuses),
+        ~_item_is_taken(now),
+    ).scalar() or 0
+
+
+def count_active_leases(db: Session, *, assignment_id: str, now: datetime) -> int:
+    return db.query(func.count(AccuracyHumanAssignmentItem.id)).filter(
+        AccuracyHumanAssignmentItem.assignment_id == assignment_id,
+        AccuracyHumanAssignmentItem.status == "leased",
+        AccuracyHumanAssignmentItem.lease_expires_at > now,
+    ).scalar() or 0
+
+
+def lease_accuracy_items(
+    db: Session,
+    *,
+    assignment_id: str,
+    test_id: str,
+    statuses: List[str],
+    limit: int,
+    now: datetime,
+    expires_at: datetime,
+) -> List[str]:
+    """
+    Lease up to ``limit`` free items of a test to an assignment; does not commit.
+
+    Candidates are locked with FOR UPDATE SKIP LOCKED so concurrent graders pick
+    disjoint items without waiting on each other. The upsert only takes over a
+    lease row that has expired, which also covers a candidate whose lease was
+    committed by another grader after this statement's snapshot was taken.
+    Returns the ids of the items actually leased.
+    """
+    if limit <= 0:
+        return []
+
+    candidates = (
+        select(AccuracyTestItem.id)
+        .where(
+            AccuracyTestItem.evaluation_id == test_id,
+            AccuracyTestItem.status.in_(statuses),
+            ~_item_is_taken(now),
+        )
+        .order_by(AccuracyTestItem.sequence_number, AccuracyTestItem.id)
+        .limit(limit)
+        .with_for_update(of=AccuracyTestItem, skip_locked=True)
+        .cte("candidates")
+    )
+
+    lease_table = AccuracyHumanAssignmentItem.__table__
+    stmt = pg_insert(lease_table).from_select(
+        ["id", "assignment_id", "evaluation_id", "item_id", "status", "leased_at", "lease_expires_at"],
+        select(
+            func.uuid_generate_v4(),
+            literal(assignment_id, lease_table.c.assignment_id.type),
+            literal(test_id, lease_table.c.evaluation_id.type),
+            candidates.c.id,
+            literal("leased"),
+            literal(now, lease_table.c.leased_at.type),
+            literal(expires_at, lease_table.c.lease_expires_at.type),
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[lease_table.c.item_id],
+        set_={
+            "assignment_id": stmt.excluded.assignment_id,
+            "status": "leased",
+            "leased_at": stmt.excluded.leased_at,
+            "lease_expires_at": stmt.excluded.lease_expires_at,
+            "completed_at": None,
+        },
+        where=(lease_table.c.status == "leased") & (lease_table.c.lease_expires_at <= now),
+    ).returning(lease_table.c.item_id)
+
+    return [str(item_id) for item_id in db.execute(stmt).scalars().all()]
+
+
+def list_leased_items_with_content(
+    db: Session,
+    *,
+    assignment_id: str,
+    now: datetime,
+) -> List[Tuple[AccuracyTestItem, str, str, str]]:
+    return db.query(
+        AccuracyTestItem,
+        Question.question_text,
+        Question.standard_answer,
+        RagAnswer.answer,
+    ).join(
+        AccuracyHumanAssignmentItem,
+        AccuracyHumanAssignmentItem.item_id == AccuracyTestItem.id,
+    ).join(
+        Question, AccuracyTestItem.question_id == Question.id,
+    ).join(
+        RagAnswer, AccuracyTestItem.rag_answer_id == RagAnswer.id,
+    ).filter(
+        AccuracyHumanAssignmentItem.assignment_id == assignment_id,
+        AccuracyHumanAssignmentItem.status == "leased",
+        AccuracyHumanAssignmentItem.lease_expires_at > now,
+    ).order_by(AccuracyTestItem.sequence_number.asc()).all()
+
+
+def list_assignment_lease_rows_for_update(
+    db: Session,
+    *,
+    assignment_id: str,
+    item_ids: List[str],
+    now: datetime,
+) -> List[Dict[str, Any]]:
+    """
+    Lock the assignment's unexpired leases on the given items, with each item's
+    question id.
+
+    The items are locked before their leases, in the same order as
+    ``lease_accuracy_items``, so a submission and a concurrent lease taking
+    over an expired lease cannot deadlock.
+    """
+    if not item_ids:
+        return []
+
+    lease = AccuracyHumanAssignmentItem
+    db.execute(
+        select(AccuracyTestItem.id)
+        .join(lease, lease.item_id == AccuracyTestItem.id)
+        .where(
+            lease.assignment_id == assignment_id,
+            lease.item_id.in_(item_ids),
+        )
+        .order_by(AccuracyTestItem.id)
+        .with_for_update(of=AccuracyTestItem)
+    ).all()
+
+    rows = db.execute(
+        select(lease.id, lease.item_id, AccuracyTestItem.question_id)
+        .join(AccuracyTestItem, AccuracyTestItem.id == lease.item_id)
+        .where(
+            lease.assignment_id == assignment_id,
+            lease.status == "leased",
+            lease.lease_expires_at > now,
+            lease.item_id.in_(item_ids),
+        )
+        .with_for_update(of=lease)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def complete_leases(db: Session, *, lease_ids: List[str], now: datetime) -> None:
+    """Mark leases as completed; does not commit."""
+    if not lease_ids:
+        return
+
+    db.execute(
+        update(AccuracyHumanAssignmentItem)
+        .where(AccuracyHumanAssignmentItem.id.in_(lease_ids))
+        .values(status="completed", completed_at=now)
+    )
+
+
+def release_leases(
+    db: Session,
+    *,
+    assignment_id: str,
+    item_ids: Optional[List[str]] = None,
+) -> int:
+    stmt = delete(AccuracyHumanAssignmentItem).where(
+        AccuracyHumanAssignmentItem.assignment_id == assignment_id,
+        AccuracyHumanAssignmentItem.status == "leased",
+    )
+    if item_ids is not None:
+        stmt = stmt.where(AccuracyHumanAssignmentItem.item_id.in_(item_ids))
+
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+
 def list_running_tests(db: Session, project_id: str) -> List[AccuracyTest]:
     return db.query(AccuracyTest).filter(
         AccuracyTest.project_id == project_id,
@@ -1,10 +1,11 @@
 from typing import List, Optional, Dict, Any, Iterable, Tuple
 
-from sqlalchemy import func, or_, desc
+from sqlalchemy import desc, func, insert, literal, or_, select
 from sqlalchemy.orm import Session
 
 from app.models.dataset import Dataset, ProjectDataset
 from app.models.question import Question
+from app.models.rag_answer import RagAnswer
 from app.models.project import Project
 
 
@@ -259,6 +260,7 @@ def copy_dataset(
     source_dataset_id: str,
     user_id: str,
     new_name: Optional[str] = None,
+    rag_answer_versions: Optional[List[str]] = None,
 ) -> Optional[Dataset]:
     source_dataset = get_dataset(db, dataset_id=source_dataset_id)
     if not source_dataset:
@@ -277,31 +279,83 @@ def copy_dataset(
     )
 
     db.add(new_dataset)
-    db.commit()
-    db.refresh(new_dataset)
+    db.flush()
 
-    questions = db.query(Question).filter(
-        Question.dataset_id == source_dataset_id
-    ).all()
-
-    for question in questions:
-        new_question = Question(
-            dataset_id=new_dataset.id,
-            question_text=question.question_text,
-            standard_answer=question.standard_answer,
-            category=question.category,
-            difficulty=question.difficulty,
-            type=question.type,
-            tags=question.tags,
-            question_metadata=question.question_metadata,
-        )
-        db.add(new_question)
+    _copy_questions(
+        db,
+        source_dataset_id=source_dataset_id,
+        target_dataset_id=new_dataset.id,
+        rag_answer_versions=rag_answer_versions,
+    )
 
     db.commit()
-
+    db.refresh(new_dataset)
     return new_dataset
 
 
+def _copy_questions(
+    db: Session,
+    *,
+    source_dataset_id: str,
+    target_dataset_id: str,
+    rag_answer_versions: Optional[List[str]] = None,
+) -> None:
+    """
+    Copy the questions of a dataset, and optionally their RAG answers of the
+    given versions, with INSERT ... SELECT inside the database.
+
+    New question ids are generated in a CTE so answers can be re-pointed at the
+    copies in the same statement; no row passes through the application.
+    """
+    question_columns = [
+        Question.question_text,
+        Question.standard_answer,
+        Question.category,
+        Question.difficulty,
+        Question.type,
+        Question.tags,
+        Question.question_metadata,
+    ]
+    source = select(
+        Question.id.label("old_id"),
+        func.uuid_generate_v4().label("new_id"),
+        *question_columns,
+    ).where(Question.dataset_id == source_dataset_id).cte("source_questions")
+
+    copy_questions = insert(Question).from_select(
+        ["id", "dataset_id", *(column.key for column in question_columns)],
+        select(
+            source.c.new_id,
+            literal(target_dataset_id, Question.dataset_id.type),
+            *(source.c[column.key] for column in question_columns),
+        ),
+    )
+    if not rag_answer_versions:
+        db.execute(copy_questions)
+        return
+
+    # 回答不复制性能测试关联与创建时间
+    answer_columns = [
+        RagAnswer.answer,
+        RagAnswer.collection_method,
+        RagAnswer.sequence_number,
+        RagAnswer.first_response_time,
+        RagAnswer.total_response_time,
+        RagAnswer.character_count,
+        RagAnswer.characters_per_second,
+        RagAnswer.raw_response,
+        RagAnswer.version,
+        RagAnswer.attempt_count,
+    ]
+    copy_answers = insert(RagAnswer).from_select(
+        ["id", "question_id", *(column.key for column in answer_columns)],
+        select(func.uuid_generate_v4(), source.c.new_id, *answer_columns)
+        .join(source, RagAnswer.question_id == source.c.old_id)
+        .where(RagAnswer.version.in_(rag_answer_versions)),
+    ).add_cte(copy_questions.cte("copied_questions"))
+    db.execute(copy_answers)
+
+
 def list_datasets_with_question_count(
     db: Session,
     *,
@@ -1,3 +1,6 @@
+import io
+import json
+import uuid
 from typing import List, Optional, Dict, Any, Tuple
 
 from fastapi.encoders import jsonable_encoder
@@ -9,6 +12,17 @@ from app.models.rag_answer import RagAnswer
 from app.models.dataset import ProjectDataset
 from app.schemas.question import QuestionBase, QuestionImportWithRagAnswer
 
+# 批量导入时写入的问题字段（id、dataset_id 与时间戳除外）
+_QUESTION_FIELDS = (
+    "question_text",
+    "standard_answer",
+    "category",
+    "difficulty",
+    "type",
+    "tags",
+    "question_metadata",
+)
+
 
 def get_question(db: Session, question_id: str) -> Optional[Question]:
     return db.query(Question).filter(Question.id == question_id).first()
@@ -108,26 +122,89 @@ def create_question_with_rag_answer(
     return db_obj
 
 
-def create_questions_batch(
+def _copy_value(value: Any) -> str:
+    """A value in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(db: Session, table: str, columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    """Stream rows into ``table`` with ``COPY ... FROM STDIN`` on the session's connection."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row.get(name)) for name in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    # 使用会话当前连接，COPY 与其他写入处于同一事务
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+
+def bulk_create_questions(
     db: Session,
     *,
     dataset_id: str,
-    questions: List[QuestionBase],
-) -> List[Question]:
-    db_objs = []
+    questions: List[Dict[str, Any]],
+    rag_answers: Optional[List[Optional[Dict[str, Any]]]] = None,
+) -> List[str]:
+    """
+    Insert questions, and optionally one RAG answer each, with ``COPY`` in one
+    transaction and commit.
+
+    Ids are generated client-side so nothing is read back. ``rag_answers`` is
+    aligned with ``questions``; ``None`` entries get no answer. Returns the new
+    question ids in input order.
+    """
+    question_ids = [str(uuid.uuid4()) for _ in questions]
+    if not questions:
+        return question_ids
+
+    _copy_rows(
+        db,
+        Question.__tablename__,
+        ["id", "dataset_id", *_QUESTION_FIELDS],
+        [
+            {**payload, "id": question_id, "dataset_id": dataset_id}
+            for question_id, payload in zip(question_ids, questions)
+        ],
+    )
 
-    for item in questions:
-        obj_in_data = jsonable_encoder(item)
-        db_obj = Question(**obj_in_data, dataset_id=dataset_id)
-        db.add(db_obj)
-        db_objs.append(db_obj)
+    answer_rows = [
+        {"collection_method": "import", **answer, "id": str(uuid.uuid4()), "question_id": question_id}
+        for question_id, answer in zip(question_ids, rag_answers or [])
+        if answer
+    ]
+    if answer_rows:
+        answer_fields = sorted({name for row in answer_rows for name in row} - {"id", "question_id"})
+        _copy_rows(db, RagAnswer.__tablename__, ["id", "question_id", *answer_fields], answer_rows)
 
     db.commit()
+    return question_ids
 
-    for obj in db_objs:
-        db.refresh(obj)
 
-    return db_objs
+def create_questions_batch(
+    db: Session,
+    *,
+    dataset_id: str,
+    questions: List[QuestionBase],
+) -> List[str]:
+    return bulk_create_questions(
+        db,
+        dataset_id=dataset_id,
+        questions=[jsonable_encoder(item) for item in questions],
+    )
 
 
 def create_questions_with_rag_answers(
@@ -135,29 +212,13 @@ def create_questions_with_rag_answers(
     *,
     dataset_id: str,
     questions_data: List[Dict[str, Any]],
-) -> List[Question]:
-    created_questions = []
-
-    for item in questions_data:
-        payload = item.copy()
-        rag_answer_data = payload.pop("rag_answer", None)
-
-        question = Question(dataset_id=dataset_id, **payload)
-        db.add(question)
-        db.flush()
-
-        if rag_answer_data:
-            rag_answer = RagAnswer(question_id=question.id, **rag_answer_data)
-            db.add(rag_answer)
-
-        created_questions.append(question)
-
-    db.commit()
-
-    for question in created_questions:
-        db.refresh(question)
-
-    return created_questions
+) -> List[str]:
+    return bulk_create_questions(
+        db,
+        dataset_id=dataset_id,
+        questions=questions_data,
+        rag_answers=[item.get("rag_answer") for item in questions_data],
+    )
 
 
 def update_question(
@@ -327,32 +388,15 @@ def import_questions_with_rag_answers(
     *,
     dataset_id: str,
     questions_data: List[QuestionImportWithRagAnswer],
-) -> List[Question]:
-    imported_questions = []
-
-    for question_data in questions_data:
-        rag_answer_text = question_data.rag_answer
-        question_data_dict = question_data.dict(exclude={"rag_answer"})
-
-        question = Question(dataset_id=dataset_id, **question_data_dict)
-        db.add(question)
-        db.flush()
-
-        if rag_answer_text:
-            rag_answer = RagAnswer(
-                question_id=question.id,
-                answer_text=rag_answer_text,
-                collection_method="import",
-                source_system="import",
-                version="v1",
-            )
-            db.add(rag_answer)
-
-        imported_questions.append(question)
-
-    db.commit()
-
-    for question in imported_questions:
-        db.refresh(question)
-
-    return imported_questions
+) -> List[str]:
+    return bulk_create_questions(
+        db,
+        dataset_id=dataset_id,
+        questions=[item.model_dump(exclude={"rag_answer"}) for item in questions_data],
+        rag_answers=[
+            {"answer": item.rag_answer, "collection_method": "import", "version": "v1"}
+            if item.rag_answer
+            else None
+            for item in questions_data
+        ],
+    )
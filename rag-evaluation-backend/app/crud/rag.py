@@ -1,9 +1,12 @@
-from typing import List, Optional, Dict, Any, Tuple
+import uuid
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Set, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import cast, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from app.models.rag_answer import RagAnswer, ApiConfig
+from app.models.rag_answer import RagAnswer, ApiConfig, RagCollectionJob, RagCollectionJobItem
 from app.models.question import Question
 from app.models.dataset import ProjectDataset
 
@@ -12,6 +15,10 @@ def get_questions_by_ids(db: Session, question_ids: List[str]) -> List[Question]
     return db.query(Question).filter(Question.id.in_(question_ids)).all()
 
 
+def list_question_texts_by_ids(db: Session, question_ids: List[str]) -> List[Tuple[str, str]]:
+    return db.query(Question.id, Question.question_text).filter(Question.id.in_(question_ids)).all()
+
+
 def get_question(db: Session, question_id: str) -> Optional[Question]:
     return db.query(Question).filter(Question.id == question_id).first()
 
@@ -24,6 +31,58 @@ def create_rag_answer(db: Session, *, data: Dict[str, Any]) -> RagAnswer:
     return db_obj
 
 
+def get_answer_ids_by_question_and_version(
+    db: Session,
+    question_ids: List[str],
+    version: Optional[str],
+) -> Dict[str, str]:
+    """Existing answer id per question for ``version`` (NULL matches NULL), in one query."""
+    if not question_ids:
+        return {}
+    rows = db.execute(
+        select(RagAnswer.question_id, RagAnswer.id).where(
+            RagAnswer.question_id.in_(question_ids),
+            RagAnswer.version.is_not_distinct_from(version),
+        )
+    ).all()
+    return {str(question_id): str(answer_id) for question_id, answer_id in rows}
+
+
+def insert_rag_answers(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    *,
+    overwrite: bool = False,
+) -> Dict[str, str]:
+    """
+    Insert answers in one multi-row statement and commit.
+
+    On a (question_id, version) conflict the row is skipped, or with
+    ``overwrite`` the existing answer is updated in place and keeps its id.
+    Returns the answer id per question that was written.
+    """
+    table = RagAnswer.__table__
+    stmt = insert(table).values(rows)
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_question_version",
+            set_={
+                name: stmt.excluded[name]
+                for name in rows[0]
+                if name not in ("id", "question_id", "version")
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(constraint="unique_question_version")
+    written = db.execute(stmt.returning(table.c.question_id, table.c.id)).all()
+    db.commit()
+    return {str(question_id): str(answer_id) for question_id, answer_id in written}
+
+
+def rollback(db: Session) -> None:
+    db.rollback()
+
+
 def list_answers_by_question(
     db: Session,
     question_id: str,
@@ -125,3 +184,178 @@ def get_dataset_version_counts(db: Session, dataset_id: str) -> List[Tuple[Optio
     ).group_by(
         RagAnswer.version
     ).all()
+
+
+def create_collection_job(
+    db: Session,
+    *,
+    data: Dict[str, Any],
+    question_ids: List[str],
+) -> RagCollectionJob:
+    """Create a job with one pending item per question, in one transaction."""
+    job = RagCollectionJob(**data, total_questions=len(question_ids))
+    db.add(job)
+    db.flush()
+
+    items = [
+        {"id": str(uuid.uuid4()), "job_id": job.id, "question_id": question_id, "status": "pending"}
+        for question_id in question_ids
+    ]
+    for start in range(0, len(items), 5000):
+        db.execute(insert(RagCollectionJobItem.__table__), items[start:start + 5000])
+
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_collection_job(db: Session, job_id: str) -> Optional[RagCollectionJob]:
+    return db.query(RagCollectionJob).filter(RagCollectionJob.id == job_id).first()
+
+
+def touch_running_collection_job(db: Session, job_id: str) -> bool:
+    """Refresh a running job's ``updated_at`` so it is not taken for stale; False once it stopped running."""
+    result = db.execute(
+        update(RagCollectionJob)
+        .where(RagCollectionJob.id == job_id, RagCollectionJob.status == "running")
+        .values(updated_at=func.now())
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def transition_collection_job(
+    db: Session,
+    job_id: str,
+    *,
+    from_statuses: Tuple[str, ...],
+    to_status: str,
+    fields: Optional[Dict[str, Any]] = None,
+    stale_before: Optional[datetime] = None,
+) -> bool:
+    """
+    Move a job to ``to_status`` only if it is currently in ``from_statuses``.
+
+    With ``stale_before``, a running job also qualifies when it has not written
+    progress since then (its process is gone). Returns whether the job moved.
+    """
+    condition = RagCollectionJob.status.in_(from_statuses)
+    if stale_before is not None:
+        condition = condition | (
+            (RagCollectionJob.status == "running") & (RagCollectionJob.updated_at < stale_before)
+        )
+
+    result = db.execute(
+        update(RagCollectionJob)
+        .where(RagCollectionJob.id == job_id, condition)
+        .values(status=to_status, updated_at=func.now(), **(fields or {}))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def list_collection_job_question_ids(
+    db: Session,
+    job_id: str,
+    *,
+    statuses: Tuple[str, ...],
+) -> List[str]:
+    return [
+        str(question_id)
+        for question_id in db.execute(
+            select(RagCollectionJobItem.question_id).where(
+                RagCollectionJobItem.job_id == job_id,
+                RagCollectionJobItem.status.in_(statuses),
+            )
+        ).scalars()
+    ]
+
+
+def record_collection_job_outcomes(
+    db: Session,
+    job_id: str,
+    outcomes: List[Dict[str, Any]],
+) -> None:
+    """
+    Store per-question outcomes with one UPDATE ... FROM (VALUES ...), then
+    move the job's counters by how the items' statuses changed, and commit.
+    """
+    if not outcomes:
+        return
+
+    table = RagCollectionJobItem.__table__
+    previous_statuses = dict(
+        db.execute(
+            select(table.c.question_id, table.c.status)
+            .where(
+                table.c.job_id == job_id,
+                table.c.question_id.in_([outcome["question_id"] for outcome in outcomes]),
+            )
+            .with_for_update()
+        ).all()
+    )
+
+    names = ("question_id", "status", "answer_id", "attempt_count", "error")
+    updates = values(
+        *[column(name, table.c[name].type) for name in names],
+        name="item_outcomes",
+    ).data([tuple(outcome.get(name) for name in names) for outcome in outcomes])
+
+    db.execute(
+        update(table)
+        .where(
+            table.c.job_id == job_id,
+            table.c.question_id == cast(updates.c.question_id, table.c.question_id.type),
+        )
+        .values({
+            **{
+                name: cast(updates.c[name], table.c[name].type)
+                for name in names[1:]
+            },
+            "updated_at": func.now(),
+        })
+    )
+
+    # 只按本批条目的状态变化调整计数，避免每次刷新都对整个任务做 GROUP BY
+    current_statuses = {str(outcome["question_id"]): outcome["status"] for outcome in outcomes}
+    succeeded_delta = 0
+    failed_delta = 0
+    for question_id, previous in previous_statuses.items():
+        current = current_statuses[str(question_id)]
+        succeeded_delta += (current == "succeeded") - (previous == "succeeded")
+        failed_delta += (current == "failed") - (previous == "failed")
+
+    db.execute(
+        update(RagCollectionJob)
+        .where(RagCollectionJob.id == job_id)
+        .values(
+            succeeded_questions=RagCollectionJob.succeeded_questions + succeeded_delta,
+            failed_questions=RagCollectionJob.failed_questions + failed_delta,
+            updated_at=func.now(),
+        )
+    )
+    db.commit()
+
+
+def list_collection_job_results(
+    db: Session,
+    job_id: str,
+    *,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[RagCollectionJobItem]:
+    query = db.query(RagCollectionJobItem).filter(RagCollectionJobItem.job_id == job_id)
+    if status:
+        query = query.filter(RagCollectionJobItem.status == status)
+    return query.order_by(RagCollectionJobItem.question_id).offset(skip).limit(limit).all()
+
+
+def list_collection_job_errors(db: Session, job_id: str, *, limit: int) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(RagCollectionJobItem.question_id, RagCollectionJobItem.error)
+        .where(RagCollectionJobItem.job_id == job_id, RagCollectionJobItem.status == "failed")
+        .order_by(RagCollectionJobItem.updated_at.desc())
+        .limit(limit)
+    ).all()
+    return [{"question_id": str(question_id), "error": error} for question_id, error in rows]
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -14,6 +16,15 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎（asyncpg），供 async 端点与后台收集任务使用，避免数据库查询阻塞事件循环
+async_engine = create_async_engine(
+    make_url(database_url).set(drivername="postgresql+asyncpg"),
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # 依赖项，用于获取数据库会话
@@ -22,4 +33,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 异步依赖项：async 端点使用，已有的同步 crud/service 通过 run_sync 复用
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
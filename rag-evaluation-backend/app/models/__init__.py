@@ -6,8 +6,8 @@ from app.models.user_model_config import UserModelConfig
 from app.models.project import Project, EvaluationDimension
 from app.models.dataset import Dataset, ProjectDataset
 from app.models.question import Question
-from app.models.rag_answer import RagAnswer, ApiConfig
-from app.models.accuracy import AccuracyTest, AccuracyTestItem, AccuracyHumanAssignment
+from app.models.rag_answer import RagAnswer, ApiConfig, RagCollectionJob, RagCollectionJobItem
+from app.models.accuracy import AccuracyTest, AccuracyTestItem, AccuracyHumanAssignment, AccuracyHumanAssignmentItem
 from app.models.performance import PerformanceTest
 from app.models.report import Report
 
@@ -20,11 +20,14 @@ __all__ = [
     "Question",
     "RagAnswer",
     "ApiConfig",
+    "RagCollectionJob",
+    "RagCollectionJobItem",
     "ModelConfig",
     "UserModelConfig",
     "AccuracyTest",
     "AccuracyTestItem",
     "AccuracyHumanAssignment",
+    "AccuracyHumanAssignmentItem",
     "PerformanceTest",
     "Report",
 ]
@@ -40,6 +40,8 @@ class AccuracyTest(Base):
     
     # 评测结果汇总
     results_summary = Column(JSONB)
+    # 结果汇总的增量累加值（各维度分数和/计数、分数分布、评测类型计数），随评测项提交同步更新
+    result_aggregates = Column(JSONB)
     
     # 评测提示词
     prompt = Column(Text)
@@ -94,6 +96,8 @@ class AccuracyTestItem(Base):
     # 其他元数据
     sequence_number = Column(Integer)
     item_metadata = Column(JSONB)
+    # 问题、参考答案、回答的 md5，用于跨版本复用评分
+    content_hash = Column(String(32))
     
     # 关系
     evaluation = relationship("AccuracyTest", back_populates="items")
@@ -136,4 +140,27 @@ class AccuracyHumanAssignment(Base):
     created_by = Column(StringUUID, ForeignKey("users.id", ondelete="SET NULL"))
     
     # 关系
-    evaluation = relationship("AccuracyTest", back_populates="assignments") 
\ No newline at end of file
+    evaluation = relationship("AccuracyTest", back_populates="assignments")
+    leases = relationship("AccuracyHumanAssignmentItem", back_populates="assignment", cascade="all, delete-orphan")
+
+
+class AccuracyHumanAssignmentItem(Base):
+    """人工评测分配明细表（评测项租约）"""
+    __tablename__ = "accuracy_human_assignment_items"
+
+    id = Column(StringUUID, primary_key=True, default=uuid.uuid4)
+    assignment_id = Column(StringUUID, ForeignKey("accuracy_human_assignments.id", ondelete="CASCADE"), nullable=False)
+    evaluation_id = Column(StringUUID, ForeignKey("accuracy_test.id", ondelete="CASCADE"), nullable=False)
+    # 每个评测项同一时间只属于一个分配：过期租约会被新的领取覆盖
+    item_id = Column(StringUUID, ForeignKey("accuracy_test_items.id", ondelete="CASCADE"), nullable=False, unique=True)
+
+    # 状态信息：leased（已领取）/ completed（已提交）
+    status = Column(String(20), nullable=False, default="leased")
+
+    # 时间信息
+    leased_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True))
+
+    # 关系
+    assignment = relationship("AccuracyHumanAssignment", back_populates="leases")
@@ -26,6 +26,7 @@ class RagAnswer(Base):
     raw_response = Column(JSONB)  # 原始响应数据
     
     version = Column(String(50), nullable=True)  # 版本信息
+    attempt_count = Column(Integer, nullable=True)  # API 收集时的请求次数（含重试）
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     performance_test_id = Column(StringUUID, ForeignKey("performance_tests.id", ondelete="SET NULL"), nullable=True)
@@ -57,3 +58,51 @@ class ApiConfig(Base):
     response_path = Column(String(255))  # 从响应中提取答案的路径
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now()) 
+
+
+class RagCollectionJob(Base):
+    """RAG回答后台收集任务表"""
+    __tablename__ = "rag_collection_jobs"
+
+    id = Column(StringUUID, primary_key=True, default=uuid.uuid4)
+    project_id = Column(StringUUID, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    created_by = Column(StringUUID, ForeignKey("users.id", ondelete="SET NULL"))
+    version = Column(String(50), nullable=True)  # 收集到的回答所属版本
+
+    # 状态信息：queued / running / completed / failed / cancelled
+    status = Column(String(20), nullable=False, default="queued")
+    # 收集参数（不含 API Key 等敏感信息，恢复任务时需重新提供接口配置）
+    settings = Column(JSONB)
+
+    # 进度
+    total_questions = Column(Integer, nullable=False, default=0)
+    succeeded_questions = Column(Integer, nullable=False, default=0)
+    failed_questions = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+
+    # 时间信息
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    # 运行中的任务每次写入时更新，用于识别进程退出后遗留的任务
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RagCollectionJobItem(Base):
+    """RAG回答收集任务明细表（每个问题的收集结果）"""
+    __tablename__ = "rag_collection_job_items"
+
+    id = Column(StringUUID, primary_key=True, default=uuid.uuid4)
+    job_id = Column(StringUUID, ForeignKey("rag_collection_jobs.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(StringUUID, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+
+    # 状态信息：pending / succeeded / failed
+    status = Column(String(20), nullable=False, default="pending")
+    answer_id = Column(StringUUID, ForeignKey("rag_answers.id", ondelete="SET NULL"))
+    attempt_count = Column(Integer)
+    error = Column(Text)
+    updated_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        UniqueConstraint('job_id', 'question_id', name='unique_collection_job_question'),
+    )
@@ -22,6 +22,7 @@ class AccuracyTestBase(BaseModel):
 class AccuracyTestCreate(AccuracyTestBase):
     project_id: UUID
     dataset_id: UUID
+    baseline_test_id: Optional[UUID] = Field(None, description="基线测试ID：内容完全相同的评测项沿用其最终评分")
 
 # 创建响应
 class AccuracyTestCreateResponse(AccuracyTestBase):
@@ -113,6 +114,23 @@ class AccuracyTestItemDetail(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+# 自一致性评分设置
+class SelfConsistencyConfig(BaseModel):
+    max_samples: int = Field(5, ge=1, le=10, description="单个评测项最多采样次数")
+    min_agreement: int = Field(3, ge=1, le=10, description="达成一致所需的采样数")
+    tolerance: float = Field(0.5, ge=0, description="各维度与中位数的最大偏差")
+
+# 后端 AI 评测请求
+class AIEvaluateRequest(BaseModel):
+    user_model_config_id: UUID
+    item_ids: Optional[List[UUID]] = None
+    limit: int = Field(20, gt=0, le=200)
+    concurrency: int = Field(5, gt=0, le=50)
+    judging_mode: str = Field("single", pattern="^(single|self_consistency)$")
+    self_consistency: SelfConsistencyConfig = Field(default_factory=SelfConsistencyConfig)
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    priority: Optional[str] = Field(None, pattern="^(interactive|normal|batch)$", description="调度优先级，默认取测试的 batch_settings.priority")
+
 # 人工评测任务创建
 class HumanAssignmentCreate(BaseModel):
     evaluation_id: UUID
@@ -138,6 +156,46 @@ class HumanAssignmentDetail(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+# 人工评测领取请求
+class HumanLeaseRequest(BaseModel):
+    count: int = Field(10, gt=0, le=100, description="本次领取的评测项数量")
+
+# 已领取的人工评测项
+class HumanLeasedItem(BaseModel):
+    id: UUID
+    question_id: UUID
+    sequence_number: Optional[int] = None
+    question_content: Optional[str] = None
+    reference_answer: Optional[str] = None
+    rag_answer_content: Optional[str] = None
+    ai_score: Optional[float] = None
+    ai_dimension_scores: Optional[Dict[str, float]] = None
+    ai_evaluation_reason: Optional[str] = None
+
+# 人工评测领取结果
+class HumanLeaseResponse(BaseModel):
+    assignment_id: UUID
+    evaluation_id: UUID
+    total_items: int
+    completed_items: int
+    lease_expires_at: datetime
+    items: List[HumanLeasedItem]
+
+# 人工评测释放请求（不传 item_ids 则释放全部未提交的评测项）
+class HumanReleaseRequest(BaseModel):
+    item_ids: Optional[List[UUID]] = None
+
+# 单个人工评测结果
+class HumanItemResult(BaseModel):
+    item_id: UUID
+    score: float
+    dimension_scores: Optional[Dict[str, float]] = None
+    evaluation_reason: Optional[str] = None
+
+# 人工评测结果提交
+class HumanResultsSubmit(BaseModel):
+    results: List[HumanItemResult] = Field(..., min_length=1)
+
 # 开始测试请求
 class StartAccuracyTestRequest(BaseModel):
     accuracy_test_id: UUID
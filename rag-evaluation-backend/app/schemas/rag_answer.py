@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from datetime import datetime
 import uuid
 
@@ -44,6 +44,7 @@ class RagAnswerOut(RagAnswerInDBBase):
 class RagAnswerDetail(RagAnswerInDBBase):
     raw_response: Optional[Dict[str, Any]] = None
     characters_per_second: Optional[float] = None
+    attempt_count: Optional[int] = None
 
 # API请求模型
 class ApiRequestConfig(BaseModel):
@@ -57,26 +58,61 @@ class ApiRequestConfig(BaseModel):
 class BatchCollectionRequest(BaseModel):
     project_id: str
     question_ids: List[str]
-    api_config: ApiRequestConfig
+    # 二选一：通用接口配置，或前端保存的 RAG 配置（含 type：custom / dify_chatflow / dify_flow / ragflow_chat）
+    api_config: Optional[ApiRequestConfig] = None
+    rag_config: Optional[Dict[str, Any]] = None
     concurrent_requests: int = 1
-    max_attempts: int = 1
+    max_attempts: int = Field(1, ge=1, le=10, description="单个问题的最大请求次数（含重试）")
+    version: Optional[str] = Field(None, max_length=50, description="收集到的回答所属版本")
+    overwrite: bool = Field(False, description="重新收集并覆盖该版本已有的回答；默认跳过已回答的问题")
+    coalesce: bool = Field(False, description="问题文本相同时只请求一次RAG接口，各问题仍分别保存回答")
     # source_system: str = "RAG系统"
     collect_performance: bool = True
 
+    @model_validator(mode="after")
+    def check_endpoint(self) -> "BatchCollectionRequest":
+        if (self.api_config is None) == (self.rag_config is None):
+            raise ValueError("api_config 与 rag_config 必须且只能提供一个")
+        # 未指定版本的回答不受唯一约束保护，无法按版本覆盖
+        if self.overwrite and not self.version:
+            raise ValueError("覆盖已有回答时必须指定 version")
+        return self
+
+class CollectionJobResume(BaseModel):
+    # 任务不保存 API Key 等敏感信息，恢复时需重新提供接口配置
+    api_config: Optional[ApiRequestConfig] = None
+    rag_config: Optional[Dict[str, Any]] = None
+
+    @model_validator(mode="after")
+    def check_endpoint(self) -> "CollectionJobResume":
+        if (self.api_config is None) == (self.rag_config is None):
+            raise ValueError("api_config 与 rag_config 必须且只能提供一个")
+        return self
+
 class BatchImportRequest(BaseModel):
     project_id: str
     answers: List[Dict[str, Any]]  # 包含question_id和answer的列表
     # source_system: str = "手动导入"
 
 class CollectionProgress(BaseModel):
+    """收集任务进度；每个问题的收集结果通过 /collect/{job_id}/results 分页查询"""
     total: int
     completed: int
     failed: int
     in_progress: int
-    status: str  # queued, running, completed, failed
+    status: str  # queued, running, completed, failed, cancelled
     job_id: Optional[str] = None
     errors: Optional[List[Dict[str, Any]]] = None
 
+class CollectionResult(BaseModel):
+    """单个问题的收集结果（原同步收集接口 results 列表中的条目）"""
+    question_id: str
+    status: str  # pending, succeeded, failed
+    success: bool
+    answer_id: Optional[str] = None
+    attempts: Optional[int] = None
+    error: Optional[str] = None
+
 # 批量创建RAG回答的请求模型
 class RagAnswerBatchCreate(BaseModel):
     items: List[RagAnswerCreate]
@@ -1,12 +1,17 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable, TypeVar
+import asyncio
+import base64
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, asc
+import copy
 import uuid
 import json
 import random
 import string
 from datetime import datetime, timedelta
 import logging
+import httpx
 from fastapi import HTTPException
 
 from app.models.accuracy import AccuracyTest, AccuracyTestItem, AccuracyHumanAssignment
@@ -18,16 +23,52 @@ from app.schemas.accuracy import (
     AccuracyTestProgress,
     AccuracyTestItemCreate,
     HumanAssignmentCreate,
+    AIEvaluateRequest,
 )
+from app.core.config import settings
+from app.core.http_client import http_clients
 from app.crud import accuracy as crud_accuracy
+from app.crud import model_config as crud_model_config
+from app.crud import user_model_config as crud_user_model_config
+from app.services.evaluation.accuracy.evaluator import (
+    LLMJudge,
+    SelfConsistencySettings,
+    build_prompt,
+    judge_once,
+    judge_with_self_consistency,
+)
+from app.services.evaluation.scheduler import scheduler
+from app.services.user_model_config_service import decrypt_user_api_key
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+COMPLETED_ITEM_STATUSES = crud_accuracy.COMPLETED_ITEM_STATUSES
+HUMAN_LEASABLE_ITEM_STATUSES = ["pending", "ai_completed"]
+# 自一致性采样需要一定的随机性
+SELF_CONSISTENCY_DEFAULT_TEMPERATURE = 0.7
+
 
 class AccuracyService:
-    def __init__(self, db: Session):
+    """
+    Accuracy test service.
+
+    ``run_ai_evaluation`` may be given an ``AsyncSession``: its database work
+    then runs through ``run_sync`` and does not block the event loop while the
+    judge model is called. The other methods are synchronous and need a
+    ``Session``.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
 
+    async def _run_sync(self, method: Callable[..., T], *args: Any) -> T:
+        """Call a sync method of this service, through ``run_sync`` when the session is an AsyncSession."""
+        if not isinstance(self.db, AsyncSession):
+            return method(self, *args)
+        return await self.db.run_sync(lambda session: method(AccuracyService(session), *args))
+
     def create_test(self, data: AccuracyTestCreate, user_id: Optional[uuid.UUID] = None) -> AccuracyTest:
         test_data = {
             "project_id": data.project_id,
@@ -45,42 +86,35 @@ class AccuracyService:
             "status": "created",
             "created_by": user_id,
         }
-        test = crud_accuracy.create_accuracy_test(self.db, data=test_data)
-
-        questions = crud_accuracy.list_questions_by_dataset(self.db, data.dataset_id)
-
-        test_items = []
-        processed_question_ids = set()
-
-        for question in questions:
-            if str(question.id) in processed_question_ids:
-                continue
 
-            rag_answer = crud_accuracy.get_latest_rag_answer(
-                self.db,
-                question_id=question.id,
-                version=data.version,
-            )
-
-            if not rag_answer:
-                continue
-
-            test_item = AccuracyTestItem(
-                evaluation_id=test.id,
-                question_id=question.id,
-                rag_answer_id=rag_answer.id,
-                sequence_number=len(test_items) + 1,
-                status="pending",
-            )
-            test_items.append(test_item)
-            processed_question_ids.add(str(question.id))
+        if data.baseline_test_id:
+            baseline = crud_accuracy.get_accuracy_test(self.db, data.baseline_test_id)
+            if not baseline or str(baseline.project_id) != str(data.project_id):
+                raise ValueError("Baseline test not found in this project")
+            if baseline.scoring_method != data.scoring_method or sorted(baseline.dimensions or []) != sorted(data.dimensions):
+                raise ValueError("Baseline test uses a different scoring method or dimensions")
 
-        test.total_questions = len(test_items)
+        return crud_accuracy.create_accuracy_test_with_items(
+            self.db,
+            data=test_data,
+            version=data.version,
+            baseline_test_id=data.baseline_test_id,
+            before_commit=self._account_reused_items,
+        )
 
-        crud_accuracy.bulk_save_accuracy_items(self.db, test_items)
-        test = crud_accuracy.save_accuracy_test(self.db, test)
+    def _account_reused_items(self, test: AccuracyTest) -> None:
+        """Count reused scores into the aggregates; a test with nothing left to evaluate is completed."""
+        if not test.processed_questions:
+            return
 
-        return test
+        # 与复用在同一事务内写入结果汇总
+        test.result_aggregates = self._scan_result_aggregates(test.id)
+        if test.processed_questions >= test.total_questions:
+            now = datetime.utcnow()
+            test.status = "completed"
+            test.started_at = now
+            test.completed_at = now
+            test.results_summary = self._summarize_results(test)
 
     def get_tests_by_project(self, project_id: uuid.UUID) -> List[AccuracyTest]:
         return crud_accuracy.list_accuracy_tests_by_project(self.db, project_id)
@@ -95,16 +129,40 @@ class AccuracyService:
         offset: int = 0,
         status: Optional[str] = None,
         score: Optional[float] = None,
-    ) -> Tuple[List[Dict[str, Any]], int]:
-        items, total_count = crud_accuracy.get_accuracy_test_items(
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[str]]:
+        """
+        List a page of items with the total and a cursor for the next page.
+
+        Pass the returned cursor back to page by key instead of offset. The
+        unfiltered total is the test's own question count, so no count query runs.
+        """
+        items = crud_accuracy.get_accuracy_test_items(
             self.db,
             test_id=test_id,
             limit=limit,
             offset=offset,
             status=status,
             score=score,
+            after=self._decode_item_cursor(cursor) if cursor else None,
         )
 
+        if status is None and score is None:
+            test = crud_accuracy.get_accuracy_test(self.db, test_id)
+            total_count = (test.total_questions or 0) if test else 0
+        else:
+            total_count = crud_accuracy.count_accuracy_test_items(
+                self.db,
+                test_id=test_id,
+                status=status,
+                score=score,
+            )
+
+        next_cursor = None
+        if len(items) == limit:
+            last_item = items[-1][0]
+            next_cursor = self._encode_item_cursor(last_item.sequence_number, last_item.id)
+
         result = []
         for item, question_content, reference_answer, rag_answer_content in items:
             item_dict = {
@@ -133,7 +191,29 @@ class AccuracyService:
             }
             result.append(item_dict)
 
-        return result, total_count
+        return result, total_count, next_cursor
+
+    def _encode_item_cursor(self, sequence_number: int, item_id: Any) -> str:
+        raw = json.dumps([sequence_number, str(item_id)]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_item_cursor(self, cursor: str) -> Tuple[int, str]:
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        # 游标来自客户端，解码前先校验结构与类型
+        if (
+            not isinstance(decoded, list)
+            or len(decoded) != 2
+            or type(decoded[0]) is not int
+            or not isinstance(decoded[1], str)
+        ):
+            raise ValueError("Invalid cursor")
+        try:
+            return decoded[0], str(uuid.UUID(decoded[1]))
+        except ValueError:
+            raise ValueError("Invalid cursor")
 
     def start_test(self, test_id: uuid.UUID) -> Optional[AccuracyTest]:
         test = crud_accuracy.get_accuracy_test(self.db, test_id)
@@ -173,11 +253,12 @@ class AccuracyService:
         if test.status != "running":
             raise ValueError(f"Test status is {test.status}; cannot complete")
 
-        results_summary = self._calculate_test_results(test_id)
+        if test.result_aggregates is None:
+            test.result_aggregates = self._scan_result_aggregates(test_id)
 
         test.status = "completed"
         test.completed_at = datetime.utcnow()
-        test.results_summary = results_summary
+        test.results_summary = self._summarize_results(test)
 
         return crud_accuracy.save_accuracy_test(self.db, test)
 
@@ -196,136 +277,369 @@ class AccuracyService:
         return crud_accuracy.save_accuracy_test(self.db, test)
 
     def submit_test_item_results(self, test_id: uuid.UUID, items: List[Dict[str, Any]]) -> bool:
-        test = crud_accuracy.get_accuracy_test(self.db, test_id)
+        test = crud_accuracy.get_accuracy_test_for_update(self.db, test_id)
         if not test:
             raise ValueError("Test not found")
 
         if test.status != "running":
             raise ValueError(f"Test status is {test.status}; cannot submit results")
 
+        question_ids = list({str(item_data["id"]) for item_data in items if item_data.get("id")})
+        rows_by_question = {
+            str(row["question_id"]): row
+            for row in crud_accuracy.list_accuracy_item_rows_by_questions(
+                self.db,
+                test_id=test_id,
+                question_ids=question_ids,
+            )
+        }
+
+        now = datetime.utcnow()
+        aggregates = self._load_result_aggregates(test)
+        updated_rows: Dict[str, Dict[str, Any]] = {}
+        processed_delta = 0
+        failed_delta = 0
+
         for item_data in items:
             question_id = item_data.get("id")
             if not question_id:
                 continue
 
-            item = crud_accuracy.get_accuracy_test_item_by_question(
-                self.db,
-                test_id=test_id,
-                question_id=question_id,
-            )
-
-            if not item:
+            row = rows_by_question.get(str(question_id))
+            if row is None:
                 logger.warning(f"Missing test item: {question_id}")
                 continue
 
-            if "ai_score" in item_data:
-                item.ai_score = item_data.get("ai_score")
-                item.ai_dimension_scores = item_data.get("ai_dimension_scores")
-                item.ai_evaluation_reason = item_data.get("ai_evaluation_reason")
-                item.ai_raw_response = item_data.get("ai_raw_response")
-                item.ai_evaluation_time = datetime.utcnow()
-
-                if test.evaluation_type == "ai" or not item.human_score:
-                    item.final_score = item.ai_score
-                    item.final_dimension_scores = item.ai_dimension_scores
-                    item.final_evaluation_reason = item.ai_evaluation_reason
-                    item.final_evaluation_type = "ai"
-                    logger.info(
-                        "Set final AI score item_id=%s score=%s",
-                        item.id,
-                        item.final_score,
-                    )
-
-            if "human_score" in item_data:
-                item.human_score = item_data.get("human_score")
-                item.human_dimension_scores = item_data.get("human_dimension_scores")
-                item.human_evaluation_reason = item_data.get("human_evaluation_reason")
-                item.human_evaluator_id = item_data.get("human_evaluator_id")
-                item.human_evaluation_time = datetime.utcnow()
-
-                if test.evaluation_type in ["manual", "hybrid"]:
-                    item.final_score = item.human_score
-                    item.final_dimension_scores = item.human_dimension_scores
-                    item.final_evaluation_reason = item.human_evaluation_reason
-                    item.final_evaluation_type = "human"
-                    logger.info(
-                        "Set final human score item_id=%s score=%s",
-                        item.id,
-                        item.final_score,
-                    )
-
-            if "status" in item_data:
-                item.status = item_data.get("status")
-            else:
-                if item.status == "pending":
-                    item.status = "ai_completed" if test.evaluation_type == "ai" else "human_completed"
-                elif item.status in ["ai_completed", "human_completed"]:
-                    item.status = "both_completed"
+            previous_status = row["status"]
+            self._apply_result_contribution(aggregates, self._contribution_of_row(row), sign=-1)
+            self._apply_item_result(test, row, item_data, now)
+            self._apply_result_contribution(aggregates, self._contribution_of_row(row))
+
+            processed_delta += (row["status"] in COMPLETED_ITEM_STATUSES) - (previous_status in COMPLETED_ITEM_STATUSES)
+            failed_delta += (row["status"] == "failed") - (previous_status == "failed")
+            updated_rows[str(row["id"])] = row
+
+        crud_accuracy.bulk_update_accuracy_item_results(self.db, list(updated_rows.values()))
+
+        test.processed_questions = (test.processed_questions or 0) + processed_delta
+        test.failed_questions = (test.failed_questions or 0) + failed_delta
+        test.success_questions = test.processed_questions - test.failed_questions
+        test.result_aggregates = aggregates
 
-            crud_accuracy.save_accuracy_test_item(self.db, item)
+        if test.processed_questions + test.failed_questions >= test.total_questions:
+            test.status = "completed"
+            test.completed_at = now
+            test.results_summary = self._summarize_results(test)
 
-        self._update_test_status(test_id)
+        crud_accuracy.save_accuracy_test(self.db, test)
 
         return True
 
-    def _update_test_status(self, test_id: uuid.UUID) -> None:
-        total, processed, failed = crud_accuracy.get_accuracy_test_stats(self.db, test_id)
-        test = crud_accuracy.get_accuracy_test(self.db, test_id)
+    async def run_ai_evaluation(
+        self,
+        test_id: uuid.UUID,
+        user_id: uuid.UUID,
+        request: AIEvaluateRequest,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Judge a batch of the test's items with an LLM and record the results.
+
+        In ``self_consistency`` mode every item is sampled several times and the
+        aggregate of the agreeing samples is stored in ``ai_dimension_scores``;
+        the per-dimension variance and the individual samples go to
+        ``ai_raw_response``.
+        """
+        prepared = await self._run_sync(AccuracyService._prepare_ai_evaluation, test_id, user_id, request)
+        if prepared is None:
+            return None
 
-        if test:
-            test.processed_questions = processed
-            test.failed_questions = failed
-            test.success_questions = processed - failed
+        judge_config, priority, work = prepared
+        if not work:
+            return {"evaluated": 0, "failed": 0, "errors": []}
 
-            if test.status == "running" and test.processed_questions + test.failed_questions >= test.total_questions:
-                test.status = "completed"
-                test.completed_at = datetime.utcnow()
-                test.results_summary = self._calculate_test_results(test_id)
+        consistency = SelfConsistencySettings(**request.self_consistency.model_dump())
+        temperature = request.temperature
+        if request.judging_mode == "self_consistency" and temperature is None:
+            temperature = SELF_CONSISTENCY_DEFAULT_TEMPERATURE
 
-            crud_accuracy.save_accuracy_test(self.db, test)
+        if temperature is not None:
+            judge_config["params"] = {**judge_config["params"], "temperature": temperature}
 
-    def _calculate_test_results(self, test_id: uuid.UUID) -> Dict[str, Any]:
+        judge = LLMJudge(
+            http_clients.get(judge_config["api_base"]),
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            max_concurrency=request.concurrency,
+            slot=lambda: scheduler.slot("accuracy", str(test_id), priority=priority),
+            **judge_config,
+        )
+
+        async def evaluate(question_id: str, prompt: str) -> Dict[str, Any]:
+            try:
+                if request.judging_mode == "self_consistency":
+                    result = await judge_with_self_consistency(judge, prompt, consistency)
+                else:
+                    result = await judge_once(judge, prompt)
+            except Exception as exc:
+                logger.warning("AI evaluation failed question_id=%s error=%s", question_id, exc)
+                return {"id": question_id, "ai_error": str(exc)}
+
+            return {
+                "id": question_id,
+                "ai_score": result.score,
+                "ai_dimension_scores": result.dimension_scores,
+                "ai_evaluation_reason": result.evaluation_reason,
+                "ai_raw_response": result.raw_response,
+            }
+
+        results = await asyncio.gather(*(evaluate(question_id, prompt) for question_id, prompt in work))
+
+        await self._run_sync(AccuracyService.submit_test_item_results, test_id, list(results))
+
+        errors = [
+            {"question_id": result["id"], "error": result["ai_error"]}
+            for result in results
+            if "ai_error" in result
+        ]
+        return {
+            "evaluated": len(results) - len(errors),
+            "failed": len(errors),
+            "errors": errors[:20],
+        }
+
+    def _prepare_ai_evaluation(
+        self,
+        test_id: uuid.UUID,
+        user_id: uuid.UUID,
+        request: AIEvaluateRequest,
+    ) -> Optional[Tuple[Dict[str, Any], Optional[str], List[Tuple[str, str]]]]:
+        """Judge model config, scheduling priority and (question id, prompt) pairs for one batch."""
         test = crud_accuracy.get_accuracy_test(self.db, test_id)
         if not test:
-            logger.error("Test not found: %s", test_id)
-            return {}
+            return None
 
-        items = crud_accuracy.list_accuracy_items_for_results(self.db, test_id)
-        logger.info("Calculating results test_id=%s items=%s", test_id, len(items))
+        if test.status != "running":
+            raise ValueError(f"Test status is {test.status}; cannot evaluate")
+        if test.evaluation_type not in ["ai", "hybrid"]:
+            raise ValueError(f"Evaluation type {test.evaluation_type} does not support AI evaluation")
+        if not test.prompt_template:
+            raise ValueError("Test has no prompt template")
+
+        judge_config = self._resolve_judge_model(user_id, request.user_model_config_id)
+        priority = request.priority or (test.batch_settings or {}).get("priority")
+        statuses = ["pending"] if test.evaluation_type == "ai" else ["pending", "human_completed"]
+        rows = crud_accuracy.list_items_for_ai_evaluation(
+            self.db,
+            test_id=test_id,
+            statuses=statuses,
+            item_ids=[str(item_id) for item_id in request.item_ids] if request.item_ids is not None else None,
+            limit=request.limit,
+        )
+        work = [
+            (str(item.question_id), build_prompt(test.prompt_template, question, reference, answer))
+            for item, question, reference, answer in rows
+        ]
+        # 结束只读事务，避免在等待模型响应期间长时间占用连接
+        crud_accuracy.rollback(self.db)
+        return judge_config, priority, work
+
+    def _resolve_judge_model(self, user_id: uuid.UUID, user_model_config_id: uuid.UUID) -> Dict[str, Any]:
+        user_config = crud_user_model_config.get_user_model_config(self.db, user_id, user_model_config_id)
+        if not user_config or not user_config.is_active:
+            raise ValueError("Model config not found or inactive")
+
+        model_config = crud_model_config.get_model_config(self.db, user_config.model_config_id)
+        if not model_config or not model_config.api_base:
+            raise ValueError("Model config has no API base")
+
+        api_key, _ = decrypt_user_api_key(self.db, user_config)
+        return {
+            "api_base": model_config.api_base,
+            "api_key": api_key,
+            "model": model_config.model,
+            "params": model_config.default_params or {},
+        }
+
+    def _contribution_of_row(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self._item_result_contribution(
+            status=row["status"],
+            final_score=row["final_score"],
+            final_dimension_scores=row["final_dimension_scores"],
+            final_evaluation_type=row["final_evaluation_type"],
+        )
+
+    def _apply_item_result(
+        self,
+        test: AccuracyTest,
+        item: Dict[str, Any],
+        item_data: Dict[str, Any],
+        now: datetime,
+    ) -> None:
+        """Merge one submitted result into an item row held in memory."""
+        if "ai_error" in item_data:
+            # AI 评测出错只记录原因，不改变状态：人工结果保持有效，待评条目可再次评测
+            item["ai_evaluation_reason"] = f"AI评测失败: {item_data['ai_error']}"
+            item["ai_evaluation_time"] = now
+            return
+
+        if "ai_score" in item_data:
+            item["ai_score"] = item_data.get("ai_score")
+            item["ai_dimension_scores"] = item_data.get("ai_dimension_scores")
+            item["ai_evaluation_reason"] = item_data.get("ai_evaluation_reason")
+            item["ai_raw_response"] = item_data.get("ai_raw_response")
+            item["ai_evaluation_time"] = now
+
+            if test.evaluation_type == "ai" or not item["human_score"]:
+                item["final_score"] = item["ai_score"]
+                item["final_dimension_scores"] = item["ai_dimension_scores"]
+                item["final_evaluation_reason"] = item["ai_evaluation_reason"]
+                item["final_evaluation_type"] = "ai"
+
+        if "human_score" in item_data:
+            item["human_score"] = item_data.get("human_score")
+            item["human_dimension_scores"] = item_data.get("human_dimension_scores")
+            item["human_evaluation_reason"] = item_data.get("human_evaluation_reason")
+            item["human_evaluator_id"] = item_data.get("human_evaluator_id")
+            item["human_evaluation_time"] = now
+
+            if test.evaluation_type in ["manual", "hybrid"]:
+                item["final_score"] = item["human_score"]
+                item["final_dimension_scores"] = item["human_dimension_scores"]
+                item["final_evaluation_reason"] = item["human_evaluation_reason"]
+                item["final_evaluation_type"] = "human"
+
+        if "status" in item_data:
+            item["status"] = item_data.get("status")
+        elif item["status"] == "pending":
+            item["status"] = "ai_completed" if test.evaluation_type == "ai" else "human_completed"
+        elif item["status"] in ["ai_completed", "human_completed", "reused"]:
+            item["status"] = "both_completed"
+
+    def recalculate_test_results(self, test_id: uuid.UUID) -> Optional[AccuracyTest]:
+        """
+        Rebuild progress counters and result aggregates from the items table.
+
+        Submissions keep both up to date incrementally; this full scan is a repair
+        action for tests whose counters drifted, e.g. after editing items by hand.
+        """
+        test = crud_accuracy.get_accuracy_test_for_update(self.db, test_id)
+        if not test:
+            return None
+
+        _, processed, failed = crud_accuracy.get_accuracy_test_stats(self.db, test_id)
+        test.processed_questions = processed
+        test.failed_questions = failed
+        test.success_questions = processed - failed
+        test.result_aggregates = self._scan_result_aggregates(test_id)
+
+        if test.status == "running" and test.processed_questions + test.failed_questions >= test.total_questions:
+            test.status = "completed"
+            test.completed_at = datetime.utcnow()
+
+        if test.status == "completed":
+            test.results_summary = self._summarize_results(test)
 
-        total_score = 0
-        dimension_totals = {}
-        dimension_counts = {}
+        return crud_accuracy.save_accuracy_test(self.db, test)
+
+    def _load_result_aggregates(self, test: AccuracyTest) -> Dict[str, Any]:
+        if test.result_aggregates is not None:
+            return copy.deepcopy(test.result_aggregates)
+        if not test.processed_questions:
+            return self._empty_result_aggregates()
+        # Tests created before aggregates existed are backfilled once.
+        return self._scan_result_aggregates(test.id)
 
+    def _scan_result_aggregates(self, test_id: uuid.UUID) -> Dict[str, Any]:
+        items = crud_accuracy.list_accuracy_items_for_results(self.db, test_id)
+        logger.info("Rebuilding result aggregates test_id=%s items=%s", test_id, len(items))
+
+        aggregates = self._empty_result_aggregates()
         for item in items:
-            if item.final_score is not None:
-                try:
-                    total_score += float(item.final_score)
-                    if item.final_dimension_scores:
-                        for dim, score in item.final_dimension_scores.items():
-                            if dim not in dimension_totals:
-                                dimension_totals[dim] = 0
-                                dimension_counts[dim] = 0
-
-                            if score is not None:
-                                try:
-                                    score_float = float(score)
-                                    dimension_totals[dim] += score_float
-                                    dimension_counts[dim] += 1
-                                except (TypeError, ValueError) as exc:
-                                    logger.warning("Invalid dimension score dim=%s score=%s", dim, score)
-                                    continue
-                except (TypeError, ValueError):
-                    logger.warning("Invalid final score item_id=%s score=%s", item.id, item.final_score)
-                    continue
+            self._apply_result_contribution(
+                aggregates,
+                self._item_result_contribution(
+                    status=item.status,
+                    final_score=item.final_score,
+                    final_dimension_scores=item.final_dimension_scores,
+                    final_evaluation_type=item.final_evaluation_type,
+                ),
+            )
+        return aggregates
+
+    def _empty_result_aggregates(self) -> Dict[str, Any]:
+        return {
+            "total_evaluated": 0,
+            "dimension_sums": {},
+            "dimension_counts": {},
+            "score_distribution": {"5": 0, "4": 0, "3": 0, "2": 0, "1": 0, "0": 0},
+            "evaluation_types": {"ai": 0, "human": 0},
+        }
+
+    def _item_result_contribution(
+        self,
+        *,
+        status: Optional[str],
+        final_score: Any,
+        final_dimension_scores: Optional[Dict[str, Any]],
+        final_evaluation_type: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """What a single item adds to the result aggregates, or None if it adds nothing."""
+        if status not in COMPLETED_ITEM_STATUSES:
+            return None
+
+        dimensions = {}
+        bucket = None
+        if final_score is not None:
+            try:
+                bucket = str(int(round(float(final_score))))
+            except (TypeError, ValueError):
+                logger.warning("Invalid final score score=%s", final_score)
+            else:
+                for dim, score in (final_dimension_scores or {}).items():
+                    if score is None:
+                        continue
+                    try:
+                        dimensions[dim] = float(score)
+                    except (TypeError, ValueError):
+                        logger.warning("Invalid dimension score dim=%s score=%s", dim, score)
+
+        return {
+            "dimensions": dimensions,
+            "bucket": bucket,
+            "evaluation_type": final_evaluation_type,
+        }
+
+    def _apply_result_contribution(
+        self,
+        aggregates: Dict[str, Any],
+        contribution: Optional[Dict[str, Any]],
+        sign: int = 1,
+    ) -> None:
+        if contribution is None:
+            return
+
+        aggregates["total_evaluated"] += sign
+
+        sums = aggregates["dimension_sums"]
+        counts = aggregates["dimension_counts"]
+        for dim, score in contribution["dimensions"].items():
+            sums[dim] = sums.get(dim, 0) + sign * score
+            counts[dim] = counts.get(dim, 0) + sign
+
+        distribution = aggregates["score_distribution"]
+        if contribution["bucket"] in distribution:
+            distribution[contribution["bucket"]] += sign
+
+        evaluation_types = aggregates["evaluation_types"]
+        if contribution["evaluation_type"] in evaluation_types:
+            evaluation_types[contribution["evaluation_type"]] += sign
+
+    def _summarize_results(self, test: AccuracyTest) -> Dict[str, Any]:
+        aggregates = test.result_aggregates or self._empty_result_aggregates()
 
         dimension_scores = {}
-        for dim in dimension_totals:
-            if dimension_counts[dim] > 0:
-                try:
-                    dimension_scores[dim] = round(dimension_totals[dim] / dimension_counts[dim], 2)
-                except Exception:
-                    dimension_scores[dim] = 0
+        for dim, count in aggregates["dimension_counts"].items():
+            if count > 0:
+                dimension_scores[dim] = round(aggregates["dimension_sums"][dim] / count, 2)
 
         weights = test.weights or {dim: 1.0 for dim in test.dimensions}
         weighted_score = 0
@@ -342,18 +656,16 @@ class AccuracyService:
 
         overall_score = round(weighted_score / weight_sum, 2) if weight_sum > 0 else 0
 
-        results_summary = {
+        return {
             "overall_score": overall_score,
             "dimension_scores": dimension_scores,
-            "score_distribution": self._calculate_score_distribution(items),
-            "evaluation_types": self._calculate_evaluation_types(items),
-            "total_evaluated": len(items),
+            "score_distribution": dict(aggregates["score_distribution"]),
+            "evaluation_types": dict(aggregates["evaluation_types"]),
+            "total_evaluated": aggregates["total_evaluated"],
             "evaluation_type": test.evaluation_type,
             "scoring_method": test.scoring_method,
         }
 
-        return results_summary
-
     def create_human_assignment(
         self,
         data: HumanAssignmentCreate,
@@ -366,14 +678,14 @@ class AccuracyService:
         if test.evaluation_type not in ["manual", "hybrid"]:
             raise ValueError(f"Evaluation type {test.evaluation_type} does not support manual")
 
-        items = crud_accuracy.list_accuracy_items_by_status(
+        # 分配只记录配额，具体评测项由评测人员凭访问码按需领取（租约）
+        available = crud_accuracy.count_leasable_items(
             self.db,
             test_id=data.evaluation_id,
-            statuses=["pending", "ai_completed"],
-            limit=data.item_count,
+            statuses=HUMAN_LEASABLE_ITEM_STATUSES,
+            now=datetime.utcnow(),
         )
-
-        if not items:
+        if not available:
             raise ValueError("No items available for assignment")
 
         access_code = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
@@ -387,8 +699,8 @@ class AccuracyService:
             "access_code": access_code,
             "evaluator_name": data.evaluator_name,
             "evaluator_email": data.evaluator_email,
-            "item_ids": [str(item.id) for item in items],
-            "total_items": len(items),
+            "item_ids": [],
+            "total_items": min(data.item_count, available),
             "completed_items": 0,
             "status": "assigned",
             "is_active": True,
@@ -401,6 +713,145 @@ class AccuracyService:
     def get_human_assignments(self, test_id: uuid.UUID) -> List[AccuracyHumanAssignment]:
         return crud_accuracy.list_human_assignments(self.db, test_id)
 
+    def lease_human_items(self, access_code: str, count: int) -> Dict[str, Any]:
+        """Lease up to ``count`` more items to the grader holding ``access_code``."""
+        assignment = self._get_open_assignment_for_update(access_code)
+        test = crud_accuracy.get_accuracy_test(self.db, assignment.evaluation_id)
+        if not test or test.status != "running":
+            crud_accuracy.rollback(self.db)
+            raise ValueError("Test is not running")
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.HUMAN_ASSIGNMENT_LEASE_SECONDS)
+        held = crud_accuracy.count_active_leases(self.db, assignment_id=assignment.id, now=now)
+        quota = assignment.total_items - (assignment.completed_items or 0) - held
+
+        crud_accuracy.lease_accuracy_items(
+            self.db,
+            assignment_id=assignment.id,
+            test_id=assignment.evaluation_id,
+            statuses=HUMAN_LEASABLE_ITEM_STATUSES,
+            limit=min(count, quota),
+            now=now,
+            expires_at=expires_at,
+        )
+
+        assignment.last_activity_at = now
+        if assignment.status == "assigned":
+            assignment.status = "in_progress"
+        crud_accuracy.save_human_assignment(self.db, assignment)
+
+        leased = crud_accuracy.list_leased_items_with_content(
+            self.db,
+            assignment_id=assignment.id,
+            now=now,
+        )
+        items = [
+            {
+                "id": item.id,
+                "question_id": item.question_id,
+                "sequence_number": item.sequence_number,
+                "question_content": question_content,
+                "reference_answer": reference_answer,
+                "rag_answer_content": rag_answer_content,
+                "ai_score": item.ai_score,
+                "ai_dimension_scores": item.ai_dimension_scores,
+                "ai_evaluation_reason": item.ai_evaluation_reason,
+            }
+            for item, question_content, reference_answer, rag_answer_content in leased
+        ]
+
+        return {
+            "assignment_id": assignment.id,
+            "evaluation_id": assignment.evaluation_id,
+            "total_items": assignment.total_items,
+            "completed_items": assignment.completed_items or 0,
+            "lease_expires_at": expires_at,
+            "items": items,
+        }
+
+    def release_human_items(self, access_code: str, item_ids: Optional[List[str]] = None) -> int:
+        assignment = self._get_open_assignment_for_update(access_code)
+        return crud_accuracy.release_leases(
+            self.db,
+            assignment_id=assignment.id,
+            item_ids=[str(item_id) for item_id in item_ids] if item_ids is not None else None,
+        )
+
+    def submit_human_results(self, access_code: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Record human results for items leased to ``access_code``.
+
+        Results for items the grader no longer holds (released, expired, or
+        taken over by someone else) are skipped and reported back.
+        """
+        assignment = self._get_open_assignment_for_update(access_code)
+        now = datetime.utcnow()
+        leases = crud_accuracy.list_assignment_lease_rows_for_update(
+            self.db,
+            assignment_id=assignment.id,
+            item_ids=list({str(result["item_id"]) for result in results}),
+            now=now,
+        )
+        leases_by_item = {str(lease["item_id"]): lease for lease in leases}
+
+        submissions = []
+        rejected = []
+        for result in results:
+            lease = leases_by_item.pop(str(result["item_id"]), None)
+            if lease is None:
+                rejected.append(str(result["item_id"]))
+                continue
+            submissions.append((lease, {
+                "id": lease["question_id"],
+                "human_score": result["score"],
+                "human_dimension_scores": result.get("dimension_scores"),
+                "human_evaluation_reason": result.get("evaluation_reason"),
+                "human_evaluator_id": assignment.access_code,
+            }))
+
+        if not submissions:
+            crud_accuracy.rollback(self.db)
+            return {"accepted": 0, "rejected_item_ids": rejected}
+
+        crud_accuracy.complete_leases(
+            self.db,
+            lease_ids=[lease["id"] for lease, _ in submissions],
+            now=now,
+        )
+        assignment.completed_items = (assignment.completed_items or 0) + len(submissions)
+        assignment.last_activity_at = now
+        if assignment.completed_items >= assignment.total_items:
+            assignment.status = "completed"
+            assignment.completed_at = now
+
+        # 与评测结果在同一事务中提交
+        try:
+            self.submit_test_item_results(
+                assignment.evaluation_id,
+                [item_data for _, item_data in submissions],
+            )
+        except Exception:
+            crud_accuracy.rollback(self.db)
+            raise
+
+        return {"accepted": len(submissions), "rejected_item_ids": rejected}
+
+    def _get_open_assignment_for_update(self, access_code: str) -> AccuracyHumanAssignment:
+        assignment = crud_accuracy.get_human_assignment_by_access_code_for_update(self.db, access_code)
+        if not assignment:
+            raise LookupError("Assignment not found")
+
+        if not assignment.is_active or assignment.status == "completed":
+            crud_accuracy.rollback(self.db)
+            raise ValueError("Assignment is closed")
+
+        if assignment.expiration_date and assignment.expiration_date < datetime.now(assignment.expiration_date.tzinfo):
+            crud_accuracy.rollback(self.db)
+            raise ValueError("Assignment has expired")
+
+        return assignment
+
     def check_running_tests(self, project_id: uuid.UUID) -> List[AccuracyTest]:
         return crud_accuracy.list_running_tests(self.db, project_id)
 
@@ -422,11 +873,14 @@ class AccuracyService:
 
             test = crud_accuracy.get_accuracy_test(self.db, test_id)
             if test:
+                # 复用基线评分的评测项不会被重置
+                _, reused, _ = crud_accuracy.get_accuracy_test_stats(self.db, test_id)
                 test.status = "created"
-                test.processed_questions = 0
-                test.success_questions = 0
+                test.processed_questions = reused
+                test.success_questions = reused
                 test.failed_questions = 0
                 test.results_summary = None
+                test.result_aggregates = None
                 test.started_at = None
                 test.completed_at = None
                 crud_accuracy.save_accuracy_test(self.db, test)
@@ -444,23 +898,3 @@ class AccuracyService:
 
         test.status = status
         return crud_accuracy.save_accuracy_test(db, test)
-
-    def _calculate_score_distribution(self, items: List[AccuracyTestItem]) -> Dict[str, int]:
-        distribution = {"5": 0, "4": 0, "3": 0, "2": 0, "1": 0, "0": 0}
-
-        for item in items:
-            if item.final_score is not None:
-                score_key = str(int(round(float(item.final_score))))
-                if score_key in distribution:
-                    distribution[score_key] += 1
-
-        return distribution
-
-    def _calculate_evaluation_types(self, items: List[AccuracyTestItem]) -> Dict[str, int]:
-        type_counts = {"ai": 0, "human": 0}
-
-        for item in items:
-            if item.final_evaluation_type:
-                type_counts[item.final_evaluation_type] += 1
-
-        return type_counts
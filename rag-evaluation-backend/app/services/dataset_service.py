@@ -336,12 +336,14 @@ def copy_dataset(
     source_dataset_id: str,
     user_id: str,
     new_name: Optional[str] = None,
+    rag_answer_versions: Optional[List[str]] = None,
 ) -> Optional[Dataset]:
     return crud_dataset.copy_dataset(
         db,
         source_dataset_id=source_dataset_id,
         user_id=user_id,
         new_name=new_name,
+        rag_answer_versions=rag_answer_versions,
     )
 
 
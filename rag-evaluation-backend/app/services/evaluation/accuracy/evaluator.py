@@ -1 +1,295 @@
 """AI 评测执行器 - 调用 LLM 打分"""
+import asyncio
+import logging
+import re
+import statistics
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional
+
+import httpx
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = (
+    "你是一个专业的RAG回答评估专家，你的任务是评估生成式AI的回答质量。"
+    "请根据提供的标准答案评价RAG系统的回答质量，分析其准确性、相关性和完整性。"
+)
+
+# 评分时把总分当作一个额外维度参与一致性判断
+OVERALL_KEY = "overall"
+
+_YAML_BLOCK_RE = re.compile(r"```yaml\s*([\s\S]*?)\s*```")
+
+
+class JudgeRequestError(Exception):
+    """The judge model could not be reached or returned an error."""
+
+
+@dataclass
+class SelfConsistencySettings:
+    """
+    Sample up to ``max_samples`` judgments and stop as soon as ``min_agreement``
+    of them lie within ``tolerance`` of the per-dimension median.
+    """
+
+    max_samples: int = 5
+    min_agreement: int = 3
+    tolerance: float = 0.5
+
+
+@dataclass
+class Judgment:
+    overall_score: float
+    dimension_scores: Dict[str, float]
+    evaluation_reason: str
+    raw: str
+
+    def scores(self) -> Dict[str, float]:
+        return {**self.dimension_scores, OVERALL_KEY: self.overall_score}
+
+
+@dataclass
+class JudgeResult:
+    """Aggregated outcome of judging one item."""
+
+    score: float
+    dimension_scores: Dict[str, float]
+    evaluation_reason: str
+    raw_response: Any
+    samples: List[Judgment] = field(default_factory=list)
+
+
+def build_prompt(template: str, question: str, reference_answer: str, rag_answer: str) -> str:
+    return (
+        template
+        .replace("{{question}}", question or "")
+        .replace("{{reference_answer}}", reference_answer or "")
+        .replace("{{rag_answer}}", rag_answer or "")
+    )
+
+
+def parse_judgment(text: str) -> Optional[Judgment]:
+    """
+    Parse the YAML block that follows the ``####`` separator in a judge reply.
+
+    Mirrors the parser used by the web client; returns None when the reply does
+    not follow the expected format.
+    """
+    parts = text.split("####")
+    if len(parts) < 2:
+        return None
+
+    match = _YAML_BLOCK_RE.search(parts[1].strip())
+    if not match:
+        return None
+
+    try:
+        parsed = yaml.safe_load(match.group(1).strip())
+    except yaml.YAMLError:
+        return None
+    if not isinstance(parsed, dict) or parsed.get("overall_score") is None:
+        return None
+
+    try:
+        overall_score = float(parsed["overall_score"])
+        dimension_scores: Dict[str, float] = {}
+        raw_dimensions = parsed.get("dimension_scores") or {}
+        if isinstance(raw_dimensions, list):
+            for entry in raw_dimensions:
+                if isinstance(entry, dict):
+                    for dim, score in entry.items():
+                        dimension_scores[str(dim)] = float(score)
+        elif isinstance(raw_dimensions, dict):
+            for dim, score in raw_dimensions.items():
+                dimension_scores[str(dim)] = float(score)
+    except (TypeError, ValueError):
+        return None
+
+    reason = parsed.get("evaluation_reason") or ""
+    if isinstance(reason, list):
+        reason = "\n".join(str(line) for line in reason)
+
+    return Judgment(
+        overall_score=overall_score,
+        dimension_scores=dimension_scores,
+        evaluation_reason=str(reason),
+        raw=text,
+    )
+
+
+class LLMJudge:
+    """Minimal OpenAI-compatible chat completion client for judging."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        api_base: str,
+        api_key: str,
+        model: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_concurrency: int = 5,
+        system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+        timeout: Optional[httpx.Timeout] = None,
+        slot: Optional[Callable[[], AsyncContextManager[Any]]] = None,
+    ):
+        self.client = client
+        self.url = f"{api_base.rstrip('/')}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.params = {"temperature": 0.2, "max_tokens": 1000, **(params or {})}
+        self.system_prompt = system_prompt
+        self.timeout = timeout or client.timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # 可选的全局调度槽位（见 app.services.evaluation.scheduler）
+        self._slot = slot or nullcontext
+
+    async def complete(self, prompt: str) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            **self.params,
+        }
+        async with self._semaphore, self._slot():
+            try:
+                response = await self.client.post(
+                    self.url,
+                    json=payload,
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    timeout=self.timeout,
+                )
+            except httpx.HTTPError as exc:
+                raise JudgeRequestError(str(exc)) from exc
+
+        if response.status_code != 200:
+            raise JudgeRequestError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+        try:
+            return (response.json()["choices"][0]["message"]["content"] or "").strip()
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            raise JudgeRequestError(f"Malformed completion: {exc}") from exc
+
+
+async def judge_once(judge: LLMJudge, prompt: str) -> JudgeResult:
+    text = await judge.complete(prompt)
+    judgment = parse_judgment(text)
+    if judgment is None:
+        raise ValueError("Unparseable judge response")
+
+    return JudgeResult(
+        score=judgment.overall_score,
+        dimension_scores=judgment.dimension_scores,
+        evaluation_reason=judgment.evaluation_reason,
+        raw_response=text,
+        samples=[judgment],
+    )
+
+
+def _agreeing_samples(samples: List[Judgment], tolerance: float) -> List[Judgment]:
+    """Samples within ``tolerance`` of the per-dimension median on every shared dimension."""
+    keys = set.intersection(*(set(sample.scores()) for sample in samples))
+    medians = {
+        key: statistics.median(sample.scores()[key] for sample in samples)
+        for key in keys
+    }
+    return [
+        sample for sample in samples
+        if all(abs(sample.scores()[key] - medians[key]) <= tolerance for key in keys)
+    ]
+
+
+async def judge_with_self_consistency(
+    judge: LLMJudge,
+    prompt: str,
+    settings: SelfConsistencySettings,
+) -> JudgeResult:
+    """
+    Judge one item by sampling until enough judgments agree.
+
+    The first wave draws ``min_agreement`` samples concurrently. Each further
+    wave draws only as many as are still missing for agreement, so a clear-cut
+    item costs ``min_agreement`` calls and only contested ones approach
+    ``max_samples``. Replies that fail to parse are spent but do not vote.
+    The aggregate is the mean of the agreeing samples (of all samples if
+    agreement was never reached); variances are over all parsed samples.
+    """
+    min_agreement = min(settings.min_agreement, settings.max_samples)
+    samples: List[Judgment] = []
+    drawn = 0
+    unparsed = 0
+    agreeing: List[Judgment] = []
+
+    wave = min_agreement
+    while wave > 0:
+        replies = await asyncio.gather(
+            *(judge.complete(prompt) for _ in range(wave)),
+            return_exceptions=True,
+        )
+        drawn += wave
+        for reply in replies:
+            if isinstance(reply, BaseException):
+                logger.warning("Judge sample failed: %s", reply)
+                unparsed += 1
+                continue
+            judgment = parse_judgment(reply)
+            if judgment is None:
+                unparsed += 1
+                continue
+            samples.append(judgment)
+
+        agreeing = _agreeing_samples(samples, settings.tolerance) if samples else []
+        if len(agreeing) >= min_agreement:
+            break
+        wave = min(min_agreement - len(agreeing), settings.max_samples - drawn)
+
+    if not samples:
+        raise ValueError(f"No usable judge response in {drawn} samples")
+
+    agreed = len(agreeing) >= min_agreement
+    basis = agreeing if agreed else samples
+    keys = set.intersection(*(set(sample.scores()) for sample in basis))
+    means = {
+        key: round(statistics.fmean(sample.scores()[key] for sample in basis), 4)
+        for key in keys
+    }
+    variances = {
+        key: round(statistics.pvariance([sample.scores()[key] for sample in samples]), 4)
+        for key in set.intersection(*(set(sample.scores()) for sample in samples))
+    }
+    # 代表性理由：取与聚合结果最接近的一次采样
+    representative = min(
+        basis,
+        key=lambda sample: sum(abs(sample.scores()[key] - means[key]) for key in keys),
+    )
+
+    overall = means.pop(OVERALL_KEY)
+    return JudgeResult(
+        score=overall,
+        dimension_scores=means,
+        evaluation_reason=representative.evaluation_reason,
+        raw_response={
+            "mode": "self_consistency",
+            "agreed": agreed,
+            "samples_drawn": drawn,
+            "samples_unparsed": unparsed,
+            "agreeing_samples": len(agreeing),
+            "max_samples": settings.max_samples,
+            "min_agreement": min_agreement,
+            "tolerance": settings.tolerance,
+            "variance": variances,
+            "samples": [
+                {
+                    "overall_score": sample.overall_score,
+                    "dimension_scores": sample.dimension_scores,
+                    "evaluation_reason": sample.evaluation_reason,
+                }
+                for sample in samples
+            ],
+        },
+        samples=samples,
+    )
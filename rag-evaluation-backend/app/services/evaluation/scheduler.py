@@ -0,0 +1,160 @@
+"""评测任务公平调度 - 在所有运行中的任务之间分配全局并发槽位"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.core.config import settings
+
+# 优先级对应的权重：权重越大，获得的并发份额越多
+PRIORITY_WEIGHTS: Dict[str, int] = {
+    "interactive": 8,
+    "normal": 2,
+    "batch": 1,
+}
+DEFAULT_PRIORITY = "normal"
+
+
+@dataclass
+class _JobState:
+    kind: str
+    job_id: str
+    priority: str
+    weight: int
+    pass_value: float
+    running: int = 0
+    granted: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+    @property
+    def stride(self) -> float:
+        return 1.0 / self.weight
+
+
+class FairShareScheduler:
+    """
+    Weighted fair sharing of a fixed number of concurrency slots between jobs.
+
+    Every request made on behalf of a job (one judge call, one proxied RAG
+    request) holds a slot for its duration. When slots are contended, the next
+    free slot goes to the waiting job with the lowest pass value (stride
+    scheduling): each grant advances the job's pass by ``1 / weight``, so over
+    any busy period jobs receive slots in proportion to their weights no matter
+    how many requests each has queued. A job joining late starts at the current
+    virtual time, so a small interactive job is served immediately instead of
+    queueing behind the backlog of a large batch job.
+
+    All bookkeeping runs on the event loop thread and needs no locking.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._in_use = 0
+        self._virtual_time = 0.0
+        self._jobs: Dict[str, _JobState] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        kind: str,
+        job_id: str,
+        *,
+        priority: Optional[str] = None,
+    ) -> AsyncIterator[None]:
+        key = f"{kind}:{job_id}"
+        await self._acquire(key, kind, job_id, priority or DEFAULT_PRIORITY)
+        try:
+            yield
+        finally:
+            self._release(key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth and slot usage, per job and in total."""
+        jobs = [
+            {
+                "kind": job.kind,
+                "job_id": job.job_id,
+                "priority": job.priority,
+                "weight": job.weight,
+                "running": job.running,
+                "waiting": len(job.waiters),
+                "granted": job.granted,
+            }
+            for job in self._jobs.values()
+        ]
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_use": self._in_use,
+            "waiting": sum(job["waiting"] for job in jobs),
+            "jobs": sorted(jobs, key=lambda job: (-job["waiting"], job["kind"], job["job_id"])),
+        }
+
+    async def _acquire(self, key: str, kind: str, job_id: str, priority: str) -> None:
+        job = self._jobs.get(key)
+        if job is None:
+            job = _JobState(
+                kind=kind,
+                job_id=job_id,
+                priority=priority,
+                weight=PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS[DEFAULT_PRIORITY]),
+                pass_value=self._virtual_time,
+            )
+            self._jobs[key] = job
+
+        if self._in_use < self.max_concurrency and not self._has_waiters():
+            self._grant(job)
+            return
+
+        if not job.waiters:
+            # 空闲期间不积累额度，避免重新排队时突发占用
+            job.pass_value = max(job.pass_value, self._virtual_time)
+        waiter = asyncio.get_running_loop().create_future()
+        job.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 槽位已分配但调用方被取消，归还槽位
+                self._release(key)
+            else:
+                if waiter in job.waiters:
+                    job.waiters.remove(waiter)
+                self._forget_if_idle(key, job)
+            raise
+
+    def _release(self, key: str) -> None:
+        job = self._jobs[key]
+        job.running -= 1
+        self._in_use -= 1
+        self._dispatch()
+        self._forget_if_idle(key, job)
+
+    def _grant(self, job: _JobState) -> None:
+        self._virtual_time = max(self._virtual_time, job.pass_value)
+        job.pass_value += job.stride
+        job.running += 1
+        job.granted += 1
+        self._in_use += 1
+
+    def _dispatch(self) -> None:
+        while self._in_use < self.max_concurrency:
+            candidates = [job for job in self._jobs.values() if job.waiters]
+            if not candidates:
+                return
+            job = min(candidates, key=lambda candidate: candidate.pass_value)
+            waiter = job.waiters.popleft()
+            if waiter.cancelled():
+                continue
+            self._grant(job)
+            waiter.set_result(None)
+
+    def _has_waiters(self) -> bool:
+        return any(job.waiters for job in self._jobs.values())
+
+    def _forget_if_idle(self, key: str, job: _JobState) -> None:
+        if job.running == 0 and not job.waiters and self._jobs.get(key) is job:
+            del self._jobs[key]
+
+
+scheduler = FairShareScheduler(settings.SCHEDULER_MAX_CONCURRENCY)
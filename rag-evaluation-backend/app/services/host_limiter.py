@@ -0,0 +1,154 @@
+"""RAG 代理的目标主机并发限制 - 每个主机限定并发数与排队长度，队列满时拒绝"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+
+
+class HostQueueFull(Exception):
+    """The target host's wait queue is full; the request was not sent."""
+
+
+@dataclass
+class _HostState:
+    running: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+    granted: int = 0
+    rejected: int = 0
+    queued: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    if not parts.hostname:
+        raise ValueError(f"Invalid URL: {url}")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.hostname.lower()}:{port}"
+
+
+class HostConcurrencyLimiter:
+    """
+    At most ``max_concurrency`` requests in flight per target host, with up to
+    ``max_queue`` more waiting in FIFO order; beyond that requests are rejected
+    with ``HostQueueFull`` instead of piling up sockets on a shared service.
+
+    Like the scheduler, all bookkeeping runs on the event loop thread. Counters
+    are kept per host and reported by ``snapshot``; beyond ``max_hosts`` hosts
+    the least recently used idle ones are forgotten.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        clock: Callable[[], float] = time.monotonic,
+        max_hosts: int = 256,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.clock = clock
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[float]:
+        """Hold a slot for the host of ``url``; yields the seconds spent queueing."""
+        key = _host_key(url)
+        waited = await self._acquire(key)
+        try:
+            yield waited
+        finally:
+            self._release(key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Slot usage, queue depth and wait times per host."""
+        hosts = [
+            {
+                "host": key,
+                "running": host.running,
+                "waiting": len(host.waiters),
+                "granted": host.granted,
+                "rejected": host.rejected,
+                "avg_wait_ms": round(host.total_wait / host.queued * 1000, 1) if host.queued else 0.0,
+                "max_wait_ms": round(host.max_wait * 1000, 1),
+            }
+            for key, host in self._hosts.items()
+        ]
+        return {
+            "max_concurrency_per_host": self.max_concurrency,
+            "max_queue_per_host": self.max_queue,
+            "hosts": sorted(hosts, key=lambda host: (-host["waiting"], -host["running"], host["host"])),
+        }
+
+    async def _acquire(self, key: str) -> float:
+        host = self._hosts.get(key)
+        if host is None:
+            host = _HostState()
+            self._hosts[key] = host
+            self._forget_idle_hosts(keep=key)
+        else:
+            self._hosts.move_to_end(key)
+
+        if host.running < self.max_concurrency and not host.waiters:
+            host.running += 1
+            host.granted += 1
+            return 0.0
+        if len(host.waiters) >= self.max_queue:
+            host.rejected += 1
+            raise HostQueueFull(f"目标服务 {key} 的排队请求已满")
+
+        waiter = asyncio.get_running_loop().create_future()
+        host.waiters.append(waiter)
+        started = self.clock()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 槽位已分配但调用方被取消，归还槽位
+                self._release(key)
+            elif waiter in host.waiters:
+                host.waiters.remove(waiter)
+            raise
+
+        waited = self.clock() - started
+        host.queued += 1
+        host.total_wait += waited
+        host.max_wait = max(host.max_wait, waited)
+        return waited
+
+    def _forget_idle_hosts(self, keep: str) -> None:
+        # 只淘汰没有进行中与排队请求的主机，否则释放槽位时找不到状态
+        excess = len(self._hosts) - self.max_hosts
+        if excess <= 0:
+            return
+        idle = [
+            key for key, host in self._hosts.items()
+            if key != keep and not host.running and not host.waiters
+        ]
+        for key in idle[:excess]:
+            del self._hosts[key]
+
+    def _release(self, key: str) -> None:
+        host = self._hosts[key]
+        host.running -= 1
+        while host.waiters and host.running < self.max_concurrency:
+            waiter = host.waiters.popleft()
+            if waiter.cancelled():
+                continue
+            host.running += 1
+            host.granted += 1
+            waiter.set_result(None)
+
+
+host_limiter = HostConcurrencyLimiter(
+    settings.RAG_PROXY_MAX_CONCURRENCY_PER_HOST,
+    settings.RAG_PROXY_MAX_QUEUE_PER_HOST,
+    max_hosts=settings.HTTP_CLIENT_MAX_ORIGINS,
+)
@@ -9,6 +9,23 @@ from app.models.question import Question
 from app.models.rag_answer import RagAnswer
 from app.schemas.performance import PerformanceTestCreate, PerformanceTestUpdate
 from app.services import question_service
+from app.services.proxy_telemetry import UpstreamTiming, upstream_timings
+
+
+def calculate_percentiles(data):
+    if not data:
+        return None
+    return {
+        "avg": float(np.mean(data)),
+        "max": float(np.max(data)),
+        "min": float(np.min(data)),
+        "p50": float(np.percentile(data, 50)),
+        "p75": float(np.percentile(data, 75)),
+        "p90": float(np.percentile(data, 90)),
+        "p95": float(np.percentile(data, 95)),
+        "p99": float(np.percentile(data, 99)),
+        "samples": len(data),
+    }
 
 
 class PerformanceService:
@@ -72,9 +89,12 @@ class PerformanceService:
             "completed_at": datetime.utcnow(),
         }
 
+        timings = upstream_timings.pop(performance_test_id)
         if calculate_metrics:
             rag_answers = crud_performance.list_rag_answers_by_test(db, performance_test_id)
             metrics = self._calculate_summary_metrics(rag_answers, db_obj)
+            if timings:
+                metrics["upstream"] = self._calculate_upstream_metrics(timings)
             success_questions = len([a for a in rag_answers if a.total_response_time is not None])
             failed_questions = len(rag_answers) - success_questions
 
@@ -97,6 +117,7 @@ class PerformanceService:
         db_obj = crud_performance.get_performance_test(db, performance_test_id)
         if not db_obj:
             return None
+        upstream_timings.pop(performance_test_id)
 
         update_data = {
             "status": "failed",
@@ -126,21 +147,6 @@ class PerformanceService:
         total_response_times = [a.total_response_time for a in successful_answers if a.total_response_time is not None]
         character_counts = [a.character_count for a in successful_answers if a.character_count is not None]
 
-        def calculate_percentiles(data):
-            if not data:
-                return None
-            return {
-                "avg": float(np.mean(data)),
-                "max": float(np.max(data)),
-                "min": float(np.min(data)),
-                "p50": float(np.percentile(data, 50)),
-                "p75": float(np.percentile(data, 75)),
-                "p90": float(np.percentile(data, 90)),
-                "p95": float(np.percentile(data, 95)),
-                "p99": float(np.percentile(data, 99)),
-                "samples": len(data),
-            }
-
         return {
             "response_time": {
                 "first_token_time": calculate_percentiles(first_response_times),
@@ -157,6 +163,18 @@ class PerformanceService:
             "test_duration_seconds": test_duration,
         }
 
+    def _calculate_upstream_metrics(self, timings: List[UpstreamTiming]) -> Dict[str, Any]:
+        """Upstream latency measured by the RAG proxy, in seconds like the browser-side metrics."""
+        return {
+            "headers_time": calculate_percentiles([t.headers_ms / 1000 for t in timings]),
+            "first_byte_time": calculate_percentiles(
+                [t.first_byte_ms / 1000 for t in timings if t.first_byte_ms is not None]
+            ),
+            "last_byte_time": calculate_percentiles([t.last_byte_ms / 1000 for t in timings]),
+            "response_bytes": calculate_percentiles([t.bytes for t in timings]),
+            "error_rate": sum(1 for t in timings if t.status >= 400) / len(timings),
+        }
+
     def get_performance_test_detail(self, db: Session, *, performance_test_id: str) -> Dict[str, Any]:
         test = crud_performance.get_performance_test(db, performance_test_id)
         if not test:
@@ -183,6 +201,8 @@ class PerformanceService:
             return None
 
         if test.status == "running":
+            # 中断的测试不再汇总上游计时，释放样本
+            upstream_timings.pop(test_id)
             update_data = {
                 "status": "interrupted",
                 "completed_at": datetime.utcnow(),
@@ -197,6 +217,8 @@ class PerformanceService:
             return None
 
         if test.status == "interrupted":
+            # 丢弃中断前残留的样本，避免混入重新运行的指标
+            upstream_timings.pop(test_id)
             update_data = {
                 "status": "created",
                 "processed_questions": 0,
@@ -0,0 +1,57 @@
+"""RAG 代理请求的上游计时 - 在后端测量上游耗时，排除浏览器到后端的网络抖动"""
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+# 每个性能测试最多保留的计时样本数，以及同时保留样本的测试数
+MAX_SAMPLES_PER_TEST = 100_000
+MAX_TRACKED_TESTS = 64
+
+
+@dataclass
+class UpstreamTiming:
+    """Timing of one proxied request, in milliseconds from sending it upstream."""
+
+    status: int
+    headers_ms: float
+    first_byte_ms: Optional[float]
+    last_byte_ms: float
+    bytes: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class UpstreamTimingRecorder:
+    """
+    Upstream timings of proxied requests, collected per performance test until
+    the test completes.
+
+    Samples live in process memory, like the scheduler's state; with several
+    workers each one only sees the requests it proxied. The test id comes from
+    the client, so at most ``max_tests`` tests are tracked and the one that
+    recorded least recently is dropped first.
+    """
+
+    def __init__(self, max_samples_per_test: int = MAX_SAMPLES_PER_TEST, max_tests: int = MAX_TRACKED_TESTS):
+        self.max_samples_per_test = max_samples_per_test
+        self.max_tests = max_tests
+        self._samples: "OrderedDict[str, Deque[UpstreamTiming]]" = OrderedDict()
+
+    def record(self, performance_test_id: str, timing: UpstreamTiming) -> None:
+        samples = self._samples.get(performance_test_id)
+        if samples is None:
+            samples = deque(maxlen=self.max_samples_per_test)
+            self._samples[performance_test_id] = samples
+            while len(self._samples) > self.max_tests:
+                self._samples.popitem(last=False)
+        else:
+            self._samples.move_to_end(performance_test_id)
+        samples.append(timing)
+
+    def pop(self, performance_test_id: str) -> List[UpstreamTiming]:
+        """Samples recorded for the test, which are then discarded."""
+        return list(self._samples.pop(performance_test_id, ()))
+
+
+upstream_timings = UpstreamTimingRecorder()
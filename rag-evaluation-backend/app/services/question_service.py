@@ -81,7 +81,7 @@ def create_questions_batch(
     db: Session,
     dataset_id: str,
     questions: List[QuestionBase],
-) -> List[Question]:
+) -> List[str]:
     return crud_question.create_questions_batch(db, dataset_id=dataset_id, questions=questions)
 
 
@@ -90,7 +90,7 @@ def create_questions_with_rag_answers(
     *,
     dataset_id: str,
     questions_data: List[Dict[str, Any]],
-) -> List[Question]:
+) -> List[str]:
     return crud_question.create_questions_with_rag_answers(
         db,
         dataset_id=dataset_id,
@@ -215,7 +215,7 @@ def import_questions_with_rag_answers(
     db: Session,
     dataset_id: str,
     questions_data: List[QuestionImportWithRagAnswer],
-) -> List[Question]:
+) -> List[str]:
     return crud_question.import_questions_with_rag_answers(
         db,
         dataset_id=dataset_id,
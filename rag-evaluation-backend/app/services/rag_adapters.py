@@ -0,0 +1,353 @@
+"""
+RAG 系统适配器 - 按系统类型构造请求并提取回答
+
+与前端 pages/Settings/RAGTemplates/ragRequestService.ts 的行为保持一致，
+配置沿用前端保存的 RAG 配置结构（url、apiKey、requestHeaders、requestTemplate、
+responsePath、streamEventField、streamEventValue 等），类型取自
+PerformanceTest.rag_config 中 "type/name" 形式的配置键。
+"""
+import json
+import time
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.schemas.rag_answer import ApiRequestConfig
+from app.utils.request_templates import JsonPath, RequestTemplate, compile_path
+
+
+class RagHTTPError(Exception):
+    """The RAG backend answered with a non-200 status."""
+
+    def __init__(self, status_code: int, text: str, retry_after: Optional[str] = None):
+        super().__init__(f"API请求失败: {status_code} - {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RagResponseError(Exception):
+    """The RAG backend answered, but no answer could be extracted."""
+
+
+@dataclass
+class RagEndpointConfig:
+    """One RAG endpoint, in the shape the web client stores RAG configs."""
+
+    type: str = "custom"
+    url: str = ""
+    api_key: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    request_template: Optional[Any] = None
+    response_path: str = ""
+    stream_event_field: str = ""
+    stream_event_value: str = ""
+    timeout: float = 60
+    # ragflow_chat
+    address: str = ""
+    chat_id: str = ""
+    # dify_flow：未提供请求模板时，问题写入 inputs 的字段名
+    input_field: str = "query"
+
+    @classmethod
+    def from_rag_config(cls, config: Dict[str, Any]) -> "RagEndpointConfig":
+        """Build from a web client RAG config; JSON-string headers and templates are parsed."""
+        return cls(
+            type=config.get("type") or "custom",
+            # 前端允许省略协议，统一补全，连接池、熔断器与请求使用同一地址
+            url=_ensure_protocol(config.get("url") or ""),
+            api_key=config.get("apiKey") or None,
+            headers=_parse_json_field(config.get("requestHeaders"), "requestHeaders") or {},
+            request_template=_parse_json_field(config.get("requestTemplate"), "requestTemplate"),
+            response_path=config.get("responsePath") or "",
+            stream_event_field=config.get("streamEventField") or "",
+            stream_event_value=config.get("streamEventValue") or "",
+            timeout=config.get("timeout") or 60,
+            address=config.get("address") or "",
+            chat_id=config.get("chatId") or "",
+            input_field=config.get("inputField") or "query",
+        )
+
+    @classmethod
+    def from_api_config(cls, api_config: ApiRequestConfig) -> "RagEndpointConfig":
+        headers = {"Content-Type": "application/json"}
+        if api_config.api_key:
+            headers["Authorization"] = f"Bearer {api_config.api_key}"
+        headers.update(api_config.headers or {})
+        return cls(
+            type="custom",
+            url=_ensure_protocol(api_config.endpoint_url or ""),
+            headers=headers,
+            request_template=api_config.request_template,
+            response_path=api_config.response_path,
+            timeout=api_config.timeout,
+        )
+
+    # 模板与路径在同一配置的所有请求间共享，只编译一次
+    @cached_property
+    def body_template(self) -> RequestTemplate:
+        return RequestTemplate(self.request_template or {})
+
+    @cached_property
+    def answer_path(self) -> JsonPath:
+        return compile_path(self.response_path)
+
+
+@dataclass
+class PreparedRequest:
+    url: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+@dataclass
+class RagReply:
+    answer: str
+    raw_response: Any
+    first_response_time: float
+    total_response_time: float
+
+
+class RagAdapter:
+    """
+    Custom RAG API: POST the rendered request template and read either a JSON
+    body or an SSE stream. Subclasses fill in system-specific defaults.
+    """
+
+    type = "custom"
+
+    def with_defaults(self, config: RagEndpointConfig) -> RagEndpointConfig:
+        return config
+
+    def prepare(self, config: RagEndpointConfig, question: str) -> PreparedRequest:
+        if not config.url:
+            raise ValueError("RAG配置缺少URL")
+        headers = {"Content-Type": "application/json", **config.headers}
+        return PreparedRequest(
+            url=_ensure_protocol(config.url),
+            headers=headers,
+            body=config.body_template.render(question),
+        )
+
+    def extract_event(self, config: RagEndpointConfig, event: Any) -> Optional[str]:
+        """
+        Answer chunk carried by one SSE event, if any.
+
+        Same rule as the web client: with ``stream_event_field`` set, only events
+        whose field equals ``stream_event_value`` count (none if the value is
+        empty); without it every event counts.
+        """
+        if config.stream_event_field:
+            if (
+                not config.stream_event_value
+                or not isinstance(event, dict)
+                or event.get(config.stream_event_field) != config.stream_event_value
+            ):
+                return None
+        return self.extract_body(config, event)
+
+    def extract_body(self, config: RagEndpointConfig, body: Any) -> Optional[str]:
+        # 前端对空路径取不到值，不把整个响应当作回答
+        if not config.response_path:
+            return None
+        return _as_text(config.answer_path(body))
+
+    async def fetch(self, client: httpx.AsyncClient, config: RagEndpointConfig, question: str) -> RagReply:
+        """
+        Ask one question and return the full answer.
+
+        SSE responses are consumed chunk by chunk, so ``first_response_time``
+        is the time to the first answer chunk; for JSON bodies it equals the
+        time to the complete body.
+        """
+        request = self.prepare(config, question)
+        start_time = time.perf_counter()
+        first_response_time = None
+        chunks = []
+        raw_response = None
+
+        async with client.stream(
+            "POST",
+            request.url,
+            headers=request.headers,
+            content=request.body,
+            timeout=config.timeout,
+        ) as response:
+            if response.status_code != 200:
+                text = (await response.aread()).decode("utf-8", errors="ignore")
+                raise RagHTTPError(response.status_code, text[:500], response.headers.get("Retry-After"))
+
+            if "text/event-stream" in response.headers.get("content-type", ""):
+                async for event in _iter_sse_events(response):
+                    raw_response = event
+                    chunk = self.extract_event(config, event)
+                    if chunk:
+                        if first_response_time is None:
+                            first_response_time = time.perf_counter() - start_time
+                        chunks.append(chunk)
+            else:
+                try:
+                    raw_response = json.loads(await response.aread())
+                except ValueError:
+                    raise RagResponseError("无法解析API响应JSON")
+                first_response_time = time.perf_counter() - start_time
+                answer = self.extract_body(config, raw_response)
+                if answer:
+                    chunks.append(answer)
+
+        total_response_time = time.perf_counter() - start_time
+        answer = "".join(chunks)
+        if not answer:
+            raise RagResponseError(f"无法从响应中提取回答，路径: {config.response_path}")
+
+        return RagReply(
+            answer=answer,
+            raw_response=raw_response,
+            first_response_time=first_response_time or total_response_time,
+            total_response_time=total_response_time,
+        )
+
+
+class DifyChatflowAdapter(RagAdapter):
+    type = "dify_chatflow"
+
+    def with_defaults(self, config: RagEndpointConfig) -> RagEndpointConfig:
+        return replace(
+            config,
+            headers=_with_bearer(config.headers, config.api_key),
+            request_template=config.request_template or {
+                "inputs": {},
+                "query": "{{question}}",
+                "response_mode": "streaming",
+                "conversation_id": "",
+                "user": f"user-{int(time.time() * 1000)}",
+            },
+            response_path=config.response_path or "answer",
+            stream_event_field=config.stream_event_field or "event",
+            stream_event_value=config.stream_event_value or "message",
+        )
+
+
+class DifyFlowAdapter(RagAdapter):
+    type = "dify_flow"
+
+    def with_defaults(self, config: RagEndpointConfig) -> RagEndpointConfig:
+        return replace(
+            config,
+            headers=_with_bearer(config.headers, config.api_key),
+            request_template=config.request_template or {
+                "inputs": {config.input_field or "query": "{{question}}"},
+                "response_mode": "streaming",
+                "user": f"user-{int(time.time() * 1000)}",
+            },
+            response_path=config.response_path or "data.text",
+            stream_event_field=config.stream_event_field or "event",
+            stream_event_value=config.stream_event_value or "text_chunk",
+        )
+
+
+_RAGFLOW_DELTA_PATH = compile_path("choices[0].delta.content")
+_RAGFLOW_MESSAGE_PATH = compile_path("choices[0].message.content")
+
+
+class RagflowChatAdapter(RagAdapter):
+    """RAGFlow's OpenAI-compatible chat endpoint, always streamed."""
+
+    type = "ragflow_chat"
+
+    def with_defaults(self, config: RagEndpointConfig) -> RagEndpointConfig:
+        if not config.address or not config.chat_id or not config.api_key:
+            raise ValueError("RAGFlow配置不完整，需要address、chatId和apiKey")
+        return replace(
+            config,
+            url=f"{_ensure_protocol(config.address)}/api/v1/chats_openai/{config.chat_id}/chat/completions",
+            headers=_with_bearer(config.headers, config.api_key),
+            request_template={
+                "model": "model",
+                "messages": [{"role": "user", "content": "{{question}}"}],
+                "stream": True,
+            },
+        )
+
+    def extract_event(self, config: RagEndpointConfig, event: Any) -> Optional[str]:
+        return _as_text(_RAGFLOW_DELTA_PATH(event))
+
+    def extract_body(self, config: RagEndpointConfig, body: Any) -> Optional[str]:
+        return _as_text(_RAGFLOW_MESSAGE_PATH(body))
+
+
+RAG_ADAPTERS: Dict[str, RagAdapter] = {
+    adapter.type: adapter
+    for adapter in (RagAdapter(), DifyChatflowAdapter(), DifyFlowAdapter(), RagflowChatAdapter())
+}
+
+
+def get_rag_adapter(config_key: str) -> RagAdapter:
+    """Adapter for a ``type/name`` config key (as in PerformanceTest.rag_config) or a bare type."""
+    rag_type = (config_key or "custom").split("/", 1)[0]
+    adapter = RAG_ADAPTERS.get(rag_type)
+    if adapter is None:
+        raise ValueError(f"不支持的RAG系统类型: {rag_type}")
+    return adapter
+
+
+def resolve_endpoint(
+    api_config: Optional[ApiRequestConfig] = None,
+    rag_config: Optional[Dict[str, Any]] = None,
+) -> RagEndpointConfig:
+    """Endpoint config with the system type's defaults applied."""
+    if rag_config is not None:
+        config = RagEndpointConfig.from_rag_config(rag_config)
+    elif api_config is not None:
+        config = RagEndpointConfig.from_api_config(api_config)
+    else:
+        raise ValueError("缺少RAG接口配置")
+    return get_rag_adapter(config.type).with_defaults(config)
+
+
+async def _iter_sse_events(response: httpx.Response) -> AsyncIterator[Any]:
+    async for line in response.aiter_lines():
+        # 与前端一致，只处理 "data: " 开头的行
+        if not line.startswith("data: "):
+            continue
+        data = line[6:].strip()
+        if not data or data == "[DONE]":
+            continue
+        try:
+            yield json.loads(data)
+        except ValueError:
+            # 忽略无法解析的事件行
+            continue
+
+
+def _parse_json_field(value: Any, name: str) -> Any:
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise ValueError(f"{name} 不是有效的JSON")
+    return value
+
+
+def _with_bearer(headers: Dict[str, str], api_key: Optional[str]) -> Dict[str, str]:
+    merged = {"Content-Type": "application/json", **(headers or {})}
+    if api_key:
+        merged["Authorization"] = f"Bearer {api_key}"
+    return merged
+
+
+def _ensure_protocol(url: str) -> str:
+    url = url.strip()
+    return url if not url or "://" in url else f"http://{url}"
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        # 通配符路径返回多个匹配，拼接为一个回答
+        value = "".join(text for text in (_as_text(item) for item in value) if text)
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else str(value)
@@ -0,0 +1,171 @@
+"""RAG 接口调用的重试策略与熔断器"""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, FrozenSet, Hashable, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# 408/425/429 与网关类错误通常是暂时性的，值得重试
+RETRYABLE_STATUS_CODES: FrozenSet[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """The endpoint's circuit is open; the call was not attempted."""
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped at ``max_delay``."""
+
+    max_attempts: int = 1
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    retryable_status_codes: FrozenSet[int] = RETRYABLE_STATUS_CODES
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retryable_status_codes
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Delay before the attempt following ``attempt`` (1-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_delay))
+            except ValueError:
+                pass
+        return delay
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds. Then a single probe is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    failure_threshold: int
+    reset_timeout: float
+    clock: Callable[[], float] = time.monotonic
+    failures: int = 0
+    opened_at: Optional[float] = None
+    probing: bool = field(default=False)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            raise CircuitOpenError("RAG接口连续失败，已暂停请求")
+        if state == "half_open":
+            self.probing = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self.probing = False
+
+    def release(self) -> None:
+        """The call ended without a verdict (e.g. it was cancelled); allow a new probe."""
+        self.probing = False
+
+
+class CircuitBreakerRegistry:
+    """
+    Circuit breakers keyed by endpoint (origin and path, without query); at
+    most ``max_endpoints`` are kept, the least recently used is dropped first.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, max_endpoints: int = 256):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_endpoints = max_endpoints
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+
+    def get(self, url: str) -> CircuitBreaker:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc.lower()}{parts.path}"
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self._breakers[key] = breaker
+            while len(self._breakers) > self.max_endpoints:
+                self._breakers.popitem(last=False)
+        else:
+            self._breakers.move_to_end(key)
+        return breaker
+
+
+circuit_breakers = CircuitBreakerRegistry(
+    settings.RAG_CIRCUIT_FAILURE_THRESHOLD,
+    settings.RAG_CIRCUIT_RESET_SECONDS,
+    settings.HTTP_CLIENT_MAX_ORIGINS,
+)
+
+
+class SingleFlight:
+    """
+    Coalesces calls by key: the first caller runs the call, concurrent and
+    later callers with the same key get its result. Results are kept for the
+    lifetime of the instance, so use one instance per run.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[T]],
+        retain: Optional[Callable[[T], Optional[T]]] = None,
+    ) -> Tuple[T, bool]:
+        """
+        Result for ``key`` and whether it was shared from an earlier call.
+
+        Concurrent callers get the result itself; later callers get what
+        ``retain`` maps it to, and nothing is kept when ``retain`` returns None.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except BaseException as exc:
+            # 异常不缓存，等待中的调用方收到同一异常，之后的调用重新发起
+            del self._calls[key]
+            future.set_exception(exc)
+            future.exception()
+            raise
+        future.set_result(result)
+
+        if retain is not None:
+            kept = retain(result)
+            if kept is None:
+                del self._calls[key]
+            else:
+                self._calls[key] = asyncio.get_running_loop().create_future()
+                self._calls[key].set_result(kept)
+        return result, False
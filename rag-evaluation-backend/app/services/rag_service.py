@@ -1,182 +1,581 @@
 import asyncio
+import functools
 import httpx
+import logging
 import time
-import json
 import uuid
-from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Dict, Any, NamedTuple, Optional, Tuple, TypeVar, Union
 
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.http_client import http_clients
 from app.crud import rag as crud_rag
-from app.models.rag_answer import RagAnswer, ApiConfig
+from app.db.base import AsyncSessionLocal
+from app.models.rag_answer import RagAnswer, ApiConfig, RagCollectionJob
 from app.models.question import Question
-from app.schemas.rag_answer import RagAnswerCreate, ApiRequestConfig
+from app.services.rag_adapters import (
+    RagEndpointConfig,
+    RagHTTPError,
+    RagReply,
+    RagResponseError,
+    get_rag_adapter,
+)
+from app.services.rag_resilience import CircuitOpenError, RetryPolicy, SingleFlight, circuit_breakers
+
+# 批量收集时每次从数据库加载的问题数，以及响应中最多返回的失败明细数
+QUESTION_LOAD_CHUNK = 500
+MAX_REPORTED_ERRORS = 100
+# 后台收集任务：进度中返回的失败明细数，以及检查取消状态的间隔（秒）
+MAX_JOB_ERRORS = 20
+JOB_STATUS_POLL_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CollectionOutcome(NamedTuple):
+    """
+    Result of collecting one question: succeeded, failed, or skipped when the
+    version was already answered (``answer_id`` is the existing answer, if known).
+    """
+
+    question_id: str
+    status: str
+    answer_id: Optional[str]
+    attempt_count: Optional[int]
+    error: Optional[str]
+
+
+def _retain_answer(
+    result: Tuple[Optional[Dict[str, Any]], Optional[str]],
+) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """What coalesced collection keeps of a RAG call for later identical questions."""
+    row, _ = result
+    if row is None:
+        # 超时、5xx、熔断等失败结果不复用，之后的同文本问题重新请求
+        return None
+    return {**row, "raw_response": None}, None
 
 
 class RagService:
-    """RAG answer collection service."""
+    """
+    RAG answer collection service.
 
-    def __init__(self, db: Session):
+    Collection (``collect_answer_api``, ``collect_answers_batch`` and the
+    job runner) may be given an ``AsyncSession``: its database calls then run
+    through ``run_sync`` on asyncpg and never block the event loop. The other
+    methods are synchronous and need a ``Session``.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
+        # AsyncSession 不支持并发操作，流水线中的生产者与写入者需串行访问
+        self._db_lock = asyncio.Lock()
+
+    async def _run_db(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call a sync crud function with this service's session, without blocking on an AsyncSession."""
+        if not isinstance(self.db, AsyncSession):
+            return fn(self.db, *args, **kwargs)
+        async with self._db_lock:
+            return await self.db.run_sync(fn, *args, **kwargs)
 
     async def collect_answer_api(
         self,
         question: Question,
-        api_config: ApiRequestConfig,
+        endpoint: RagEndpointConfig,
         source_system: str = "RAG系统",
         collect_performance: bool = True,
+        retry_policy: Optional[RetryPolicy] = None,
+        version: Optional[str] = None,
     ) -> Tuple[Optional[RagAnswer], Optional[str]]:
         """
-        Collect a single answer from a RAG API.
+        Collect a single answer from a RAG API and save it.
         Returns: (rag_answer, error_message)
         """
-        request_data = api_config.request_template.copy()
-
-        def replace_question_placeholder(obj, question_text):
-            if isinstance(obj, dict):
-                for key, value in obj.items():
-                    if isinstance(value, (dict, list)):
-                        obj[key] = replace_question_placeholder(value, question_text)
-                    elif isinstance(value, str) and "{{question}}" in value:
-                        obj[key] = value.replace("{{question}}", question_text)
-                return obj
-            if isinstance(obj, list):
-                return [replace_question_placeholder(item, question_text) for item in obj]
-            return obj
-
-        request_data = replace_question_placeholder(request_data, question.question_text)
-
-        headers = {"Content-Type": "application/json"}
-        if api_config.api_key:
-            headers["Authorization"] = f"Bearer {api_config.api_key}"
-
-        if api_config.headers:
-            headers.update(api_config.headers)
-
-        start_time = time.time()
-        first_response_time = None
+        row, error = await self._request_answer(
+            str(question.id),
+            question.question_text,
+            endpoint,
+            retry_policy or RetryPolicy(),
+            version,
+        )
+        if row is None:
+            return None, error
 
         try:
-            async with httpx.AsyncClient(timeout=api_config.timeout) as client:
-                response = await client.post(
-                    api_config.endpoint_url,
-                    headers=headers,
-                    json=request_data,
-                )
-
-                first_response_time = int((time.time() - start_time) * 1000)
+            return await self._run_db(crud_rag.create_rag_answer, data=row), None
+        except IntegrityError:
+            await self._run_db(crud_rag.rollback)
+            return None, f"该问题已存在版本 {version} 的回答"
 
-                if response.status_code != 200:
-                    return None, f"API请求失败: {response.status_code} - {response.text}"
+    async def _request_answer(
+        self,
+        question_id: str,
+        question_text: str,
+        endpoint: RagEndpointConfig,
+        policy: RetryPolicy,
+        version: Optional[str],
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Ask the RAG endpoint one question through its system adapter and build
+        the rag_answers row.
 
-                try:
-                    response_json = response.json()
-                except json.JSONDecodeError:
-                    return None, "无法解析API响应JSON"
+        Timeouts, connection errors and retryable status codes are retried per
+        ``policy``. Every attempt goes through the endpoint's circuit breaker,
+        so a dead backend fails fast instead of being hammered.
+        """
+        try:
+            adapter = get_rag_adapter(endpoint.type)
+            client = http_clients.get(endpoint.url)
+        except ValueError as exc:
+            return None, str(exc)
+        breaker = circuit_breakers.get(endpoint.url)
+
+        error = None
+        for attempt in range(1, policy.max_attempts + 1):
+            try:
+                breaker.before_call()
+            except CircuitOpenError as exc:
+                return None, str(exc)
 
-                answer_text = self._extract_answer_from_response(response_json, api_config.response_path)
-                if not answer_text:
-                    return None, f"无法从响应中提取回答，路径: {api_config.response_path}"
+            retry_after = None
+            try:
+                reply = await adapter.fetch(client, endpoint, question_text)
+            except httpx.TimeoutException:
+                error = "API请求超时"
+            except httpx.TransportError as exc:
+                error = f"无法连接到RAG接口: {str(exc)}"
+            except RagHTTPError as exc:
+                error = str(exc)
+                if not policy.is_retryable_status(exc.status_code):
+                    # 后端可用，只是请求本身有误，重试无意义
+                    breaker.record_success()
+                    return None, error
+                retry_after = exc.retry_after
+            except (RagResponseError, ValueError) as exc:
+                breaker.record_success()
+                return None, str(exc)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except BaseException:
+                # 其他异常（如响应解码失败）也计为失败，否则半开探测永远不会结束
+                breaker.record_failure()
+                raise
+            else:
+                breaker.record_success()
+                return self._build_answer_row(question_id, reply, attempt, version), None
 
-                total_response_time = int((time.time() - start_time) * 1000)
-                character_count = len(answer_text)
-                characters_per_second = character_count / (total_response_time / 1000) if total_response_time > 0 else 0
-
-                RagAnswerCreate(
-                    question_id=str(question.id),
-                    answer_text=answer_text,
-                    collection_method="api",
-                    source_system=source_system,
-                    first_response_time=first_response_time,
-                    total_response_time=total_response_time,
-                    character_count=character_count,
-                    raw_response=response_json,
-                    api_config_id=None,
-                )
+            breaker.record_failure()
+            if attempt < policy.max_attempts:
+                await asyncio.sleep(policy.backoff(attempt, retry_after))
 
-                db_obj = crud_rag.create_rag_answer(
-                    self.db,
-                    data={
-                        "question_id": question.id,
-                        "answer_text": answer_text,
-                        "collection_method": "api",
-                        "source_system": source_system,
-                        "first_response_time": first_response_time,
-                        "total_response_time": total_response_time,
-                        "character_count": character_count,
-                        "characters_per_second": characters_per_second,
-                        "raw_response": response_json,
-                        "answer_metadata": None,
-                    },
-                )
+        return None, f"{error}（已尝试{policy.max_attempts}次）"
 
-                return db_obj, None
+    def _build_answer_row(
+        self,
+        question_id: str,
+        reply: RagReply,
+        attempt_count: int,
+        version: Optional[str],
+    ) -> Dict[str, Any]:
+        character_count = len(reply.answer)
+        total_response_time = reply.total_response_time
+        characters_per_second = character_count / total_response_time if total_response_time > 0 else 0
 
-        except httpx.TimeoutException:
-            return None, "API请求超时"
-        except Exception as exc:
-            return None, f"收集回答时出错: {str(exc)}"
+        return {
+            "id": str(uuid.uuid4()),
+            "question_id": question_id,
+            "answer": reply.answer,
+            "collection_method": "api",
+            "first_response_time": round(reply.first_response_time, 3),
+            "total_response_time": round(total_response_time, 3),
+            "character_count": character_count,
+            "characters_per_second": round(characters_per_second, 2),
+            "raw_response": reply.raw_response,
+            "version": version,
+            "attempt_count": attempt_count,
+        }
 
     async def collect_answers_batch(
         self,
         question_ids: List[str],
-        api_config: ApiRequestConfig,
+        endpoint: RagEndpointConfig,
         concurrent_requests: int = 1,
         max_attempts: int = 1,
         source_system: str = "RAG系统",
         collect_performance: bool = True,
+        version: Optional[str] = None,
+        overwrite: bool = False,
+        coalesce: bool = False,
+        on_flush: Optional[Callable[[List[CollectionOutcome]], Awaitable[None]]] = None,
+        should_stop: Optional[Callable[[], Awaitable[bool]]] = None,
     ) -> Dict[str, Any]:
-        """Collect answers for multiple questions."""
-        questions = crud_rag.get_questions_by_ids(self.db, question_ids)
-        if not questions:
+        """
+        Collect answers for multiple questions as a bounded pipeline.
+
+        A producer loads questions chunk by chunk into a queue sized to the
+        concurrency, ``concurrent_requests`` workers call the RAG API, and a
+        single writer inserts the answers every ``RAG_COLLECT_FLUSH_ROWS``
+        outcomes or ``RAG_COLLECT_FLUSH_MS`` milliseconds, whichever comes
+        first. Memory stays proportional to the concurrency, not to the number
+        of questions.
+
+        Questions that already have an answer for ``version`` are looked up
+        with one query and skipped without calling the RAG API, so a rerun only
+        collects what is missing. With ``overwrite`` they are collected again
+        and their answers updated in place.
+
+        With ``coalesce``, questions with identical text share one RAG call per
+        run (concurrent duplicates wait for it, later ones reuse its answer)
+        and each still gets its own answer row. This is for answer coverage,
+        not load generation. Failed calls are not reused, and reused answers
+        are kept without their raw response.
+
+        ``on_flush`` is awaited with the outcomes of each flush once the
+        answers are committed; ``should_stop`` is awaited by the producer, and
+        returning True stops feeding new questions while in-flight ones still
+        finish.
+        """
+        question_ids = list(dict.fromkeys(str(question_id) for question_id in question_ids))
+        if not question_ids:
             return {
                 "success": False,
                 "error": "未找到任何问题",
                 "results": [],
             }
 
-        tasks = []
-        for question in questions:
-            tasks.append(self.collect_answer_api(question, api_config, source_system, collect_performance))
-
-        semaphore = asyncio.Semaphore(concurrent_requests)
+        policy = RetryPolicy(
+            max_attempts=max_attempts,
+            base_delay=settings.RAG_RETRY_BASE_DELAY,
+            max_delay=settings.RAG_RETRY_MAX_DELAY,
+        )
+        existing = {} if overwrite else await self._run_db(
+            crud_rag.get_answer_ids_by_question_and_version, question_ids, version
+        )
+        flights = SingleFlight() if coalesce else None
+        workers = max(1, concurrent_requests)
+        pending: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        outcomes: asyncio.Queue = asyncio.Queue(maxsize=settings.RAG_COLLECT_FLUSH_ROWS * 2)
+        summary = {"success_count": 0, "failed_count": 0, "skipped_count": 0, "errors": []}
+
+        async def feed() -> None:
+            for start in range(0, len(question_ids), QUESTION_LOAD_CHUNK):
+                chunk = question_ids[start:start + QUESTION_LOAD_CHUNK]
+                missing = [question_id for question_id in chunk if question_id not in existing]
+                texts = dict(await self._run_db(crud_rag.list_question_texts_by_ids, missing)) if missing else {}
+                for question_id in chunk:
+                    if should_stop and await should_stop():
+                        return
+                    if question_id in existing:
+                        await outcomes.put(CollectionOutcome(
+                            question_id, "skipped", existing[question_id], None, None
+                        ))
+                    elif question_id in texts:
+                        await pending.put((question_id, texts[question_id]))
+                    else:
+                        await outcomes.put(CollectionOutcome(question_id, "failed", None, None, "问题不存在"))
+
+        async def produce() -> None:
+            await feed()
+            # 出错时由外层取消全部任务，无需再通知工作者
+            for _ in range(workers):
+                await pending.put(None)
+
+        async def work() -> None:
+            while (item := await pending.get()) is not None:
+                question_id, question_text = item
+                ask = functools.partial(self._request_answer, question_id, question_text, endpoint, policy, version)
+                try:
+                    if flights is None:
+                        row, error = await ask()
+                    else:
+                        (row, error), shared = await flights.do((endpoint.url, question_text), ask, _retain_answer)
+                        if row is not None and shared:
+                            row = {**row, "id": str(uuid.uuid4()), "question_id": question_id}
+                except Exception as exc:
+                    row, error = None, f"收集回答时出错: {str(exc)}"
+                await outcomes.put(row or CollectionOutcome(question_id, "failed", None, None, error))
+
+        async def flush(rows: List[Dict[str, Any]], settled: List[CollectionOutcome]) -> None:
+            if not rows and not settled:
+                return
+            written = await self._run_db(crud_rag.insert_rag_answers, rows, overwrite=overwrite) if rows else {}
+            flushed = list(settled)
+            for row in rows:
+                question_id = row["question_id"]
+                # 未写入说明其他任务已先收集了该版本的回答
+                status = "succeeded" if question_id in written else "skipped"
+                flushed.append(CollectionOutcome(
+                    question_id, status, written.get(question_id), row["attempt_count"], None
+                ))
+
+            for outcome in flushed:
+                if outcome.status == "succeeded":
+                    summary["success_count"] += 1
+                    continue
+                if outcome.status == "skipped":
+                    summary["skipped_count"] += 1
+                    continue
+                summary["failed_count"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"question_id": outcome.question_id, "error": outcome.error})
+
+            if on_flush:
+                await on_flush(flushed)
+            rows.clear()
+            settled.clear()
+
+        async def write() -> None:
+            loop = asyncio.get_running_loop()
+            rows: List[Dict[str, Any]] = []
+            settled: List[CollectionOutcome] = []
+            deadline = 0.0
+            while True:
+                buffered = len(rows) + len(settled)
+                timeout = max(0.0, deadline - loop.time()) if buffered else None
+                try:
+                    item = await asyncio.wait_for(outcomes.get(), timeout)
+                except asyncio.TimeoutError:
+                    await flush(rows, settled)
+                    continue
+                if item is None:
+                    await flush(rows, settled)
+                    return
+
+                if not buffered:
+                    deadline = loop.time() + settings.RAG_COLLECT_FLUSH_MS / 1000
+                if isinstance(item, CollectionOutcome):
+                    settled.append(item)
+                else:
+                    rows.append(item)
+                if buffered + 1 >= settings.RAG_COLLECT_FLUSH_ROWS:
+                    await flush(rows, settled)
 
-        async def bounded_collect(task):
-            async with semaphore:
-                return await task
+        feeders = {asyncio.create_task(produce()), *(asyncio.create_task(work()) for _ in range(workers))}
+        tasks = {*feeders, asyncio.create_task(write())}
+        running = set(tasks)
+        try:
+            # 任一任务出错即结束整个流水线，避免其余任务阻塞在有界队列上
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+                if feeders and all(task.done() for task in feeders):
+                    # 生产者与工作者都已结束，通知写入者收尾
+                    feeders = set()
+                    closing = asyncio.create_task(outcomes.put(None))
+                    tasks.add(closing)
+                    running.add(closing)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-        bounded_tasks = [bounded_collect(task) for task in tasks]
-        results = await asyncio.gather(*bounded_tasks)
+        return {
+            "success": True,
+            "total": len(question_ids),
+            "success_count": summary["success_count"],
+            "failed_count": summary["failed_count"],
+            "skipped_count": summary["skipped_count"],
+            "errors": summary["errors"],
+        }
 
-        success_count = 0
-        failed_count = 0
-        success_results = []
-        error_results = []
+    def create_collection_job(
+        self,
+        *,
+        project_id: str,
+        user_id: str,
+        question_ids: List[str],
+        endpoint: RagEndpointConfig,
+        concurrent_requests: int,
+        max_attempts: int,
+        version: Optional[str],
+        overwrite: bool = False,
+        coalesce: bool = False,
+    ) -> RagCollectionJob:
+        return crud_rag.create_collection_job(
+            self.db,
+            data={
+                "project_id": project_id,
+                "created_by": user_id,
+                "version": version,
+                "status": "queued",
+                "settings": {
+                    "rag_type": endpoint.type,
+                    "endpoint_url": endpoint.url,
+                    "concurrent_requests": concurrent_requests,
+                    "max_attempts": max_attempts,
+                    "overwrite": overwrite,
+                    "coalesce": coalesce,
+                },
+            },
+            question_ids=list(dict.fromkeys(str(question_id) for question_id in question_ids)),
+        )
 
-        for (answer, error), question in zip(results, questions):
-            if answer:
-                success_count += 1
-                success_results.append({
-                    "question_id": str(question.id),
-                    "answer_id": str(answer.id),
-                    "success": True,
-                })
-            else:
-                failed_count += 1
-                error_results.append({
-                    "question_id": str(question.id),
-                    "success": False,
-                    "error": error,
-                })
+    def get_collection_job(self, job_id: str) -> Optional[RagCollectionJob]:
+        return crud_rag.get_collection_job(self.db, job_id)
 
+    def get_collection_progress(self, job: RagCollectionJob) -> Dict[str, Any]:
+        completed = job.succeeded_questions or 0
+        failed = job.failed_questions or 0
         return {
-            "success": True,
-            "total": len(questions),
-            "success_count": success_count,
-            "failed_count": failed_count,
-            "results": success_results + error_results,
+            "job_id": str(job.id),
+            "status": job.status,
+            "total": job.total_questions,
+            "completed": completed,
+            "failed": failed,
+            "in_progress": max(0, job.total_questions - completed - failed),
+            "errors": crud_rag.list_collection_job_errors(self.db, str(job.id), limit=MAX_JOB_ERRORS),
         }
 
+    def get_collection_results(
+        self,
+        job_id: str,
+        *,
+        status: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-question outcomes of a job, a page at a time, in the shape of the
+        ``results`` entries the synchronous collect response used to return.
+        """
+        return [
+            {
+                "question_id": str(item.question_id),
+                "status": item.status,
+                "success": item.status == "succeeded",
+                "answer_id": str(item.answer_id) if item.answer_id else None,
+                "attempts": item.attempt_count,
+                "error": item.error,
+            }
+            for item in crud_rag.list_collection_job_results(
+                self.db, job_id, status=status, skip=skip, limit=limit
+            )
+        ]
+
+    def cancel_collection_job(self, job_id: str) -> bool:
+        """Cancel a queued or running job; in-flight questions still finish and are recorded."""
+        return crud_rag.transition_collection_job(
+            self.db,
+            job_id,
+            from_statuses=("queued", "running"),
+            to_status="cancelled",
+            fields={"finished_at": datetime.now(timezone.utc)},
+        )
+
+    def requeue_collection_job(self, job_id: str) -> bool:
+        """
+        Queue a finished, failed or cancelled job again, or a running one whose
+        process stopped reporting progress. Only pending and failed questions
+        are collected on the next run.
+        """
+        return crud_rag.transition_collection_job(
+            self.db,
+            job_id,
+            from_statuses=("completed", "failed", "cancelled"),
+            to_status="queued",
+            fields={"finished_at": None, "last_error": None},
+            stale_before=datetime.now(timezone.utc) - timedelta(seconds=settings.RAG_COLLECTION_JOB_STALE_SECONDS),
+        )
+
+    def check_resume_endpoint(self, job: RagCollectionJob, endpoint: RagEndpointConfig) -> None:
+        """
+        Raise ValueError unless ``endpoint`` is the RAG system the job was
+        created with, so a resumed job never mixes answers from two systems
+        under one version. Credentials are not stored with the job, hence the
+        caller supplies the config again and only its identity is compared.
+        """
+        job_settings = job.settings or {}
+        if job_settings.get("rag_type") != endpoint.type or job_settings.get("endpoint_url") != endpoint.url:
+            raise ValueError("Endpoint does not match the job's RAG endpoint")
+
+    async def run_collection_job(self, job_id: str, endpoint: RagEndpointConfig) -> None:
+        """
+        Run a queued job to completion, recording each flushed batch of outcomes
+        on the job items. Questions that already have an answer for the job's
+        version count as collected, unless the job overwrites them.
+        """
+        if not await self._run_db(
+            crud_rag.transition_collection_job,
+            job_id,
+            from_statuses=("queued",),
+            to_status="running",
+            fields={"started_at": datetime.now(timezone.utc)},
+        ):
+            return
+
+        job = await self._run_db(crud_rag.get_collection_job, job_id)
+        job_settings = job.settings or {}
+        question_ids = await self._run_db(
+            crud_rag.list_collection_job_question_ids, job_id, statuses=("pending", "failed")
+        )
+
+        last_poll = [time.monotonic()]
+
+        async def should_stop() -> bool:
+            now = time.monotonic()
+            if now - last_poll[0] < JOB_STATUS_POLL_SECONDS:
+                return False
+            last_poll[0] = now
+            # 轮询状态的同时刷新心跳，刷新批次较慢时任务也不会被当作失联而重新入队
+            return not await self._run_db(crud_rag.touch_running_collection_job, job_id)
+
+        async def on_flush(outcomes: List[CollectionOutcome]) -> None:
+            await self._run_db(
+                crud_rag.record_collection_job_outcomes,
+                job_id,
+                [
+                    {
+                        "question_id": outcome.question_id,
+                        "status": "failed" if outcome.status == "failed" else "succeeded",
+                        "answer_id": outcome.answer_id,
+                        "attempt_count": outcome.attempt_count,
+                        "error": outcome.error if outcome.status == "failed" else None,
+                    }
+                    for outcome in outcomes
+                ],
+            )
+
+        try:
+            if question_ids:
+                await self.collect_answers_batch(
+                    question_ids,
+                    endpoint,
+                    concurrent_requests=job_settings.get("concurrent_requests", 1),
+                    max_attempts=job_settings.get("max_attempts", 1),
+                    version=job.version,
+                    overwrite=job_settings.get("overwrite", False),
+                    coalesce=job_settings.get("coalesce", False),
+                    on_flush=on_flush,
+                    should_stop=should_stop,
+                )
+        except Exception as exc:
+            logger.exception("RAG collection job failed job_id=%s", job_id)
+            await self._run_db(crud_rag.rollback)
+            await self._run_db(
+                crud_rag.transition_collection_job,
+                job_id,
+                from_statuses=("running",),
+                to_status="failed",
+                fields={"finished_at": datetime.now(timezone.utc), "last_error": str(exc)[:1000]},
+            )
+            return
+
+        await self._run_db(
+            crud_rag.transition_collection_job,
+            job_id,
+            from_statuses=("running",),
+            to_status="completed",
+            fields={"finished_at": datetime.now(timezone.utc)},
+        )
+
     def import_answers_manual(
         self,
         answers: List[Dict[str, Any]],
@@ -247,21 +646,6 @@ class RagService:
             "results": results,
         }
 
-    def _extract_answer_from_response(self, response_json: Dict[str, Any], path: str) -> Optional[str]:
-        try:
-            parts = path.split(".")
-            current = response_json
-
-            for part in parts:
-                if part in current:
-                    current = current[part]
-                else:
-                    return None
-
-            return current if isinstance(current, str) else str(current)
-        except Exception:
-            return None
-
     def get_rag_answer(self, answer_id: str) -> Optional[RagAnswer]:
         return crud_rag.get_rag_answer(self.db, answer_id)
 
@@ -339,3 +723,9 @@ class RagService:
     def get_dataset_versions(self, dataset_id: str) -> List[Dict[str, Any]]:
         version_counts = crud_rag.get_dataset_version_counts(self.db, dataset_id)
         return [{"version": v[0], "count": v[1]} for v in version_counts]
+
+
+async def run_collection_job_in_background(job_id: str, endpoint: RagEndpointConfig) -> None:
+    """Entry point for background tasks: runs the job on its own async session."""
+    async with AsyncSessionLocal() as db:
+        await RagService(db).run_collection_job(job_id, endpoint)
@@ -0,0 +1,129 @@
+"""
+请求模板与响应路径的预编译
+
+RAG 接口配置在一次收集中对每个问题都要使用：请求模板预先序列化为 JSON 片段，
+渲染时只需拼接转义后的问题文本；响应路径预先解析为取值步骤。
+"""
+import json
+from functools import lru_cache
+from typing import Any, List, Tuple
+
+PLACEHOLDER = "{{question}}"
+
+_FIELD = "field"
+_INDEX = "index"
+_WILDCARD = "wildcard"
+
+
+class RequestTemplate:
+    """
+    A JSON request template with ``{{question}}`` slots, compiled once.
+
+    The template is serialized a single time and split at the placeholder;
+    rendering joins the pieces with the JSON-escaped question and returns the
+    request body as bytes, so no per-request walk or ``json.dumps`` is needed.
+    Placeholders are replaced wherever they appear, as the web client does.
+    """
+
+    def __init__(self, template: Any):
+        serialized = json.dumps(template if template is not None else {}, ensure_ascii=False)
+        self._parts = [part.encode("utf-8") for part in serialized.split(PLACEHOLDER)]
+
+    def render(self, question: str) -> bytes:
+        if len(self._parts) == 1:
+            return self._parts[0]
+        # 去掉首尾引号即为可嵌入 JSON 字符串内部的转义文本
+        escaped = json.dumps(question, ensure_ascii=False)[1:-1].encode("utf-8")
+        return escaped.join(self._parts)
+
+
+class JsonPath:
+    """
+    Compiled accessor for paths such as ``data.text``, ``choices[0].delta.content``
+    or ``data.outputs[*].text``.
+
+    A leading ``$`` is optional. ``[n]`` indexes a list (negative indices count
+    from the end), as does a numeric segment such as ``choices.0`` the way the
+    web client reads it; ``[*]`` or ``*`` fans out over every list item or dict value.
+    Without wildcards the accessor returns a single value or None; with them it
+    returns the list of matches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._steps = _parse_path(path)
+        self.has_wildcard = any(kind == _WILDCARD for kind, _ in self._steps)
+
+    def __call__(self, obj: Any) -> Any:
+        if not self.has_wildcard:
+            current = obj
+            for kind, key in self._steps:
+                current = _step(current, kind, key)
+                if current is None:
+                    return None
+            return current
+
+        matches = [obj]
+        for kind, key in self._steps:
+            if kind == _WILDCARD:
+                matches = [
+                    child
+                    for match in matches
+                    for child in (match.values() if isinstance(match, dict) else match if isinstance(match, list) else ())
+                ]
+            else:
+                matches = [value for value in (_step(match, kind, key) for match in matches) if value is not None]
+        return matches
+
+
+@lru_cache(maxsize=256)
+def compile_path(path: str) -> JsonPath:
+    return JsonPath(path or "")
+
+
+def _step(current: Any, kind: str, key: Any) -> Any:
+    if kind == _FIELD:
+        if isinstance(current, list) and key.isdigit():
+            # 前端按点号逐段取值，choices.0.delta 同样可以取列表元素
+            key = int(key)
+        else:
+            return current.get(key) if isinstance(current, dict) else None
+    if isinstance(current, list) and -len(current) <= key < len(current):
+        return current[key]
+    return None
+
+
+def _parse_path(path: str) -> List[Tuple[str, Any]]:
+    steps: List[Tuple[str, Any]] = []
+    text = path.strip()
+    if text.startswith("$"):
+        text = text[1:]
+
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char == ".":
+            position += 1
+            continue
+        if char == "[":
+            end = text.find("]", position)
+            if end == -1:
+                raise ValueError(f"响应路径格式错误: {path}")
+            token = text[position + 1:end].strip().strip("'\"")
+            if token == "*":
+                steps.append((_WILDCARD, None))
+            else:
+                try:
+                    steps.append((_INDEX, int(token)))
+                except ValueError:
+                    steps.append((_FIELD, token))
+            position = end + 1
+            continue
+
+        end = position
+        while end < len(text) and text[end] not in ".[":
+            end += 1
+        token = text[position:end]
+        steps.append((_WILDCARD, None) if token == "*" else (_FIELD, token))
+        position = end
+    return steps
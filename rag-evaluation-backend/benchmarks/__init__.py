@@ -0,0 +1 @@
+"""性能基准测试与本地模拟服务"""
@@ -0,0 +1,318 @@
+"""
+精度评测流水线基准测试
+
+Runs the accuracy evaluation pipeline end to end against the local mock judge
+(``benchmarks.mock_llm``) and a real PostgreSQL database (``DATABASE_URL``):
+seed a dataset, create the test, judge every item through
+``AccuracyService.run_ai_evaluation`` in API-sized batches, then clean up.
+
+For each size it reports items per second, DB round-trips per item and peak
+RSS. Items the judge fails on are retried in later passes, at most
+``--judge-attempts`` times each; those still unjudged are reported as
+``unfinished``. Every size runs in a fresh child process so the RSS figures do not bleed
+into each other.
+
+    python -m benchmarks.accuracy_pipeline --sizes 1000,10000,50000 --output bench.json
+    python -m benchmarks.accuracy_pipeline --sizes 1000 --baseline bench.json --max-regression 0.2
+
+With ``--baseline`` the run exits non-zero when throughput drops, or round-trips
+per item grow, by more than ``--max-regression`` for any size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# 基准测试使用固定的测试密钥加密模型 API Key
+os.environ.setdefault("API_KEY_MASTER_KEY", "00" * 32)
+
+BATCH_SIZE = 200
+INSERT_CHUNK = 5000
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def mock_judge(args: argparse.Namespace) -> Iterator[str]:
+    port = _free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.mock_llm",
+        "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--rate-limit-ratio", str(args.rate_limit_ratio),
+        "--malformed-ratio", str(args.malformed_ratio),
+    ])
+    try:
+        deadline = time.time() + 15
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError("mock judge did not start")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+class RoundTripCounter:
+    """Counts statements sent to the database through the shared engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args: Any) -> None:
+        self.count += 1
+
+
+def seed_dataset(db, size: int) -> Dict[str, str]:
+    from sqlalchemy import insert
+
+    from app.models import Dataset, Project, ProjectDataset, Question, RagAnswer, User
+
+    suffix = uuid.uuid4().hex[:8]
+    user = User(email=f"bench-{suffix}@example.com", password_hash="x", name="bench")
+    db.add(user)
+    db.flush()
+    project = Project(user_id=user.id, name=f"bench-{suffix}")
+    dataset = Dataset(user_id=user.id, name=f"bench-{suffix}")
+    db.add_all([project, dataset])
+    db.flush()
+    db.add(ProjectDataset(project_id=project.id, dataset_id=dataset.id))
+
+    for start in range(0, size, INSERT_CHUNK):
+        questions = []
+        answers = []
+        for index in range(start, min(start + INSERT_CHUNK, size)):
+            question_id = str(uuid.uuid4())
+            questions.append({
+                "id": question_id,
+                "dataset_id": dataset.id,
+                "question_text": f"基准问题 {index}：系统如何处理第 {index} 类请求？",
+                "standard_answer": f"参考答案 {index}",
+            })
+            answers.append({
+                "id": str(uuid.uuid4()),
+                "question_id": question_id,
+                "answer": f"RAG 回答 {index}",
+                "collection_method": "api",
+                "version": "bench",
+            })
+        db.execute(insert(Question.__table__), questions)
+        db.execute(insert(RagAnswer.__table__), answers)
+
+    db.commit()
+    return {"user_id": str(user.id), "project_id": str(project.id), "dataset_id": str(dataset.id)}
+
+
+def cleanup(db, seeded: Dict[str, str], model_config_id: str) -> None:
+    from app.models import Dataset, ModelConfig, Project, Question, RagAnswer, User
+
+    db.rollback()
+    # 先删项目（级联删除引用回答的评测条目），再删回答：rag_answers 没有指向 questions 的外键，不会随数据集级联删除
+    db.query(Project).filter(Project.id == seeded["project_id"]).delete(synchronize_session=False)
+    seeded_questions = db.query(Question.id).filter(Question.dataset_id == seeded["dataset_id"])
+    db.query(RagAnswer).filter(RagAnswer.question_id.in_(seeded_questions.scalar_subquery())).delete(
+        synchronize_session=False
+    )
+    db.query(Dataset).filter(Dataset.id == seeded["dataset_id"]).delete(synchronize_session=False)
+    db.query(ModelConfig).filter(ModelConfig.id == model_config_id).delete(synchronize_session=False)
+    db.query(User).filter(User.id == seeded["user_id"]).delete(synchronize_session=False)
+    db.commit()
+
+
+def run_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    from app.db.base import SessionLocal, engine
+    from app.models import AccuracyTestItem, ModelConfig
+    from app.schemas.accuracy import AccuracyTestCreate, AIEvaluateRequest
+    from app.schemas.user_model_config import UserModelConfigCreate
+    from app.services.accuracy_service import AccuracyService
+    from app.services.user_model_config_service import create_user_model_config
+
+    db = SessionLocal()
+    seeded = seed_dataset(db, size)
+    model_config = ModelConfig(name="bench-mock", provider="openai", model="mock", api_base="")
+    db.add(model_config)
+    db.commit()
+    model_config_id = str(model_config.id)
+
+    try:
+        with mock_judge(args) as api_base:
+            model_config.api_base = api_base
+            db.commit()
+            user_config = create_user_model_config(
+                db,
+                seeded["user_id"],
+                UserModelConfigCreate(model_config_id=model_config_id, api_key="sk-bench-0000"),
+            )
+
+            counter = RoundTripCounter(engine)
+            service = AccuracyService(db)
+
+            started = time.perf_counter()
+            test = service.create_test(
+                AccuracyTestCreate(
+                    name="bench",
+                    evaluation_type="ai",
+                    scoring_method="five_scale",
+                    dimensions=["accuracy", "relevance", "completeness"],
+                    prompt_template="问题：{{question}}\n参考答案：{{reference_answer}}\n回答：{{rag_answer}}",
+                    version="bench",
+                    project_id=seeded["project_id"],
+                    dataset_id=seeded["dataset_id"],
+                ),
+                seeded["user_id"],
+            )
+            service.start_test(test.id)
+            created = time.perf_counter()
+
+            request = AIEvaluateRequest(
+                user_model_config_id=user_config.id,
+                limit=BATCH_SIZE,
+                concurrency=args.concurrency,
+                judging_mode=args.judging_mode,
+            )
+
+            def pending_item_ids() -> List[str]:
+                return [
+                    str(item_id)
+                    for (item_id,) in db.query(AccuracyTestItem.id)
+                    .filter(AccuracyTestItem.evaluation_id == test.id, AccuracyTestItem.status == "pending")
+                    .order_by(AccuracyTestItem.sequence_number)
+                ]
+
+            async def judge_all() -> Dict[str, int]:
+                totals = {"evaluated": 0, "failed": 0}
+                # 每轮每个条目只评测一次，出错的条目留到下一轮重试，不会在之后的每个批次中反复占位
+                queue = pending_item_ids()
+                for _ in range(args.judge_attempts):
+                    for start in range(0, len(queue), BATCH_SIZE):
+                        outcome = await service.run_ai_evaluation(
+                            test.id,
+                            seeded["user_id"],
+                            request.model_copy(update={"item_ids": queue[start:start + BATCH_SIZE]}),
+                        )
+                        totals["evaluated"] += outcome["evaluated"]
+                        totals["failed"] += outcome["failed"]
+                    queue = pending_item_ids()
+                    if not queue:
+                        break
+                totals["unfinished"] = len(queue)
+                return totals
+
+            totals = asyncio.run(judge_all())
+            finished = time.perf_counter()
+
+            test = service.get_test_detail(test.id)
+            return {
+                "size": size,
+                "judging_mode": args.judging_mode,
+                "evaluated": totals["evaluated"],
+                "failed": totals["failed"],
+                "unfinished": totals["unfinished"],
+                "status": test.status,
+                "create_seconds": round(created - started, 3),
+                "judge_seconds": round(finished - created, 3),
+                "items_per_second": round(totals["evaluated"] / (finished - started), 1),
+                "db_round_trips": counter.count,
+                "db_round_trips_per_item": round(counter.count / size, 3),
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            }
+    finally:
+        cleanup(db, seeded, model_config_id)
+        db.close()
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> List[str]:
+    with open(baseline_path) as f:
+        baseline = {entry["size"]: entry for entry in json.load(f)}
+
+    problems = []
+    for result in results:
+        reference = baseline.get(result["size"])
+        if not reference:
+            continue
+        if result["items_per_second"] < reference["items_per_second"] * (1 - max_regression):
+            problems.append(
+                f"{result['size']} items: {result['items_per_second']} items/s "
+                f"vs baseline {reference['items_per_second']}"
+            )
+        if result["db_round_trips_per_item"] > reference["db_round_trips_per_item"] * (1 + max_regression):
+            problems.append(
+                f"{result['size']} items: {result['db_round_trips_per_item']} round-trips/item "
+                f"vs baseline {reference['db_round_trips_per_item']}"
+            )
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--judging-mode", choices=["single", "self_consistency"], default="single")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--malformed-ratio", type=float, default=0.0)
+    parser.add_argument("--judge-attempts", type=int, default=3, help="times each item is judged before it counts as unfinished")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--single-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_size:
+        print(json.dumps(run_size(args.single_size, args)))
+        return
+
+    results = []
+    passthrough = [
+        "--concurrency", str(args.concurrency),
+        "--judging-mode", args.judging_mode,
+        "--latency-ms", str(args.latency_ms),
+        "--rate-limit-ratio", str(args.rate_limit_ratio),
+        "--malformed-ratio", str(args.malformed_ratio),
+        "--judge-attempts", str(args.judge_attempts),
+    ]
+    for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.accuracy_pipeline", "--single-size", str(size), *passthrough],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        problems = compare(results, args.baseline, args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+本地 OpenAI 兼容评测模型替身（chat completions 格式）
+
+Scores are a pure function of the prompt, so repeated runs over the same data
+produce the same results. Latency, HTTP 429 responses and malformed bodies can
+be injected to exercise the evaluation pipeline's error handling.
+
+    python -m benchmarks.mock_llm --port 9100 --latency-ms 50 --rate-limit-ratio 0.01
+
+Point a model config's api_base at ``http://127.0.0.1:9100/v1``.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+
+@dataclass
+class MockLLMConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_limit_ratio: float = 0.0
+    malformed_ratio: float = 0.0
+    dimensions: tuple = ("accuracy", "relevance", "completeness")
+    seed: int = 0
+
+
+def score_prompt(prompt: str, dimensions: tuple) -> Dict[str, Any]:
+    """Deterministic 1-5 scores derived from the prompt text."""
+    digest = hashlib.md5(prompt.encode("utf-8")).digest()
+    dimension_scores = {dim: digest[index] % 5 + 1 for index, dim in enumerate(dimensions)}
+    overall = round(sum(dimension_scores.values()) / len(dimension_scores))
+    return {"overall_score": overall, "dimension_scores": dimension_scores}
+
+
+def render_judgment(scores: Dict[str, Any]) -> str:
+    """Reply in the format the judge parser expects: reasoning, ####, then a YAML block."""
+    lines = [
+        "评估思路：对照参考答案逐项检查。",
+        "####",
+        "```yaml",
+        f"overall_score: {scores['overall_score']}",
+        "dimension_scores:",
+    ]
+    lines += [f"  - {dim}: {score}" for dim, score in scores["dimension_scores"].items()]
+    lines += ["evaluation_reason: 模拟评测结果", "```"]
+    return "\n".join(lines)
+
+
+def create_app(config: Optional[MockLLMConfig] = None) -> FastAPI:
+    config = config or MockLLMConfig()
+    app = FastAPI(title="Mock LLM")
+    # 故障注入使用独立的随机序列，保证同一种子下可复现
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "rate_limited": 0, "malformed": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+
+        delay = config.latency_ms + (rng.uniform(-config.jitter_ms, config.jitter_ms) if config.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if config.rate_limit_ratio and rng.random() < config.rate_limit_ratio:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                headers={"Retry-After": "1"},
+            )
+
+        if config.malformed_ratio and rng.random() < config.malformed_ratio:
+            stats["malformed"] += 1
+            return Response(content='{"choices": [{"message": ', media_type="application/json")
+
+        messages: List[Dict[str, Any]] = body.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = render_judgment(score_prompt(prompt, config.dimensions))
+        return {
+            "id": f"chatcmpl-mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        }
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--malformed-ratio", type=float, default=0.0, help="share of requests answered with broken JSON")
+    parser.add_argument("--dimensions", default="accuracy,relevance,completeness")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = MockLLMConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_ratio=args.rate_limit_ratio,
+        malformed_ratio=args.malformed_ratio,
+        dimensions=tuple(dim.strip() for dim in args.dimensions.split(",") if dim.strip()),
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
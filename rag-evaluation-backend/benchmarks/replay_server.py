@@ -0,0 +1,113 @@
+"""
+录制流量回放服务器 - 按原始（或缩放后的）时间重放上游 RAG 响应
+
+Start the backend with ``HTTP_CAPTURE_PATH=capture.jsonl.gz`` to record what
+the RAG proxy and answer collection receive, then serve the recording:
+
+    python -m benchmarks.replay_server capture.jsonl.gz --port 9200 --speed 2
+
+Point a RAG config at ``http://127.0.0.1:9200`` with the recorded path. A
+request is answered with the recording of the same method, path and body;
+unknown bodies (e.g. other questions) cycle through the recordings for that
+path. ``--speed 2`` replays twice as fast, ``--speed 0`` without delays.
+"""
+import argparse
+import asyncio
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.http_capture import load_captures, request_key, split_body
+
+
+@dataclass
+class ReplayConfig:
+    speed: float = 1.0
+    # False 时只按请求体精确匹配，未录制的请求返回 404
+    fallback_by_path: bool = True
+
+
+def _path_of(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def create_app(records: Iterable[Dict[str, Any]], config: Optional[ReplayConfig] = None) -> FastAPI:
+    config = config or ReplayConfig()
+    app = FastAPI(title="RAG Replay")
+    by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    by_path: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        if not record.get("complete", True):
+            continue
+        by_key[record["request_key"]].append(record)
+        by_path[(record["method"], _path_of(record["url"]))].append(record)
+    # 同一请求或路径有多条录制时轮流使用
+    key_cycles: Dict[str, Iterator[Dict[str, Any]]] = {key: itertools.cycle(items) for key, items in by_key.items()}
+    path_cycles: Dict[tuple, Iterator[Dict[str, Any]]] = {key: itertools.cycle(items) for key, items in by_path.items()}
+    stats = {"requests": 0, "exact": 0, "by_path": 0, "missing": 0}
+
+    async def pause_until(loop: asyncio.AbstractEventLoop, start: float, offset_ms: float) -> None:
+        if config.speed > 0:
+            delay = start + offset_ms / 1000 / config.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    @app.get("/replay/stats")
+    def get_stats():
+        return stats
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def replay(request: Request):
+        stats["requests"] += 1
+        path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        body = await request.body()
+
+        cycle = key_cycles.get(request_key(request.method, path, body))
+        if cycle is not None:
+            stats["exact"] += 1
+        elif config.fallback_by_path:
+            cycle = path_cycles.get((request.method, path))
+            if cycle is not None:
+                stats["by_path"] += 1
+        if cycle is None:
+            stats["missing"] += 1
+            return JSONResponse({"error": f"没有 {request.method} {path} 的录制"}, status_code=404)
+
+        record = next(cycle)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await pause_until(loop, start, record.get("headers_ms", 0))
+
+        async def body_chunks():
+            for offset_ms, chunk in split_body(record):
+                await pause_until(loop, start, offset_ms)
+                yield chunk
+
+        return StreamingResponse(body_chunks(), status_code=record["status"], headers=record.get("headers") or {})
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="capture file written with HTTP_CAPTURE_PATH (.jsonl or .jsonl.gz)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--speed", type=float, default=1.0, help="timing scale: 2 = twice as fast, 0 = no delays")
+    parser.add_argument("--exact-only", action="store_true", help="404 for requests whose body was not recorded")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = ReplayConfig(speed=args.speed, fallback_by_path=not args.exact_only)
+    uvicorn.run(create_app(load_captures(args.capture), config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.crud import accuracy as crud_accuracy
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(rowcount=2)
+
+
+def test_items_take_the_newest_answer_and_break_ties_by_id():
+    db = RecordingSession()
+
+    created = crud_accuracy.insert_items_for_latest_answers(db, test_id="test-1", dataset_id="dataset-1", version="v2")
+
+    assert created == 2
+    (sql,) = db.statements
+    assert sql.startswith("INSERT INTO accuracy_test_items")
+    assert "SELECT DISTINCT ON (questions.id)" in sql
+    # 同一时刻创建的回答按 id 取舍，结果确定
+    assert "ORDER BY questions.id, rag_answers.created_at DESC, rag_answers.id DESC" in sql
+    assert "rag_answers.version = %(version_1)s" in sql
+    assert "uuid_generate_v4()" in sql
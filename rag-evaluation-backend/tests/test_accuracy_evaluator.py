@@ -0,0 +1,61 @@
+import asyncio
+
+from app.services.evaluation.accuracy.evaluator import (
+    SelfConsistencySettings,
+    judge_with_self_consistency,
+    parse_judgment,
+)
+
+
+def reply(overall: int, completeness: int) -> str:
+    return (
+        "思考过程……\n####\n```yaml\n"
+        f"overall_score: {overall}\n"
+        "dimension_scores:\n"
+        f"  - accuracy: {overall}\n"
+        f"  - completeness: {completeness}\n"
+        "evaluation_reason: ok\n```"
+    )
+
+
+class ScriptedJudge:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        return self.replies.pop(0)
+
+
+def test_parse_judgment_reads_yaml_after_separator():
+    judgment = parse_judgment(reply(4, 3))
+
+    assert judgment.overall_score == 4
+    assert judgment.dimension_scores == {"accuracy": 4, "completeness": 3}
+    assert parse_judgment("no separator") is None
+
+
+def test_self_consistency_stops_once_samples_agree():
+    judge = ScriptedJudge([reply(4, 4), reply(4, 4), reply(4, 5)] + [reply(1, 1)] * 2)
+    settings = SelfConsistencySettings(max_samples=5, min_agreement=3, tolerance=1)
+
+    result = asyncio.run(judge_with_self_consistency(judge, "p", settings))
+
+    assert judge.calls == 3
+    assert result.raw_response["agreed"] is True
+    assert result.score == 4
+    assert round(result.dimension_scores["completeness"], 2) == 4.33
+    assert result.raw_response["variance"]["completeness"] == 0.2222
+
+
+def test_self_consistency_draws_only_missing_samples_until_budget():
+    judge = ScriptedJudge([reply(5, 5), reply(1, 1), reply(3, 3), reply(5, 5), "garbage"])
+    settings = SelfConsistencySettings(max_samples=5, min_agreement=3, tolerance=0)
+
+    result = asyncio.run(judge_with_self_consistency(judge, "p", settings))
+
+    assert judge.calls == 5
+    assert result.raw_response["agreed"] is False
+    assert result.raw_response["samples_unparsed"] == 1
+    assert result.score == 3.5
@@ -0,0 +1,408 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import accuracy_service as accuracy_service_module
+from app.services.accuracy_service import AccuracyService
+
+
+def make_row(item_id: str, question_id: str, status: str = "pending") -> dict:
+    return {
+        "id": item_id,
+        "question_id": question_id,
+        "status": status,
+        "final_score": None,
+        "final_dimension_scores": None,
+        "final_evaluation_reason": None,
+        "final_evaluation_type": None,
+        "ai_score": None,
+        "ai_dimension_scores": None,
+        "ai_evaluation_reason": None,
+        "ai_evaluation_time": None,
+        "ai_raw_response": None,
+        "human_score": None,
+        "human_dimension_scores": None,
+        "human_evaluation_reason": None,
+        "human_evaluator_id": None,
+        "human_evaluation_time": None,
+    }
+
+
+@pytest.fixture
+def fake_crud(monkeypatch):
+    crud = accuracy_service_module.crud_accuracy
+    state = SimpleNamespace(
+        test=SimpleNamespace(
+            id="test-1",
+            status="running",
+            evaluation_type="ai",
+            total_questions=3,
+            processed_questions=0,
+            success_questions=0,
+            failed_questions=0,
+            results_summary=None,
+            result_aggregates=None,
+            completed_at=None,
+            dimensions=["accuracy"],
+            weights={"accuracy": 1.0},
+            scoring_method="five_scale",
+        ),
+        rows=[make_row("item-1", "q1"), make_row("item-2", "q2"), make_row("item-3", "q3")],
+        bulk_calls=[],
+        saves=0,
+    )
+
+    def list_rows(db, *, test_id, question_ids):
+        return [row for row in state.rows if row["question_id"] in question_ids]
+
+    def save_test(db, test):
+        state.saves += 1
+        return test
+
+    monkeypatch.setattr(crud, "get_accuracy_test_for_update", lambda db, test_id: state.test)
+    monkeypatch.setattr(crud, "list_accuracy_item_rows_by_questions", list_rows)
+    monkeypatch.setattr(
+        crud,
+        "bulk_update_accuracy_item_results",
+        lambda db, rows: state.bulk_calls.append(rows),
+    )
+    monkeypatch.setattr(crud, "save_accuracy_test", save_test)
+    return state
+
+
+def test_submit_results_writes_one_bulk_update_and_updates_counters(fake_crud):
+    service = AccuracyService(db=object())
+
+    service.submit_test_item_results(
+        "test-1",
+        [
+            {"id": "q1", "ai_score": 4, "ai_dimension_scores": {"accuracy": 4}},
+            {"id": "q2", "status": "failed"},
+            {"id": "missing", "ai_score": 1},
+        ],
+    )
+
+    assert len(fake_crud.bulk_calls) == 1
+    assert {row["id"] for row in fake_crud.bulk_calls[0]} == {"item-1", "item-2"}
+    assert fake_crud.saves == 1
+
+    first = fake_crud.rows[0]
+    assert first["status"] == "ai_completed"
+    assert first["final_score"] == 4
+    assert first["final_evaluation_type"] == "ai"
+
+    test = fake_crud.test
+    assert test.processed_questions == 1
+    assert test.failed_questions == 1
+    assert test.success_questions == 0
+    assert test.status == "running"
+    assert test.result_aggregates["total_evaluated"] == 1
+    assert test.result_aggregates["dimension_sums"] == {"accuracy": 4.0}
+
+
+def test_resubmitting_an_item_replaces_its_contribution(fake_crud):
+    service = AccuracyService(db=object())
+
+    service.submit_test_item_results("test-1", [{"id": "q1", "ai_score": 2, "ai_dimension_scores": {"accuracy": 2}}])
+    service.submit_test_item_results("test-1", [{"id": "q2", "ai_score": 5, "ai_dimension_scores": {"accuracy": 5}}])
+    service.submit_test_item_results(
+        "test-1",
+        [
+            {"id": "q1", "ai_score": 4, "ai_dimension_scores": {"accuracy": 4}, "status": "ai_completed"},
+            {"id": "q3", "ai_score": 3, "ai_dimension_scores": {"accuracy": 3}},
+        ],
+    )
+
+    test = fake_crud.test
+    assert test.status == "completed"
+    assert test.processed_questions == 3
+    assert test.result_aggregates["dimension_counts"] == {"accuracy": 3}
+    assert test.results_summary["dimension_scores"] == {"accuracy": 4.0}
+    assert test.results_summary["score_distribution"]["2"] == 0
+    assert test.results_summary["score_distribution"]["4"] == 1
+    assert test.results_summary["evaluation_types"] == {"ai": 3, "human": 0}
+
+
+def test_submit_results_rejects_tests_that_are_not_running(fake_crud):
+    fake_crud.test.status = "completed"
+    service = AccuracyService(db=object())
+
+    with pytest.raises(ValueError):
+        service.submit_test_item_results("test-1", [{"id": "q1", "ai_score": 3}])
+
+    assert fake_crud.bulk_calls == []
+
+
+def test_human_submit_skips_items_not_leased_to_the_grader(fake_crud, monkeypatch):
+    crud = accuracy_service_module.crud_accuracy
+    fake_crud.test.evaluation_type = "manual"
+    assignment = SimpleNamespace(
+        id="assignment-1",
+        evaluation_id="test-1",
+        access_code="CODE1234",
+        is_active=True,
+        status="in_progress",
+        expiration_date=None,
+        total_items=2,
+        completed_items=0,
+        last_activity_at=None,
+        completed_at=None,
+    )
+    completed_leases = []
+    monkeypatch.setattr(crud, "get_human_assignment_by_access_code_for_update", lambda db, code: assignment)
+    monkeypatch.setattr(
+        crud,
+        "list_assignment_lease_rows_for_update",
+        lambda db, *, assignment_id, item_ids, now: [
+            {"id": "lease-1", "item_id": "item-1", "question_id": "q1"}
+        ],
+    )
+    monkeypatch.setattr(
+        crud,
+        "complete_leases",
+        lambda db, *, lease_ids, now: completed_leases.extend(lease_ids),
+    )
+    service = AccuracyService(db=object())
+
+    outcome = service.submit_human_results(
+        "CODE1234",
+        [
+            {"item_id": "item-1", "score": 3, "dimension_scores": {"accuracy": 3}},
+            {"item_id": "item-2", "score": 5},
+        ],
+    )
+
+    assert outcome == {"accepted": 1, "rejected_item_ids": ["item-2"]}
+    assert completed_leases == ["lease-1"]
+    assert assignment.completed_items == 1
+    assert fake_crud.rows[0]["status"] == "human_completed"
+    assert fake_crud.rows[0]["human_evaluator_id"] == "CODE1234"
+    assert fake_crud.rows[1]["status"] == "pending"
+
+
+def test_hybrid_ai_errors_keep_item_status_and_aggregates(fake_crud):
+    fake_crud.test.evaluation_type = "hybrid"
+    service = AccuracyService(db=object())
+    service.submit_test_item_results(
+        "test-1",
+        [{"id": "q1", "human_score": 4, "human_dimension_scores": {"accuracy": 4}}],
+    )
+
+    service.submit_test_item_results(
+        "test-1",
+        [{"id": "q1", "ai_error": "judge timeout"}, {"id": "q2", "ai_error": "judge timeout"}],
+    )
+
+    human_completed, pending = fake_crud.rows[0], fake_crud.rows[1]
+    assert human_completed["status"] == "human_completed"
+    assert human_completed["final_score"] == 4
+    assert "judge timeout" in human_completed["ai_evaluation_reason"]
+    assert pending["status"] == "pending"
+
+    test = fake_crud.test
+    assert (test.processed_questions, test.failed_questions) == (1, 0)
+    assert test.result_aggregates["evaluation_types"] == {"ai": 0, "human": 1}
+
+
+def test_item_cursor_round_trips_and_rejects_crafted_values():
+    import base64
+    import json
+
+    service = AccuracyService(db=object())
+    item_id = "4f1c2b8e-8a55-4d8c-9a0e-2f5c7c3d9b10"
+
+    assert service._decode_item_cursor(service._encode_item_cursor(7, item_id)) == (7, item_id)
+
+    crafted = [[1, 2], [True, item_id], {"a": 1, "b": 2}, [1, "not-a-uuid"], [1, item_id, 3]]
+    for value in crafted:
+        cursor = base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            service._decode_item_cursor(cursor)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        service._decode_item_cursor("%%%")
+
+
+def create_with_reuse(monkeypatch, *, total: int, reused_scores: list):
+    import uuid
+
+    from app.schemas.accuracy import AccuracyTestCreate
+
+    crud = accuracy_service_module.crud_accuracy
+    project_id = uuid.uuid4()
+    baseline = SimpleNamespace(project_id=project_id, scoring_method="five_scale", dimensions=["accuracy"])
+    commits = []
+
+    def create_with_items(db, *, data, version, baseline_test_id, before_commit):
+        test = SimpleNamespace(
+            **data,
+            id="test-2",
+            total_questions=total,
+            processed_questions=len(reused_scores),
+            success_questions=len(reused_scores),
+            failed_questions=0,
+            result_aggregates=None,
+            results_summary=None,
+            started_at=None,
+            completed_at=None,
+        )
+        before_commit(test)
+        commits.append(test)
+        return test
+
+    reused_items = [
+        SimpleNamespace(
+            status="reused",
+            final_score=score,
+            final_dimension_scores={"accuracy": score},
+            final_evaluation_type="ai",
+        )
+        for score in reused_scores
+    ]
+    monkeypatch.setattr(crud, "get_accuracy_test", lambda db, test_id: baseline)
+    monkeypatch.setattr(crud, "create_accuracy_test_with_items", create_with_items)
+    monkeypatch.setattr(crud, "list_accuracy_items_for_results", lambda db, test_id: reused_items)
+
+    test = AccuracyService(db=object()).create_test(
+        AccuracyTestCreate(
+            name="rerun",
+            evaluation_type="ai",
+            scoring_method="five_scale",
+            dimensions=["accuracy"],
+            project_id=project_id,
+            dataset_id=uuid.uuid4(),
+            baseline_test_id=uuid.uuid4(),
+        )
+    )
+    assert commits == [test]
+    return test
+
+
+def test_partial_reuse_counts_aggregates_and_leaves_the_test_to_run(monkeypatch):
+    test = create_with_reuse(monkeypatch, total=3, reused_scores=[4, 2])
+
+    assert test.status == "created"
+    assert test.result_aggregates["total_evaluated"] == 2
+    assert test.result_aggregates["dimension_sums"] == {"accuracy": 6.0}
+    assert test.completed_at is None
+
+
+def test_full_reuse_completes_the_test_at_creation(monkeypatch):
+    test = create_with_reuse(monkeypatch, total=2, reused_scores=[5, 3])
+
+    assert test.status == "completed"
+    assert test.completed_at is not None
+    assert test.results_summary["total_evaluated"] == 2
+    assert test.results_summary["dimension_scores"] == {"accuracy": 4.0}
+
+
+def test_regrading_a_reused_item_does_not_count_it_twice(fake_crud):
+    reused = fake_crud.rows[0]
+    reused.update(status="reused", final_score=3, final_dimension_scores={"accuracy": 3}, final_evaluation_type="ai")
+    fake_crud.test.processed_questions = 1
+    fake_crud.test.success_questions = 1
+    fake_crud.test.result_aggregates = {
+        "total_evaluated": 1,
+        "dimension_sums": {"accuracy": 3.0},
+        "dimension_counts": {"accuracy": 1},
+        "score_distribution": {"5": 0, "4": 0, "3": 1, "2": 0, "1": 0, "0": 0},
+        "evaluation_types": {"ai": 1, "human": 0},
+    }
+    service = AccuracyService(db=object())
+
+    service.submit_test_item_results("test-1", [{"id": "q1", "ai_score": 5, "ai_dimension_scores": {"accuracy": 5}}])
+
+    assert reused["status"] == "both_completed"
+    assert reused["final_score"] == 5
+    test = fake_crud.test
+    assert test.processed_questions == 1
+    assert test.result_aggregates["total_evaluated"] == 1
+    assert test.result_aggregates["dimension_sums"] == {"accuracy": 5.0}
+
+
+def page_through(service, **filters):
+    seen = []
+    cursor = None
+    while True:
+        items, total, cursor = service.get_test_items("test-1", 3, 0, cursor=cursor, **filters)
+        seen.extend(item["id"] for item in items)
+        if cursor is None:
+            return seen, total
+
+
+def test_item_cursor_pages_without_duplicates_or_gaps(monkeypatch):
+    import uuid
+
+    crud = accuracy_service_module.crud_accuracy
+    # 序号相同的条目靠 id 区分先后
+    items = [
+        SimpleNamespace(**{
+            **make_row(str(uuid.UUID(int=index + 1)), f"q{index}"),
+            "evaluation_id": "test-1",
+            "rag_answer_id": None,
+            "sequence_number": index // 2,
+            "status": "ai_completed" if index % 3 else "pending",
+            "final_score": 4 if index % 2 else 2,
+        })
+        for index in range(11)
+    ]
+    calls = []
+
+    def matching(status, score):
+        rows = [
+            item for item in items
+            if (status is None or item.status == status) and (score is None or item.final_score == score)
+        ]
+        return sorted(rows, key=lambda item: (item.sequence_number, item.id))
+
+    def get_items(db, *, test_id, limit, offset, status, score, after):
+        calls.append(after)
+        rows = matching(status, score)
+        if after is not None:
+            rows = [item for item in rows if (item.sequence_number, item.id) > after]
+        return [(item, "q", "ref", "answer") for item in rows[:limit]]
+
+    monkeypatch.setattr(crud, "get_accuracy_test_items", get_items)
+    monkeypatch.setattr(
+        crud,
+        "count_accuracy_test_items",
+        lambda db, *, test_id, status, score: len(matching(status, score)),
+    )
+    monkeypatch.setattr(crud, "get_accuracy_test", lambda db, test_id: SimpleNamespace(total_questions=len(items)))
+    service = AccuracyService(db=object())
+
+    for filters in ({}, {"status": "ai_completed"}, {"score": 4}, {"status": "pending", "score": 2}):
+        expected = [item.id for item in matching(filters.get("status"), filters.get("score"))]
+        seen, total = page_through(service, **filters)
+        assert seen == expected
+        assert len(set(seen)) == len(seen) == total
+
+    # 第一页不带游标，之后每页都从上一页最后一项之后开始
+    assert calls[:4] == [None, (1, items[2].id), (2, items[5].id), (4, items[8].id)]
+
+
+def test_item_query_uses_the_keyset_instead_of_offset():
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.orm import Query, Session
+
+    class RecordingQuery(Query):
+        statements = []
+
+        def all(self):
+            self.statements.append(str(self.statement.compile(dialect=postgresql.dialect())))
+            return []
+
+    crud = accuracy_service_module.crud_accuracy
+    db = Session(query_cls=RecordingQuery)
+    crud.get_accuracy_test_items(
+        db,
+        test_id="test-1",
+        limit=3,
+        offset=30,
+        status="pending",
+        after=(7, "4f1c2b8e-8a55-4d8c-9a0e-2f5c7c3d9b10"),
+    )
+
+    (sql,) = RecordingQuery.statements
+    assert "(accuracy_test_items.sequence_number, accuracy_test_items.id) > (" in sql
+    assert "ORDER BY accuracy_test_items.sequence_number ASC, accuracy_test_items.id ASC" in sql
+    assert "OFFSET" not in sql
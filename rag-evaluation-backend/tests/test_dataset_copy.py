@@ -0,0 +1,28 @@
+from sqlalchemy.dialects import postgresql
+
+from app.crud import dataset as crud_dataset
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+
+def test_copy_dataset_questions_and_answers_in_one_statement():
+    db = RecordingSession()
+    crud_dataset._copy_questions(
+        db,
+        source_dataset_id="source",
+        target_dataset_id="target",
+        rag_answer_versions=["v1"],
+    )
+
+    (sql,) = db.statements
+    assert sql.startswith("WITH source_questions AS")
+    assert "copied_questions AS" in sql and "INSERT INTO questions" in sql
+    assert "INSERT INTO rag_answers" in sql and "performance_test_id" not in sql
+    # 与其他批量插入一致，使用 uuid-ossp 生成主键
+    assert sql.count("uuid_generate_v4()") == 2 and "gen_random_uuid" not in sql
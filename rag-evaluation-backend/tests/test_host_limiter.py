@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.services.host_limiter import HostConcurrencyLimiter, HostQueueFull
+
+
+def test_host_limit_queues_then_rejects_and_reports_waits():
+    limiter = HostConcurrencyLimiter(max_concurrency=2, max_queue=3)
+    peak = {"running": 0, "max": 0}
+    outcomes = []
+
+    async def request(url):
+        try:
+            async with limiter.slot(url):
+                peak["running"] += 1
+                peak["max"] = max(peak["max"], peak["running"])
+                await asyncio.sleep(0.01)
+                peak["running"] -= 1
+            outcomes.append("ok")
+        except HostQueueFull:
+            outcomes.append("rejected")
+
+    async def scenario():
+        # 其他主机不受影响
+        await asyncio.gather(
+            *(request("http://rag.local/chat") for _ in range(8)),
+            request("http://other.local:8080/chat"),
+        )
+
+    asyncio.run(scenario())
+
+    assert peak["max"] <= 3
+    assert outcomes.count("rejected") == 3
+    hosts = {host["host"]: host for host in limiter.snapshot()["hosts"]}
+    assert hosts["rag.local:80"]["granted"] == 5
+    assert hosts["rag.local:80"]["rejected"] == 3
+    assert hosts["rag.local:80"]["running"] == hosts["rag.local:80"]["waiting"] == 0
+    assert hosts["rag.local:80"]["max_wait_ms"] >= 10
+    assert hosts["other.local:8080"]["rejected"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = HostConcurrencyLimiter(max_concurrency=1, max_queue=1)
+
+    async def scenario():
+        async with limiter.slot("http://rag.local/a"):
+            waiter = asyncio.create_task(limiter._acquire("rag.local:80"))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert limiter.snapshot()["hosts"][0]["waiting"] == 0
+        return limiter.snapshot()["hosts"][0]
+
+    assert asyncio.run(scenario())["running"] == 0
+
+
+def test_idle_hosts_are_forgotten_beyond_the_cap():
+    limiter = HostConcurrencyLimiter(max_concurrency=1, max_queue=1, max_hosts=2)
+
+    async def scenario():
+        async with limiter.slot("http://busy.local/"):
+            for host in ("a", "b", "c"):
+                async with limiter.slot(f"http://{host}.local/"):
+                    pass
+            return [host["host"] for host in limiter.snapshot()["hosts"]]
+
+    hosts = asyncio.run(scenario())
+
+    assert sorted(hosts) == ["busy.local:80", "c.local:80"]
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core.http_capture import CaptureWriter, CapturingTransport, load_captures, split_body
+from benchmarks.replay_server import ReplayConfig, create_app
+
+SSE_CHUNKS = ["data: {\"answer\": \"检索\"}\n\n".encode("utf-8"), "data: {\"answer\": \"增强\"}\n\n".encode("utf-8")]
+
+
+def test_capture_records_chunks_and_replay_reproduces_them(tmp_path):
+    path = str(tmp_path / "capture.jsonl.gz")
+
+    async def upstream_body():
+        for chunk in SSE_CHUNKS:
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=upstream_body(), headers={"content-type": "text/event-stream"})
+
+    async def capture():
+        writer = CaptureWriter(path)
+        transport = CapturingTransport(httpx.MockTransport(handler), writer)
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream(
+                "POST", "http://rag.local/chat?x=1", json={"q": "问题"}, headers={"Authorization": "Bearer secret"}
+            ) as response:
+                received = [chunk async for chunk in response.aiter_raw()]
+        writer.close()
+        return received
+
+    assert asyncio.run(capture()) == SSE_CHUNKS
+
+    [record] = list(load_captures(path))
+    assert "secret" not in json.dumps(record)
+    assert [chunk for _, chunk in split_body(record)] == SSE_CHUNKS
+    offsets = [offset for offset, _ in split_body(record)]
+    assert offsets == sorted(offsets) and offsets[0] >= 10
+
+    client = TestClient(create_app([record], ReplayConfig(speed=0)))
+    exact = client.post("/chat?x=1", content=record["request_body"].encode("utf-8"))
+    other = client.post("/chat?x=1", json={"q": "别的问题"})
+
+    assert exact.status_code == 200
+    assert exact.headers["content-type"] == "text/event-stream"
+    assert exact.content == b"".join(SSE_CHUNKS)
+    assert other.content == exact.content
+    assert client.post("/missing").status_code == 404
+    assert client.get("/replay/stats").json() == {"requests": 3, "exact": 1, "by_path": 1, "missing": 1}
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+
+from app.core.http_client import HTTPClientRegistry
+
+
+def make_registry(max_origins: int = 256) -> HTTPClientRegistry:
+    return HTTPClientRegistry(
+        max_connections_per_host=10,
+        max_keepalive_connections=5,
+        keepalive_expiry=5.0,
+        http2=False,
+        timeout=httpx.Timeout(5.0),
+        max_origins=max_origins,
+    )
+
+
+def test_clients_are_shared_per_origin_and_closed():
+    registry = make_registry()
+
+    async def scenario():
+        first = registry.get("http://rag.local/api/chat")
+        same = registry.get("http://RAG.local:80/other")
+        other = registry.get("https://rag.local/api/chat")
+        await registry.aclose()
+        return first, same, other
+
+    first, same, other = asyncio.run(scenario())
+
+    assert first is same
+    assert first is not other
+    assert first.is_closed and other.is_closed
+
+
+def test_shared_clients_do_not_keep_cookies():
+    registry = make_registry()
+
+    async def scenario():
+        client = registry.get("http://rag.local/")
+        response = httpx.Response(
+            200,
+            headers={"set-cookie": "session=secret; Path=/"},
+            request=httpx.Request("GET", "http://rag.local/"),
+        )
+        client.cookies.extract_cookies(response)
+        cookies = dict(client.cookies)
+        await registry.aclose()
+        return cookies
+
+    assert asyncio.run(scenario()) == {}
+
+
+def test_least_recently_used_client_is_closed_beyond_the_cap():
+    registry = make_registry(max_origins=2)
+
+    async def scenario():
+        first = registry.get("http://a.local/")
+        second = registry.get("http://b.local/")
+        registry.get("http://a.local/")
+        registry.get("http://c.local/")
+        await asyncio.sleep(0)
+        return first, second, registry.get("http://a.local/")
+
+    first, second, again = asyncio.run(scenario())
+
+    assert second.is_closed
+    assert again is first and not first.is_closed
+
+
+def test_evicted_client_stays_open_until_its_stream_is_closed(monkeypatch):
+    from app.core import http_client as http_client_module
+
+    async def body():
+        yield b"data: 1\n\n"
+        yield b"data: 2\n\n"
+
+    def handler(request):
+        if request.url.host == "a.local":
+            return httpx.Response(200, content=body())
+        return httpx.Response(200, content=b"ok")
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(http_client_module.httpx, "AsyncHTTPTransport", lambda **kwargs: transport)
+    registry = make_registry(max_origins=1)
+
+    async def scenario():
+        streaming = registry.get("http://a.local/")
+        response = await streaming.send(streaming.build_request("GET", "http://a.local/stream"), stream=True)
+        other = registry.get("http://b.local/")
+        await (await other.get("http://b.local/")).aread()
+        await asyncio.sleep(0)
+        open_while_streaming = not streaming.is_closed
+
+        chunks = [chunk async for chunk in response.aiter_raw()]
+        await response.aclose()
+        await asyncio.sleep(0)
+        closed_after_stream = streaming.is_closed
+
+        await registry.aclose()
+        return open_while_streaming, chunks, closed_after_stream, other.is_closed
+
+    open_while_streaming, chunks, closed_after_stream, other_closed = asyncio.run(scenario())
+
+    assert open_while_streaming
+    assert b"".join(chunks) == b"data: 1\n\ndata: 2\n\n"
+    assert closed_after_stream
+    assert other_closed
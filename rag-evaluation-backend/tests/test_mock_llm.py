@@ -0,0 +1,36 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.services.evaluation.accuracy.evaluator import parse_judgment
+from benchmarks.mock_llm import MockLLMConfig, create_app
+
+PAYLOAD = {"model": "mock", "messages": [{"role": "user", "content": "问题：1+1？"}]}
+
+
+def test_mock_llm_replies_are_deterministic_and_parseable():
+    client = TestClient(create_app())
+
+    first = client.post("/v1/chat/completions", json=PAYLOAD).json()
+    second = client.post("/v1/chat/completions", json=PAYLOAD).json()
+    content = first["choices"][0]["message"]["content"]
+
+    assert content == second["choices"][0]["message"]["content"]
+    judgment = parse_judgment(content)
+    assert judgment is not None
+    assert set(judgment.dimension_scores) == {"accuracy", "relevance", "completeness"}
+
+
+def test_mock_llm_injects_faults():
+    limited = TestClient(create_app(MockLLMConfig(rate_limit_ratio=1.0)))
+    malformed = TestClient(create_app(MockLLMConfig(malformed_ratio=1.0)))
+
+    assert limited.post("/v1/chat/completions", json=PAYLOAD).status_code == 429
+    body = malformed.post("/v1/chat/completions", json=PAYLOAD).text
+    try:
+        json.loads(body)
+        parsed = True
+    except ValueError:
+        parsed = False
+    assert not parsed
+    assert limited.get("/stats").json()["rate_limited"] == 1
@@ -0,0 +1,45 @@
+from app.crud import question as crud_question
+from app.schemas.question import QuestionImportWithRagAnswer
+
+
+class DummySession:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_import_copies_questions_and_aligned_answers(monkeypatch):
+    copied = {}
+    monkeypatch.setattr(
+        crud_question,
+        "_copy_rows",
+        lambda db, table, columns, rows: copied.setdefault(table, (columns, rows)),
+    )
+    db = DummySession()
+
+    ids = crud_question.import_questions_with_rag_answers(
+        db,
+        dataset_id="dataset-1",
+        questions_data=[
+            QuestionImportWithRagAnswer(question_text="q1", standard_answer="a1", rag_answer="r1"),
+            QuestionImportWithRagAnswer(question_text="q2", standard_answer="a2"),
+        ],
+    )
+
+    assert db.commits == 1
+    question_columns, question_rows = copied["questions"]
+    assert question_columns[:2] == ["id", "dataset_id"]
+    assert [row["id"] for row in question_rows] == ids
+    assert {row["dataset_id"] for row in question_rows} == {"dataset-1"}
+
+    answer_columns, answer_rows = copied["rag_answers"]
+    assert answer_columns == ["id", "question_id", "answer", "collection_method", "version"]
+    assert [(row["question_id"], row["answer"]) for row in answer_rows] == [(ids[0], "r1")]
+
+
+def test_copy_value_escapes_text_format():
+    assert crud_question._copy_value(None) == "\\N"
+    assert crud_question._copy_value("a\tb\nc\\") == "a\\tb\\nc\\\\"
+    assert crud_question._copy_value({"k": "中"}) == '{"k": "中"}'
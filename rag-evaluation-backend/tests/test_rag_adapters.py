@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.rag_adapters import RagResponseError, get_rag_adapter, resolve_endpoint
+from app.utils.request_templates import RequestTemplate, compile_path
+
+
+def sse(*events) -> bytes:
+    lines = [f"data: {json.dumps(event, ensure_ascii=False)}" for event in events] + ["data: [DONE]"]
+    return ("\n\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def fetch(rag_config, handler):
+    endpoint = resolve_endpoint(rag_config=rag_config)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await get_rag_adapter(endpoint.type).fetch(client, endpoint, "什么是RAG？")
+
+    return asyncio.run(scenario())
+
+
+def test_dify_flow_streams_only_matching_events():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = sse(
+            {"event": "workflow_started", "data": {"text": "ignored"}},
+            {"event": "text_chunk", "data": {"text": "检索"}},
+            {"event": "text_chunk", "data": {"text": "增强"}},
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    reply = fetch({"type": "dify_flow", "url": "dify.local/v1/workflows/run", "apiKey": "app-1", "inputField": "q"}, handler)
+
+    assert reply.answer == "检索增强"
+    assert str(requests[0].url) == "http://dify.local/v1/workflows/run"
+    assert requests[0].headers["authorization"] == "Bearer app-1"
+    assert json.loads(requests[0].content)["inputs"] == {"q": "什么是RAG？"}
+
+
+def test_ragflow_chat_builds_openai_request_and_reads_deltas():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = sse(
+            {"choices": [{"delta": {"content": "你"}}]},
+            {"choices": [{"delta": {"content": "好"}}]},
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    reply = fetch({"type": "ragflow_chat", "address": "ragflow:9380", "chatId": "c1", "apiKey": "k"}, handler)
+
+    assert reply.answer == "你好"
+    assert str(requests[0].url) == "http://ragflow:9380/api/v1/chats_openai/c1/chat/completions"
+    assert json.loads(requests[0].content)["messages"][0]["content"] == "什么是RAG？"
+
+
+def test_custom_stream_is_parsed_like_the_web_client():
+    def stream(*lines):
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = "\n".join(lines) + "\n"
+            return httpx.Response(200, content=body.encode("utf-8"), headers={"content-type": "text/event-stream"})
+
+        return handler
+
+    lines = (
+        'data: {"type": "ping"}',
+        "data: not json",
+        'data:{"type": "delta", "choices": [{"text": "no space"}]}',
+        'data: {"type": "delta", "choices": [{"text": "检索"}]}',
+        'data: {"type": "end", "choices": [{"text": "ignored"}]}',
+        'data: {"type": "delta", "choices": [{"text": "增强"}]}',
+        "data: [DONE]",
+    )
+    config = {"type": "custom", "url": "rag.local/chat", "responsePath": "choices.0.text"}
+
+    # 指定事件字段与值：只取匹配的事件；路径中的数字段按列表下标取值
+    reply = fetch({**config, "streamEventField": "type", "streamEventValue": "delta"}, stream(*lines))
+    assert reply.answer == "检索增强"
+
+    # 未指定事件字段：每个事件都按路径取值
+    reply = fetch(config, stream(*lines))
+    assert reply.answer == "检索ignored增强"
+
+    # 只指定字段不指定值时前端不取任何事件，空路径也取不到回答
+    for partial in ({**config, "streamEventField": "type"}, {**config, "responsePath": ""}):
+        with pytest.raises(RagResponseError):
+            fetch(partial, stream(*lines))
+
+
+def test_custom_config_accepts_json_strings_from_the_web_client():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content) == {"query": "什么是RAG？", "top_k": 3}
+        return httpx.Response(200, json={"data": {"answer": "检索增强生成"}})
+
+    reply = fetch(
+        {
+            "type": "custom",
+            "url": "http://rag.local/ask",
+            "requestHeaders": '{"X-Token": "t"}',
+            "requestTemplate": '{"query": "{{question}}", "top_k": 3}',
+            "responsePath": "data.answer",
+        },
+        handler,
+    )
+
+    assert reply.answer == "检索增强生成"
+
+
+def test_request_template_escapes_question_and_is_not_shared():
+    template = RequestTemplate({"messages": [{"content": "问题: {{question}}"}], "meta": {"raw": "{{question}}"}})
+
+    first = json.loads(template.render('他说"你好"\n'))
+    second = json.loads(template.render("第二个"))
+
+    assert first == {"messages": [{"content": '问题: 他说"你好"\n'}], "meta": {"raw": '他说"你好"\n'}}
+    assert second["meta"]["raw"] == "第二个"
+
+
+def test_compiled_paths_support_indices_and_wildcards():
+    body = {"data": {"outputs": [{"text": "检索"}, {"text": "增强"}, {"other": 1}]}}
+
+    assert compile_path("data.outputs[1].text")(body) == "增强"
+    assert compile_path("$.data.outputs[-3].text")(body) == "检索"
+    assert compile_path("data.outputs[5].text")(body) is None
+    assert compile_path("data.outputs[*].text")(body) == ["检索", "增强"]
+
+
+def test_endpoint_urls_without_scheme_are_normalised_once():
+    from app.core.http_client import _origin
+    from app.schemas.rag_answer import ApiRequestConfig
+
+    web = resolve_endpoint(rag_config={"type": "custom", "url": "rag.local:8080/chat"})
+    api = resolve_endpoint(api_config=ApiRequestConfig(endpoint_url="rag.local:8080/chat", request_template={"q": "{{question}}"}))
+
+    assert web.url == api.url == "http://rag.local:8080/chat"
+    assert _origin(web.url) == "http://rag.local:8080"
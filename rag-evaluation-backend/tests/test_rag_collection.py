@@ -0,0 +1,434 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.schemas.rag_answer import ApiRequestConfig
+from app.services import rag_service as rag_service_module
+from app.services.rag_adapters import RagEndpointConfig
+from app.services.rag_resilience import CircuitBreaker, CircuitBreakerRegistry, RetryPolicy
+from app.services.rag_service import RagService
+
+
+def api_config() -> RagEndpointConfig:
+    return RagEndpointConfig.from_api_config(ApiRequestConfig(
+        endpoint_url="http://rag.local/chat",
+        request_template={"query": "{{question}}"},
+        response_path="data.answer",
+    ))
+
+
+def test_collect_answer_retries_transient_failures(monkeypatch):
+    statuses = [503, 429, 200]
+    saved = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status, text="busy")
+        return httpx.Response(200, json={"data": {"answer": "四十二"}})
+
+    def create_rag_answer(db, *, data):
+        saved.update(data)
+        return SimpleNamespace(**data)
+
+    async def no_sleep(delay):
+        return None
+
+    monkeypatch.setattr(rag_service_module.crud_rag, "create_rag_answer", create_rag_answer)
+    monkeypatch.setattr(rag_service_module.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            question = SimpleNamespace(id="q-1", question_text="答案是什么？")
+            return await RagService(db=None).collect_answer_api(
+                question, api_config(), retry_policy=RetryPolicy(max_attempts=3), version="v2"
+            )
+
+    answer, error = asyncio.run(scenario())
+
+    assert error is None
+    assert saved["answer"] == "四十二"
+    assert saved["attempt_count"] == 3
+    assert saved["version"] == "v2"
+
+
+def test_circuit_breaker_opens_and_probes_once():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 10
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    try:
+        breaker.before_call()
+        raise AssertionError("second probe should be rejected")
+    except rag_service_module.CircuitOpenError:
+        pass
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_collect_batch_streams_answers_into_batched_inserts(monkeypatch):
+    question_ids = [f"q-{index}" for index in range(250)]
+    flushes = []
+    asked = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        asked.append(json.loads(request.content)["query"])
+        if asked[-1] == "q-7?":
+            return httpx.Response(400, text="bad request")
+        return httpx.Response(200, json={"data": {"answer": "ok"}})
+
+    def insert_rag_answers(db, rows, overwrite=False):
+        flushes.append(len(rows))
+        return {row["question_id"]: row["id"] for row in rows}
+
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "list_question_texts_by_ids",
+        lambda db, ids: [(question_id, f"{question_id}?") for question_id in ids if question_id != "q-3"],
+    )
+    monkeypatch.setattr(rag_service_module.crud_rag, "insert_rag_answers", insert_rag_answers)
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "get_answer_ids_by_question_and_version",
+        lambda db, ids, version: {"q-1": "a-1", "q-2": "a-2"},
+    )
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+    monkeypatch.setattr(rag_service_module.settings, "RAG_COLLECT_FLUSH_ROWS", 100)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            return await RagService(db=None).collect_answers_batch(
+                question_ids, api_config(), concurrent_requests=8, version="v1"
+            )
+
+    result = asyncio.run(scenario())
+
+    assert result["success_count"] == 246
+    assert result["skipped_count"] == 2
+    assert result["failed_count"] == 2
+    assert {error["question_id"] for error in result["errors"]} == {"q-3", "q-7"}
+    assert "q-1?" not in asked and "q-2?" not in asked
+    assert sum(flushes) == 246
+    assert max(flushes) == 100
+
+
+def test_collect_batch_reports_outcomes_and_stops_on_request(monkeypatch):
+    question_ids = [f"q-{index}" for index in range(50)]
+    flushed = []
+    fed = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        fed.append(json.loads(request.content)["query"])
+        return httpx.Response(200, json={"data": {"answer": "ok"}})
+
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "list_question_texts_by_ids",
+        lambda db, ids: [(question_id, question_id) for question_id in ids],
+    )
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "insert_rag_answers",
+        lambda db, rows, overwrite=False: {
+            row["question_id"]: row["id"] for row in rows if row["question_id"] != "q-0"
+        },
+    )
+    monkeypatch.setattr(
+        rag_service_module.crud_rag, "get_answer_ids_by_question_and_version", lambda db, ids, version: {}
+    )
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+
+    async def on_flush(outcomes):
+        flushed.extend(outcomes)
+
+    async def should_stop():
+        return len(fed) >= 10
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            return await RagService(db=None).collect_answers_batch(
+                question_ids,
+                api_config(),
+                concurrent_requests=1,
+                version="v1",
+                on_flush=on_flush,
+                should_stop=should_stop,
+            )
+
+    result = asyncio.run(scenario())
+
+    assert len(fed) < 15
+    assert [outcome.question_id for outcome in flushed] == fed
+    assert flushed[0].status == "skipped"
+    assert {outcome.status for outcome in flushed[1:]} == {"succeeded"}
+    assert result["success_count"] == len(fed) - 1
+
+
+def test_collect_batch_coalesces_identical_question_texts(monkeypatch):
+    question_ids = [f"q-{index}" for index in range(20)]
+    calls = []
+    inserted = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content)["query"])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"data": {"answer": "ok"}})
+
+    def insert_rag_answers(db, rows, overwrite=False):
+        inserted.extend(rows)
+        return {row["question_id"]: row["id"] for row in rows}
+
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "list_question_texts_by_ids",
+        lambda db, ids: [(question_id, f"text-{int(question_id[2:]) % 5}") for question_id in ids],
+    )
+    monkeypatch.setattr(rag_service_module.crud_rag, "insert_rag_answers", insert_rag_answers)
+    monkeypatch.setattr(
+        rag_service_module.crud_rag, "get_answer_ids_by_question_and_version", lambda db, ids, version: {}
+    )
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            return await RagService(db=None).collect_answers_batch(
+                question_ids, api_config(), concurrent_requests=8, version="v1", coalesce=True
+            )
+
+    result = asyncio.run(scenario())
+
+    assert result["success_count"] == 20
+    assert sorted(calls) == [f"text-{index}" for index in range(5)]
+    assert sorted(row["question_id"] for row in inserted) == sorted(question_ids)
+    assert len({row["id"] for row in inserted}) == 20
+
+
+def test_coalesced_failures_are_retried_and_reused_answers_drop_raw_response(monkeypatch):
+    statuses = [503, 200]
+    inserted = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status, text="busy")
+        return httpx.Response(200, json={"data": {"answer": "ok"}})
+
+    def insert_rag_answers(db, rows, overwrite=False):
+        inserted.extend(rows)
+        return {row["question_id"]: row["id"] for row in rows}
+
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "list_question_texts_by_ids",
+        lambda db, ids: [(question_id, "same") for question_id in ids],
+    )
+    monkeypatch.setattr(rag_service_module.crud_rag, "insert_rag_answers", insert_rag_answers)
+    monkeypatch.setattr(
+        rag_service_module.crud_rag, "get_answer_ids_by_question_and_version", lambda db, ids, version: {}
+    )
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            return await RagService(db=None).collect_answers_batch(
+                ["q-1", "q-2", "q-3"], api_config(), concurrent_requests=1, version="v1", coalesce=True
+            )
+
+    result = asyncio.run(scenario())
+
+    assert (result["failed_count"], result["success_count"]) == (1, 2)
+    assert statuses == []
+    raw = {row["question_id"]: row["raw_response"] for row in inserted}
+    assert raw["q-2"] is not None and raw["q-3"] is None
+
+
+def test_collect_batch_fails_instead_of_hanging_when_insert_raises(monkeypatch):
+    question_ids = [f"q-{index}" for index in range(2000)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"data": {"answer": "ok"}})
+
+    def insert_rag_answers(db, rows, overwrite=False):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(
+        rag_service_module.crud_rag,
+        "list_question_texts_by_ids",
+        lambda db, ids: [(question_id, f"{question_id}?") for question_id in ids],
+    )
+    monkeypatch.setattr(rag_service_module.crud_rag, "insert_rag_answers", insert_rag_answers)
+    monkeypatch.setattr(
+        rag_service_module.crud_rag, "get_answer_ids_by_question_and_version", lambda db, ids, version: {}
+    )
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", CircuitBreakerRegistry(5, 30))
+    monkeypatch.setattr(rag_service_module.settings, "RAG_COLLECT_FLUSH_ROWS", 50)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            collecting = RagService(db=None).collect_answers_batch(
+                question_ids, api_config(), concurrent_requests=8, version="v1"
+            )
+            try:
+                await asyncio.wait_for(collecting, timeout=10)
+            except RuntimeError as exc:
+                return str(exc), len(asyncio.all_tasks())
+        raise AssertionError("collection should fail")
+
+    error, tasks_left = asyncio.run(scenario())
+
+    assert error == "db down"
+    assert tasks_left == 1
+
+
+def test_half_open_probe_with_unexpected_error_does_not_wedge_breaker(monkeypatch):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    registry = CircuitBreakerRegistry(1, 10)
+    monkeypatch.setattr(registry, "get", lambda url: breaker)
+    monkeypatch.setattr(rag_service_module, "circuit_breakers", registry)
+    async def malformed_gzip():
+        yield b"not gzip"
+
+    responses = [
+        lambda: httpx.Response(200, headers={"content-encoding": "gzip"}, content=malformed_gzip()),
+        lambda: httpx.Response(200, json={"data": {"answer": "ok"}}),
+    ]
+
+    breaker.before_call()
+    breaker.record_failure()
+    now[0] = 10
+
+    async def ask():
+        return await RagService(db=None)._request_answer(
+            "q-1", "问题", api_config(), RetryPolicy(), "v1"
+        )
+
+    async def scenario():
+        transport = httpx.MockTransport(lambda request: responses.pop(0)())
+        async with httpx.AsyncClient(transport=transport) as client:
+            monkeypatch.setattr(rag_service_module.http_clients, "get", lambda url: client)
+            try:
+                await ask()
+                raise AssertionError("malformed body should raise")
+            except httpx.DecodingError:
+                pass
+            assert breaker.state == "open" and not breaker.probing
+            now[0] = 20
+            return await ask()
+
+    row, error = asyncio.run(scenario())
+
+    assert error is None and row["answer"] == "ok"
+    assert breaker.state == "closed"
+
+
+class RecordingSession:
+    def __init__(self, results):
+        self.results = list(results)
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return self.results.pop(0)
+
+    def commit(self):
+        self.commits += 1
+
+
+def compiled(statement) -> str:
+    from sqlalchemy.dialects import postgresql
+
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_job_outcomes_move_counters_by_status_changes():
+    from app.crud import rag as crud_rag
+
+    previous = SimpleNamespace(all=lambda: [("q1", "pending"), ("q2", "failed"), ("q3", "succeeded")])
+    db = RecordingSession([previous, None, None])
+
+    crud_rag.record_collection_job_outcomes(
+        db,
+        "job-1",
+        [
+            {"question_id": "q1", "status": "succeeded", "answer_id": "a1", "attempt_count": 1, "error": None},
+            {"question_id": "q2", "status": "succeeded", "answer_id": "a2", "attempt_count": 2, "error": None},
+            {"question_id": "q3", "status": "failed", "answer_id": None, "attempt_count": 1, "error": "timeout"},
+        ],
+    )
+
+    assert db.commits == 1
+    counters = compiled(db.statements[-1])
+    # 只按本批条目的状态变化调整计数，不再统计整个任务
+    assert "succeeded_questions + 1" in counters
+    assert "failed_questions + 0" in counters
+    assert "GROUP BY" not in " ".join(str(statement) for statement in db.statements)
+
+
+def test_heartbeat_only_touches_running_jobs():
+    from app.crud import rag as crud_rag
+
+    db = RecordingSession([SimpleNamespace(rowcount=1), SimpleNamespace(rowcount=0)])
+
+    assert crud_rag.touch_running_collection_job(db, "job-1") is True
+    assert crud_rag.touch_running_collection_job(db, "job-1") is False
+
+    sql = compiled(db.statements[0])
+    assert "SET updated_at=now()" in sql
+    assert "rag_collection_jobs.status = 'running'" in sql
+
+
+def test_resume_rejects_a_different_rag_endpoint():
+    endpoint = api_config()
+    job = SimpleNamespace(settings={"rag_type": endpoint.type, "endpoint_url": endpoint.url})
+    service = RagService(db=None)
+
+    service.check_resume_endpoint(job, endpoint)
+
+    other = RagEndpointConfig.from_api_config(ApiRequestConfig(
+        endpoint_url="http://other-rag.local/chat",
+        request_template={"query": "{{question}}"},
+    ))
+    with pytest.raises(ValueError):
+        service.check_resume_endpoint(job, other)
+
+
+def test_job_results_keep_the_per_question_result_shape(monkeypatch):
+    calls = []
+
+    def list_results(db, job_id, *, status, skip, limit):
+        calls.append((job_id, status, skip, limit))
+        return [
+            SimpleNamespace(question_id="q1", status="succeeded", answer_id="a1", attempt_count=2, error=None),
+            SimpleNamespace(question_id="q2", status="failed", answer_id=None, attempt_count=3, error="超时"),
+        ]
+
+    monkeypatch.setattr(rag_service_module.crud_rag, "list_collection_job_results", list_results)
+
+    results = RagService(db=None).get_collection_results("job-1", status=None, skip=100, limit=50)
+
+    assert calls == [("job-1", None, 100, 50)]
+    assert results == [
+        {"question_id": "q1", "status": "succeeded", "success": True, "answer_id": "a1", "attempts": 2, "error": None},
+        {"question_id": "q2", "status": "failed", "success": False, "answer_id": None, "attempts": 3, "error": "超时"},
+    ]
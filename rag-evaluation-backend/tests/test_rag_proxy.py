@@ -0,0 +1,179 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app.api.api_v1.endpoints import rag_proxy
+from app.api.api_v1.endpoints.rag_proxy import RAGProxyRequest, proxy_rag_request
+
+
+async def stream_of(*parts):
+    for part in parts:
+        yield part
+
+
+def run_proxy(monkeypatch, handler, **request_fields):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(rag_proxy.http_clients, "get", lambda url: client)
+            response = await proxy_rag_request(
+                RAGProxyRequest(url="http://rag.local/chat", **request_fields), current_user=None
+            )
+            chunks = []
+            if hasattr(response, "body_iterator"):
+                chunks = [chunk async for chunk in response.body_iterator]
+                await response.background()
+            return response, chunks
+
+    return asyncio.run(scenario())
+
+
+def test_proxy_streams_upstream_bytes_unchanged(monkeypatch):
+    payload = "data: {\"answer\": \"检索增强生成\"}\n\n".encode("utf-8")
+    # 在多字节字符中间切分
+    parts = [payload[:14], payload[14:17], payload[17:]]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=stream_of(*parts), headers={"content-type": "text/event-stream; charset=utf-8"})
+
+    response, chunks = run_proxy(monkeypatch, handler, body={"stream": True})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/event-stream; charset=utf-8"
+    assert chunks == parts
+
+
+def test_proxy_forwards_upstream_status_and_maps_transport_errors(monkeypatch):
+    response, chunks = run_proxy(
+        monkeypatch, lambda request: httpx.Response(429, content=stream_of(b'{"error":"busy"}'))
+    )
+    assert response.status_code == 429
+    assert b"".join(chunks) == b'{"error":"busy"}'
+
+    def refuse(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("refused", request=request)
+
+    response, _ = run_proxy(monkeypatch, refuse)
+    assert response.status_code == 502
+
+
+def test_cached_user_dependency_does_not_hold_a_session(monkeypatch):
+    from types import SimpleNamespace
+    from app.api import deps
+    from app.core.security import create_access_token
+
+    lookups = []
+    sessions = []
+
+    class FakeSession:
+        def __enter__(self):
+            sessions.append("open")
+            return self
+
+        def __exit__(self, *exc):
+            sessions.append("closed")
+
+    def get_user(db, user_id):
+        lookups.append(user_id)
+        return SimpleNamespace(id=user_id, is_active=True)
+
+    monkeypatch.setattr(deps, "SessionLocal", FakeSession)
+    monkeypatch.setattr(deps, "get_user_service", get_user)
+    monkeypatch.setattr(deps, "_user_cache", {})
+    token = create_access_token(subject="u-1")
+
+    first = deps.get_current_user_cached(token)
+    second = deps.get_current_user_cached(token)
+
+    assert first is second
+    assert lookups == ["u-1"]
+    assert sessions == ["open", "closed"]
+
+
+def test_proxy_reports_upstream_timing(monkeypatch):
+    from app.services.proxy_telemetry import UpstreamTimingRecorder
+
+    recorder = UpstreamTimingRecorder()
+    monkeypatch.setattr(rag_proxy, "upstream_timings", recorder)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200, content=stream_of(b"data: {}\n\n", b"data: {}\n\n"), headers={"content-type": "text/event-stream"}
+        )
+
+    response, chunks = run_proxy(monkeypatch, handler, include_timing=True, performance_test_id="pt-1")
+
+    assert "upstream-headers;dur=" in response.headers["server-timing"]
+    assert chunks[-1].startswith(b"event: upstream_timing\ndata: ")
+    timing = json.loads(chunks[-1].split(b"data: ", 1)[1])
+    assert timing["status"] == 200 and timing["bytes"] == 20
+    assert timing["headers_ms"] <= timing["first_byte_ms"] <= timing["last_byte_ms"]
+    assert [sample.as_dict() for sample in recorder.pop("pt-1")] == [timing]
+
+
+def test_timing_recorder_is_bounded_and_cleared_on_interrupt(monkeypatch):
+    from app.services import performance_service as performance_module
+    from app.services.proxy_telemetry import UpstreamTiming, UpstreamTimingRecorder
+
+    recorder = UpstreamTimingRecorder(max_tests=2)
+    timing = UpstreamTiming(status=200, headers_ms=1.0, first_byte_ms=2.0, last_byte_ms=3.0, bytes=1)
+    for test_id in ("pt-1", "pt-2", "pt-1", "pt-3"):
+        recorder.record(test_id, timing)
+    assert recorder.pop("pt-2") == []
+    assert len(recorder.pop("pt-1")) == 2
+
+    recorder.record("pt-running", timing)
+    test = SimpleNamespace(status="running")
+    monkeypatch.setattr(performance_module, "upstream_timings", recorder)
+    monkeypatch.setattr(performance_module.crud_performance, "get_performance_test", lambda db, test_id: test)
+    monkeypatch.setattr(
+        performance_module.crud_performance,
+        "update_performance_test",
+        lambda db, *, db_obj, update_data: SimpleNamespace(**update_data),
+    )
+
+    performance_module.performance_service.mark_test_interrupted(None, "pt-running")
+
+    assert recorder.pop("pt-running") == []
+
+
+def test_proxy_ignores_client_supplied_priority(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    granted = []
+
+    @asynccontextmanager
+    async def slot(kind, job_id, priority=None):
+        granted.append((kind, job_id, priority))
+        yield
+
+    monkeypatch.setattr(rag_proxy.scheduler, "slot", slot)
+    run_proxy(
+        monkeypatch,
+        lambda request: httpx.Response(200, content=stream_of(b"{}")),
+        performance_test_id="perf-1",
+        priority="interactive",
+    )
+
+    assert granted == [("performance", "perf-1", rag_proxy.PERFORMANCE_TEST_PRIORITY)]
+    assert rag_proxy.PERFORMANCE_TEST_PRIORITY != "interactive"
+
+
+def test_proxy_rejects_invalid_target_urls_with_400(monkeypatch):
+    def unsupported(request: httpx.Request) -> httpx.Response:
+        raise httpx.UnsupportedProtocol("Request URL has an unsupported protocol 'ftp://'.", request=request)
+
+    response, _ = run_proxy(monkeypatch, unsupported)
+    assert response.status_code == 400
+
+    def invalid(request: httpx.Request) -> httpx.Response:
+        raise httpx.InvalidURL("Invalid non-printable ASCII character in URL")
+
+    response, _ = run_proxy(monkeypatch, invalid)
+    assert response.status_code == 400
+
+    async def without_host():
+        return await proxy_rag_request(RAGProxyRequest(url="http:///chat"), current_user=None)
+
+    assert asyncio.run(without_host()).status_code == 400
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.services.evaluation.scheduler import FairShareScheduler
+
+
+async def run_jobs(scheduler, jobs):
+    order = []
+
+    async def request(kind, job_id, priority):
+        async with scheduler.slot(kind, job_id, priority=priority):
+            order.append(job_id)
+            await asyncio.sleep(0)
+
+    tasks = []
+    for job_id, priority, count in jobs:
+        for _ in range(count):
+            tasks.append(asyncio.create_task(request("accuracy", job_id, priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_small_job_is_not_starved_by_large_backlog():
+    scheduler = FairShareScheduler(max_concurrency=2)
+
+    order = asyncio.run(run_jobs(scheduler, [("nightly", "batch", 200), ("smoke", "batch", 5)]))
+
+    # 同等优先级下两者交替获得槽位，小任务不必等待大任务的积压
+    last_smoke = max(index for index, job_id in enumerate(order) if job_id == "smoke")
+    assert last_smoke < 15
+    assert scheduler.snapshot() == {"max_concurrency": 2, "in_use": 0, "waiting": 0, "jobs": []}
+
+
+def test_priority_weights_shares_of_contended_slots():
+    scheduler = FairShareScheduler(max_concurrency=1)
+
+    order = asyncio.run(run_jobs(scheduler, [("nightly", "batch", 100), ("smoke", "interactive", 100)]))
+
+    window = order[10:60]
+    assert window.count("smoke") >= 5 * window.count("nightly")
@@ -85,6 +85,20 @@ export const ragAnswerService = {
     }
   },
 
+  // 分页获取收集任务中每个问题的收集结果（collectRagAnswers 只返回任务进度）
+  async getCollectionJobResults(
+    jobId: string,
+    params: { status?: 'pending' | 'succeeded' | 'failed'; skip?: number; limit?: number } = {}
+  ): Promise<any[]> {
+    try {
+      const response = await api.get(`/v1/rag-answers/collect/${jobId}/results`, { params });
+      return response;
+    } catch (error) {
+      console.error('获取收集结果失败:', error);
+      throw error;
+    }
+  },
+
   // 批量导入RAG回答
   async importRagAnswers(projectId: string, answers: any[]): Promise<any> {
     try {